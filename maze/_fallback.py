@@ -0,0 +1,11 @@
+import importlib.util
+import os
+
+
+def load_fallback(name='solver'):
+    """Loads the pure Python module ``maze.<name>`` even when the Cython one is built"""
+    path = os.path.join(os.path.dirname(__file__), '{}.py'.format(name))
+    spec = importlib.util.spec_from_file_location('maze.{}_py'.format(name), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -1,17 +1,15 @@
-import random
-
 from .actor import Actor
 
 
 class Accelerator(Actor):
-    def __init__(self, grid, row, column, kind, probability=0.1):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, probability=0.1, clock=None, rng=None):
+        super().__init__(grid, row, column, kind, clock, rng)
         self.probability = probability
         self.speed = 1
         self.speedup = 0.25
 
     async def step(self, dr, dc, duration=1):
-        if random.uniform(0, 1) <= self.probability:
+        if self.random.uniform(0, 1) <= self.probability:
             if self.speed > 0.25:
                 self.speed -= self.speedup
 
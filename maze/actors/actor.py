@@ -1,11 +1,20 @@
 """This file has been placed in the public domain"""
 import asyncio
 import contextlib
+import random
 import time
 
+from ..solver import TARGET_CODE, UP_CODE, DOWN_CODE, LEFT_CODE, RIGHT_CODE, UNKNOWN_CODE
+
+
+class WallClock:
+    """Real time, actors on it run as ``asyncio`` tasks"""
+    monotonic = staticmethod(time.monotonic)
+    sleep = staticmethod(asyncio.sleep)
+
 
 class Actor:
-    def __init__(self, grid, row, column, kind):
+    def __init__(self, grid, row, column, kind, clock=None, rng=None):
         """Coroutine-based actor on a grid
 
         :param grid:
@@ -16,9 +25,10 @@ class Actor:
                 occupied by the actor as "dirty" (needs redrawing)
             * ``cell_size``: size of a grid cell, in pixels (used to optimize
                 animations)
-            * ``directions``: a NumPy array of directions (ASCII bytes),
-                containing ``b'v'``, ``b'<'``, ``b'>'``, ``b'^'`` depending
-                on where the actor should move to from a particular cell.
+            * ``codes``: a NumPy ``uint8`` array of direction codes,
+                containing ``DOWN_CODE``, ``LEFT_CODE``, ``RIGHT_CODE``,
+                ``UP_CODE`` (see ``maze.solver``) depending on where the actor
+                should move to from a particular cell.
                 Only used in the default implementation of ``behavior``.
 
             This is stored in an attribute with the same name.
@@ -36,16 +46,32 @@ class Actor:
             Any data for use by the grid drawing code.
             This is stored in an attribute with the same name.
 
+        :param clock:
+
+            Where the time comes from, an object with ``monotonic()`` and
+            ``sleep(seconds)`` to await. The wall clock by default,
+            see ``maze.simulate.VirtualClock`` for one that runs headless.
+            This is stored in an attribute with the same name.
+
+        :param rng:
+
+            Random numbers, a ``random.Random`` (the ``random`` module by default).
+            This is stored in the attribute ``random``.
+
         The attribute ``task`` will hold an ``asyncio.Task`` object
         corresponding to the actor's behavior. Cancel it when done.
+        Actors with their own ``clock`` get no task, the owner of the clock
+        runs ``behavior()`` itself.
         """
         self.row = row
         self.column = column
         self.kind = kind
         self.grid = grid
-        self.task = asyncio.ensure_future(self.behavior())
+        self.clock = clock or WallClock()
+        self.random = rng or random
+        self.task = asyncio.ensure_future(self.behavior()) if clock is None else None
 
-        self.direction = b'?'
+        self.direction = UNKNOWN_CODE
 
     async def behavior(self):
         """Coroutine containing the actor's behavior
@@ -57,23 +83,23 @@ class Actor:
         To be reimplemented in subclasses..
         """
         while True:
-            shape = self.grid.directions.shape
+            shape = self.grid.codes.shape
             row = int(self.row)
             column = int(self.column)
             if 0 <= row < shape[0] and 0 <= column < shape[1]:
-                self.direction = self.grid.directions[row, column]
+                self.direction = self.grid.codes.item(row, column)
             else:
-                self.direction = b'?'
+                self.direction = UNKNOWN_CODE
 
-            if self.direction == b'v':
+            if self.direction == DOWN_CODE:
                 await self.step(1, 0)
-            elif self.direction == b'>':
+            elif self.direction == RIGHT_CODE:
                 await self.step(0, 1)
-            elif self.direction == b'^':
+            elif self.direction == UP_CODE:
                 await self.step(-1, 0)
-            elif self.direction == b'<':
+            elif self.direction == LEFT_CODE:
                 await self.step(0, -1)
-            elif self.direction == b'X':
+            elif self.direction == TARGET_CODE:
                 break
             else:
                 await self.jump()
@@ -92,9 +118,9 @@ class Actor:
         When using this with a for-loop, you probably need to put
         a sleep/delay into each iteration.
         """
-        start = time.monotonic()
+        start = self.clock.monotonic()
         while True:
-            now = time.monotonic()
+            now = self.clock.monotonic()
             p = (now - start) / duration
             if p > 1:
                 return
@@ -128,7 +154,7 @@ class Actor:
 
             # Sleep amount is based on zoom level: we want to sleep for
             # about one pixel's worth of movement.
-            await asyncio.sleep(duration/self.grid.cell_size)
+            await self.clock.sleep(duration/self.grid.cell_size)
 
         # Final update to the exact ending position (this should use integer
         # arithmetic, so it avoids rounding errors)
@@ -148,7 +174,7 @@ class Actor:
                 # jump along a parabola
                 self.row = start_row - p * (1-p)
 
-            await asyncio.sleep(duration/self.grid.cell_size * 2)
+            await self.clock.sleep(duration/self.grid.cell_size * 2)
 
         with self._update_context():
             self.row = start_row
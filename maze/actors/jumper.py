@@ -1,11 +1,10 @@
-import random
-
 from .actor import Actor
+from ..solver import WALL_CODE, TARGET_CODE, UP_CODE, DOWN_CODE, LEFT_CODE, RIGHT_CODE, UNKNOWN_CODE
 
 
 class Jumper(Actor):
-    def __init__(self, grid, row, column, kind, probability=0.2):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, probability=0.2, clock=None, rng=None):
+        super().__init__(grid, row, column, kind, clock, rng)
         self.probability = probability
 
     async def behavior(self):
@@ -18,11 +17,11 @@ class Jumper(Actor):
         To be reimplemented in subclasses..
         """
         while True:
-            shape = self.grid.directions.shape
+            shape = self.grid.codes.shape
             row = int(self.row)
             column = int(self.column)
 
-            if random.uniform(0, 1) <= self.probability:
+            if self.random.uniform(0, 1) <= self.probability:
                 shortest_existed = await self._check_shortest_path(row, column, shape)
                 if shortest_existed is not None:
                     # jump over wall
@@ -31,41 +30,41 @@ class Jumper(Actor):
                     column = int(self.column)
 
             if 0 <= row < shape[0] and 0 <= column < shape[1]:
-                self.direction = self.grid.directions[row, column]
+                self.direction = self.grid.codes.item(row, column)
             else:
-                self.direction = b'?'
+                self.direction = UNKNOWN_CODE
 
-            if self.direction == b'v':
+            if self.direction == DOWN_CODE:
                 await self.step(1, 0)
-            elif self.direction == b'>':
+            elif self.direction == RIGHT_CODE:
                 await self.step(0, 1)
-            elif self.direction == b'^':
+            elif self.direction == UP_CODE:
                 await self.step(-1, 0)
-            elif self.direction == b'<':
+            elif self.direction == LEFT_CODE:
                 await self.step(0, -1)
-            elif self.direction == b'X':
+            elif self.direction == TARGET_CODE:
                 break
             else:
                 await self.jump()
 
     async def _check_shortest_path(self, row, column, shape):
-        if row + 2 < shape[0] and self.grid.directions[row + 1, column] == b'#' \
-                and self.grid.directions[row + 2, column] != b'#':
+        if row + 2 < shape[0] and self.grid.codes.item(row + 1, column) == WALL_CODE \
+                and self.grid.codes.item(row + 2, column) != WALL_CODE:
 
             return await self._compare_paths(row + 2, column)
 
-        elif row - 2 >= 0 and self.grid.directions[row - 1, column] == b'#' \
-                and self.grid.directions[row - 2, column] != b'#':
+        elif row - 2 >= 0 and self.grid.codes.item(row - 1, column) == WALL_CODE \
+                and self.grid.codes.item(row - 2, column) != WALL_CODE:
 
             return await self._compare_paths(row - 2, column)
 
-        elif column + 2 < shape[1] and self.grid.directions[row, column + 1] == b'#' \
-                and self.grid.directions[row, column + 2] != b'#':
+        elif column + 2 < shape[1] and self.grid.codes.item(row, column + 1) == WALL_CODE \
+                and self.grid.codes.item(row, column + 2) != WALL_CODE:
 
             return await self._compare_paths(row, column + 2)
 
-        elif column - 2 >= 0 and self.grid.directions[row, column - 1] == b'#' \
-                and self.grid.directions[row, column - 2] != b'#':
+        elif column - 2 >= 0 and self.grid.codes.item(row, column - 1) == WALL_CODE \
+                and self.grid.codes.item(row, column - 2) != WALL_CODE:
 
             return await self._compare_paths(row, column - 2)
 
@@ -1,14 +1,13 @@
-import random
-
 from .actor import Actor
+from ..solver import WALL_CODE, TARGET_CODE, UP_CODE, DOWN_CODE, LEFT_CODE, RIGHT_CODE, UNKNOWN_CODE
 
 
-DIRS = [b'<', b'>', b'^', b'v']
+DIRS = [LEFT_CODE, RIGHT_CODE, UP_CODE, DOWN_CODE]
 
 
 class Scatterbrain(Actor):
-    def __init__(self, grid, row, column, kind, probability=0.2):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, probability=0.2, clock=None, rng=None):
+        super().__init__(grid, row, column, kind, clock, rng)
         self.probability = probability
 
     async def behavior(self):
@@ -21,30 +20,30 @@ class Scatterbrain(Actor):
         To be reimplemented in subclasses..
         """
         while True:
-            shape = self.grid.directions.shape
+            shape = self.grid.codes.shape
             row = int(self.row)
             column = int(self.column)
             if 0 <= row < shape[0] and 0 <= column < shape[1]:
-                self.direction = self.grid.directions[row, column]
+                self.direction = self.grid.codes.item(row, column)
             else:
-                self.direction = b'?'
+                self.direction = UNKNOWN_CODE
 
-            if random.uniform(0, 1) <= self.probability:
+            if self.random.uniform(0, 1) <= self.probability:
                 possible_dirs = await self._get_possible_dirs(row, column, shape)
 
-                index = random.randrange(0, len(possible_dirs))
+                index = self.random.randrange(0, len(possible_dirs))
 
                 self.direction = possible_dirs[index]
 
-            if self.direction == b'v':
+            if self.direction == DOWN_CODE:
                 await self.step(1, 0)
-            elif self.direction == b'>':
+            elif self.direction == RIGHT_CODE:
                 await self.step(0, 1)
-            elif self.direction == b'^':
+            elif self.direction == UP_CODE:
                 await self.step(-1, 0)
-            elif self.direction == b'<':
+            elif self.direction == LEFT_CODE:
                 await self.step(0, -1)
-            elif self.direction == b'X':
+            elif self.direction == TARGET_CODE:
                 break
             else:
                 await self.jump()
@@ -53,14 +52,14 @@ class Scatterbrain(Actor):
         dirs = list(DIRS)
 
         # go in random direction without wall, but not by computed path
-        if row + 1 >= shape[0] or self.grid.directions[row + 1, column] == b'#':
-            dirs.remove(b'v')
-        if row - 1 < 0 or self.grid.directions[row - 1, column] == b'#':
-            dirs.remove(b'^')
-        if column + 1 >= shape[1] or self.grid.directions[row, column + 1] == b'#':
-            dirs.remove(b'>')
-        if column - 1 < 0 or self.grid.directions[row, column - 1] == b'#':
-            dirs.remove(b'<')
+        if row + 1 >= shape[0] or self.grid.codes.item(row + 1, column) == WALL_CODE:
+            dirs.remove(DOWN_CODE)
+        if row - 1 < 0 or self.grid.codes.item(row - 1, column) == WALL_CODE:
+            dirs.remove(UP_CODE)
+        if column + 1 >= shape[1] or self.grid.codes.item(row, column + 1) == WALL_CODE:
+            dirs.remove(RIGHT_CODE)
+        if column - 1 < 0 or self.grid.codes.item(row, column - 1) == WALL_CODE:
+            dirs.remove(LEFT_CODE)
 
         if len(dirs) > 1 and self.direction in dirs:
             dirs.remove(self.direction)
@@ -2,8 +2,8 @@ from .actor import Actor
 
 
 class Speedster(Actor):
-    def __init__(self, grid, row, column, kind):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, clock=None, rng=None):
+        super().__init__(grid, row, column, kind, clock, rng)
 
     async def step(self, dr, dc, duration=0.5):
         await super().step(dr, dc, duration)
\ No newline at end of file
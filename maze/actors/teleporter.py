@@ -1,13 +1,12 @@
-import random
 import numpy
-import asyncio
 
 from .actor import Actor
+from ..solver import WALL_CODE, TARGET_CODE, UP_CODE, DOWN_CODE, LEFT_CODE, RIGHT_CODE, UNKNOWN_CODE
 
 
 class Teleporter(Actor):
-    def __init__(self, grid, row, column, kind, probability=0.2):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, probability=0.2, clock=None, rng=None):
+        super().__init__(grid, row, column, kind, clock, rng)
         self.probability = probability
 
     async def behavior(self):
@@ -20,9 +19,9 @@ class Teleporter(Actor):
         To be reimplemented in subclasses..
         """
         while True:
-            shape = self.grid.directions.shape
+            shape = self.grid.codes.shape
 
-            if random.uniform(0, 1) <= self.probability:
+            if self.random.uniform(0, 1) <= self.probability:
                 # teleportation!
                 await self.teleport()
                 await self.teleport()
@@ -35,19 +34,19 @@ class Teleporter(Actor):
             row = int(self.row)
             column = int(self.column)
             if 0 <= row < shape[0] and 0 <= column < shape[1]:
-                self.direction = self.grid.directions[row, column]
+                self.direction = self.grid.codes.item(row, column)
             else:
-                self.direction = b'?'
+                self.direction = UNKNOWN_CODE
 
-            if self.direction == b'v':
+            if self.direction == DOWN_CODE:
                 await self.step(1, 0)
-            elif self.direction == b'>':
+            elif self.direction == RIGHT_CODE:
                 await self.step(0, 1)
-            elif self.direction == b'^':
+            elif self.direction == UP_CODE:
                 await self.step(-1, 0)
-            elif self.direction == b'<':
+            elif self.direction == LEFT_CODE:
                 await self.step(0, -1)
-            elif self.direction == b'X':
+            elif self.direction == TARGET_CODE:
                 break
             else:
                 await self.jump()
@@ -58,12 +57,12 @@ class Teleporter(Actor):
         castle_column = castle_pos[1][0]
 
         while True:
-            new_row = random.randrange(0, shape[0])
-            new_column = random.randrange(0, shape[1])
+            new_row = self.random.randrange(0, shape[0])
+            new_column = self.random.randrange(0, shape[1])
 
             # teleportation cannot be closer to castle than 5 tiles
             if (abs(new_column - castle_column) >= 5 or abs(new_row - castle_row) >= 5) \
-                    and self.grid.directions[new_row, new_column] != b'#':
+                    and self.grid.codes.item(new_row, new_column) != WALL_CODE:
                 break
 
         return new_row, new_column
@@ -82,7 +81,7 @@ class Teleporter(Actor):
                 self.column = start_column - p * (1 - p)
                 self.row = start_row - p * (1 - p)
 
-            await asyncio.sleep(duration / self.grid.cell_size * 2)
+            await self.clock.sleep(duration / self.grid.cell_size * 2)
 
         with self._update_context():
             self.column = start_column
@@ -0,0 +1,255 @@
+"""Benchmarks of the floods, path extraction and rendering
+
+``python -m maze.benchmark run`` times every case on generated mazes of several families
+and sizes and appends the results to a JSON history file, ``python -m maze.benchmark compare``
+compares the last run with an earlier one and fails when a case got slower than the threshold.
+
+Each case records its best wall time of the repeats, its peak memory of Python and numpy
+allocations (by ``tracemalloc``, in a separate run, tracing slows the code down; Qt memory
+is not traced) and
+its throughput in cells per second, the cells of the maze or of the extracted paths.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+from . import generate, solver
+from ._fallback import load_fallback
+
+FAMILIES = ('grass', 'backtracker', 'caves', 'random')
+SIZES = (256, 1024)
+# the pure Python flood expands a level at a time, long corridors make it slow on big mazes
+PYTHON_LIMIT = 256*256
+# paintEvent draws every cell with SVG images
+RENDER_LIMIT = 64*64
+STARTS = 1000
+HISTORY = 'benchmarks.json'
+
+
+def make_maze(family, size, seed=0):
+    """A generated maze with a target and dudes in its largest component
+
+    The target is on the first cell of the component, the dudes on the last ones.
+    """
+    maze = generate.generate(family, (size, size), seed=seed)
+    grass = numpy.argwhere(maze == 0)
+    if not len(grass):
+        raise ValueError('The {} maze has no open cells'.format(family))
+    # caves and random walls have pockets, a target in one would leave little to flood
+    labels = solver.ComponentIndex(maze).labels()
+    values, counts = numpy.unique(labels[maze == 0], return_counts=True)
+    maze[tuple(numpy.argwhere((labels == values[counts.argmax()]) & (maze == 0))[0])] = 1
+    directions = solver.analyze(maze).directions
+    reachable = numpy.argwhere((directions != b'#') & (directions != b' ') & (directions != b'X'))
+    for value, (row, column) in zip((2, 3, 4, 5, 6), reachable[::-1]):
+        maze[row, column] = value
+    return maze
+
+
+def starts_of(maze, count=STARTS):
+    """Up to ``count`` open cells spread over the maze"""
+    cells = numpy.argwhere(maze >= 0)
+    return cells[::max(len(cells) // count, 1)][:count]
+
+
+def measure(function, cells, repeat=3):
+    """Best wall time, peak traced memory and cells per second of ``function``"""
+    seconds = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'peak_bytes': peak,
+        'cells': int(cells),
+        'cells_per_second': cells / seconds if seconds > 0 else float('inf'),
+    }
+
+
+def solver_cases(module, maze):
+    """``(name, function, cells)`` of the flood and path cases of the solver ``module``"""
+    compiled = hasattr(module, 'create_lines')
+    cases = [
+        ('flood', lambda: module.flood(maze, compact=True), maze.size),
+        ('analyze', lambda: module.analyze(maze, compact=True).materialize(), maze.size),
+    ]
+    if compiled:
+        cases += [
+            ('flood-threads', lambda: module.flood(maze, compact=True, threads=os.cpu_count()), maze.size),
+            ('flood-bitparallel', lambda: module.flood(maze, compact=True, engine='bitparallel'), maze.size),
+        ]
+
+    directions = module.analyze(maze).directions
+    starts = [(row, column) for row, column in starts_of(maze)
+              if directions[row, column] not in (b'#', b' ')]
+    _, offsets = module.arrows_to_paths(directions, starts)
+    steps = int(offsets[-1])
+    if compiled:
+        arrows = directions.view(numpy.int8)
+        cases += [
+            ('arrows_to_path', lambda: [module.arrows_to_path(arrows, row, column) for row, column in starts], steps),
+            ('create_lines', lambda: module.create_lines(directions, starts), steps),
+        ]
+    else:
+        cases.append(('arrows_to_path', lambda: [module.arrows_to_path(directions, start) for start in starts], steps))
+    cases.append(('arrows_to_paths', lambda: module.arrows_to_paths(directions, starts), steps))
+    return cases
+
+
+def render_case(maze):
+    """``(name, function, cells)`` of painting the whole maze by ``GridWidget.paintEvent``, headless
+
+    ``None`` when PyQt5 is missing.
+    """
+    try:
+        from PyQt5 import QtWidgets
+    except ImportError:
+        return None
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from .grid_widget import GridWidget
+
+    class Game:
+        game_mode = False
+        game_over = False
+        actors = []
+
+    widget = GridWidget(maze.copy(), 16, Game())
+    # grab() paints the widget into a pixmap through paintEvent
+    return 'render', lambda: (widget.grab(), app), maze.size
+
+
+def run(families=FAMILIES, sizes=SIZES, repeat=3, python=True, render=True, log=None):
+    """Runs all benchmarks, returns a record for the history"""
+    modules = [('pyx', solver)]
+    if python:
+        modules.append(('py', load_fallback()))
+    results = {}
+
+    def record(name, function, cells):
+        results[name] = measure(function, cells, repeat)
+        if log is not None:
+            log(name, results[name])
+
+    for family in families:
+        for size in sizes:
+            maze = make_maze(family, size)
+            label = '{}/{}x{}'.format(family, *maze.shape)
+            for prefix, module in modules:
+                if prefix == 'py' and maze.size > PYTHON_LIMIT:
+                    continue
+                for name, function, cells in solver_cases(module, maze):
+                    record('{}/{}/{}'.format(prefix, name, label), function, cells)
+            if render and maze.size <= RENDER_LIMIT:
+                case = render_case(maze)
+                if case is not None:
+                    record('gui/{}/{}'.format(case[0], label), case[1], case[2])
+
+    return {
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'cpus': os.cpu_count(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def load_history(filename):
+    """The runs recorded in the history file, oldest first"""
+    if not os.path.exists(filename):
+        return []
+    with open(filename) as f:
+        return json.load(f)
+
+
+def append_history(filename, record):
+    history = load_history(filename)
+    history.append(record)
+    with open(filename, 'w') as f:
+        json.dump(history, f, indent=1, sort_keys=True)
+
+
+def compare(baseline, current, threshold=0.1):
+    """``(name, baseline seconds, current seconds, ratio)`` of the cases in both runs
+
+    and the names of those more than ``threshold`` slower than in the baseline.
+    """
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        old = baseline['results'][name]['seconds']
+        new = current['results'][name]['seconds']
+        ratio = new / old if old > 0 else float('inf')
+        rows.append((name, old, new, ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_result(name, result):
+    return '{:<50} {:>10.4f} s {:>10.1f} MiB {:>14.0f} cells/s'.format(
+        name, result['seconds'], result['peak_bytes'] / 2**20, result['cells_per_second'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m maze.benchmark', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and append them to the history')
+    run_parser.add_argument('--history', default=HISTORY)
+    run_parser.add_argument('--families', nargs='+', default=FAMILIES, choices=sorted(generate.GENERATORS))
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--no-python', dest='python', action='store_false', help='skip the pure Python solver')
+    run_parser.add_argument('--no-render', dest='render', action='store_false', help='skip rendering')
+
+    compare_parser = commands.add_parser('compare', help='compare the last run with an earlier one')
+    compare_parser.add_argument('--history', default=HISTORY)
+    compare_parser.add_argument('--baseline', type=int, default=-2,
+                                help='index of the run to compare with, the one before the last by default')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='slowdown that counts as a regression, 0.1 is 10%% slower')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        record = run(args.families, args.sizes, args.repeat, args.python, args.render,
+                     log=lambda name, result: print(format_result(name, result), flush=True))
+        append_history(args.history, record)
+        return 0
+
+    history = load_history(args.history)
+    if len(history) < 2:
+        print('The history needs at least two runs to compare', file=sys.stderr)
+        return 2
+    try:
+        baseline = history[args.baseline]
+    except IndexError:
+        print('There is no run {} in the history'.format(args.baseline), file=sys.stderr)
+        return 2
+    rows, regressions = compare(baseline, history[-1], args.threshold)
+    for name, old, new, ratio in rows:
+        print('{:<50} {:>10.4f} s {:>10.4f} s {:>7.2f}x{}'.format(
+            name, old, new, ratio, '  REGRESSION' if name in regressions else ''))
+    print('{} of {} cases slower by more than {:.0%}'.format(len(regressions), len(rows), args.threshold))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
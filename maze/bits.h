@@ -0,0 +1,27 @@
+/* The index of the lowest set bit of a word that is not zero */
+#ifndef MAZE_BITS_H
+#define MAZE_BITS_H
+
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif
+
+static inline int lowest_bit(unsigned long long bits)
+{
+#if defined(_MSC_VER) && defined(_WIN64)
+    unsigned long index;
+    _BitScanForward64(&index, bits);
+    return (int)index;
+#elif defined(__GNUC__) || defined(__clang__)
+    return __builtin_ctzll(bits);
+#else
+    int index = 0;
+    while (!(bits & 1)) {
+        bits >>= 1;
+        index++;
+    }
+    return index;
+#endif
+}
+
+#endif
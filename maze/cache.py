@@ -0,0 +1,99 @@
+import collections
+import hashlib
+
+import numpy
+
+from . import solver
+
+
+class AnalysisCache:
+    """Analyses of mazes kept by the content of the maze, the least recently used go first
+
+    ``budget`` is the most bytes of arrays kept. A hit returns a new analysis
+    sharing the stored arrays, see ``AnalyzedMaze.share``, so editing it
+    never changes what is stored.
+    """
+    def __init__(self, budget=256*2**20):
+        self.budget = budget
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None):
+        """A hash of the maze bytes, its shape and the options that change the results"""
+        maze = numpy.ascontiguousarray(maze, dtype=numpy.int8)
+        digest = hashlib.blake2b(digest_size=16)
+        # threaded and bit-parallel floods break ties between directions in another way, the same one
+        canonical = threads is not None or engine == 'bitparallel'
+        digest.update(repr((maze.shape, bool(compact), canonical)).encode())
+        digest.update(maze)
+        if costs is not None:
+            digest.update(b'costs')
+            digest.update(numpy.ascontiguousarray(costs, dtype=numpy.int64))
+        if stop_when_reached is not None:
+            digest.update(b'stops')
+            digest.update(numpy.ascontiguousarray(stop_when_reached, dtype=numpy.int64))
+        return digest.hexdigest()
+
+    def analyze(self, maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None,
+                stats=False, stats_hook=None):
+        """``maze.solver.analyze`` answered from the cache when the same maze was analyzed before
+
+        With ``stats`` (or a ``stats_hook``) the analysis starts with the counters of the flood
+        that found its results, an analysis stored without them is not a hit and is done again.
+        """
+        measured = stats or stats_hook is not None
+        key = self.key(maze, compact, threads, costs, stop_when_reached, engine)
+        entry = self.entries.get(key)
+        if entry is not None and (entry.stats is not None or not measured):
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return shared(entry, measured, stats_hook)
+
+        self.misses += 1
+        entry = solver.analyze(maze, compact, threads, costs, stop_when_reached, engine, measured, stats_hook)
+        # every caller needs the flood, anything else is computed by the shared copies
+        entry.distances
+        # the hook is the caller's, it does not stay in the cache
+        entry.stats_hook = None
+        self.store(key, entry)
+        return shared(entry, measured, stats_hook)
+
+    def store(self, key, entry):
+        size = entry_size(entry)
+        if size > self.budget:
+            return
+        if key in self.entries:
+            self.size -= entry_size(self.entries.pop(key))
+        self.entries[key] = entry
+        self.size += size
+        while self.size > self.budget:
+            _, old = self.entries.popitem(last=False)
+            self.size -= entry_size(old)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+def shared(entry, stats, stats_hook):
+    analyzed = entry.share()
+    analyzed.stats = dict(entry.stats) if stats else None
+    analyzed.stats_hook = stats_hook
+    return analyzed
+
+
+def entry_size(entry):
+    maze = entry.maze if entry.packed is None else entry.packed
+    return maze.nbytes + entry.distances.nbytes + entry.directions.nbytes
+
+
+default_cache = AnalysisCache()
+
+
+def analyze(maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None,
+            stats=False, stats_hook=None):
+    return default_cache.analyze(maze, compact, threads, costs, stop_when_reached, engine, stats, stats_hook)
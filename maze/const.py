@@ -1,6 +1,8 @@
 from PyQt5 import QtSvg, QtCore
 import os
 
+from . import solver
+
 CELL_SIZE = 32
 CELL_ROLE = QtCore.Qt.UserRole
 
@@ -48,10 +50,10 @@ SVG_UP = QtSvg.QSvgRenderer(UP_FILE)
 SVG_LEFT = QtSvg.QSvgRenderer(LEFT_FILE)
 SVG_RIGHT = QtSvg.QSvgRenderer(RIGHT_FILE)
 
-UP = b'^'
-DOWN = b'v'
-LEFT = b'<'
-RIGHT = b'>'
+UP = solver.UP_CODE
+DOWN = solver.DOWN_CODE
+LEFT = solver.LEFT_CODE
+RIGHT = solver.RIGHT_CODE
 
 DIRS = {
     UP: SVG_UP,
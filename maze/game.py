@@ -76,16 +76,16 @@ class Game:
 
     def is_actor_on_tile(self, row, column):
         for act in self.actors:
-            if act.direction == b'>':
+            if act.direction == const.RIGHT:
                 if act.row == row and int(act.column + 1.0) == column:
                     return True
-            elif act.direction == b'<':
+            elif act.direction == const.LEFT:
                 if act.row == row and int(act.column) == column:
                     return True
-            elif act.direction == b'^':
+            elif act.direction == const.UP:
                 if act.column == column and int(act.row) == row:
                     return True
-            elif act.direction == b'v':
+            elif act.direction == const.DOWN:
                 if act.column == column and int(act.row + 1.0) == row:
                     return True
             else:
@@ -0,0 +1,201 @@
+"""Maze generators
+
+Perfect mazes (backtracker, Kruskal, Prim) have their cells on odd rows and columns,
+the walls between them are knocked out so that any two cells are joined by exactly one path.
+All generators are seeded, the same seed gives the same maze here and in the compiled module.
+This is the pure Python fallback, the perfect mazes are slow to build for big shapes.
+"""
+import numpy
+
+MASK = 2**64 - 1
+
+
+class Random:
+    """xorshift64*, the random numbers of the compiled generators"""
+    def __init__(self, state):
+        self.state = state
+
+    def next(self):
+        state = self.state
+        state ^= state >> 12
+        state ^= (state << 25) & MASK
+        state ^= state >> 27
+        self.state = state
+        return (state * 2685821657736338717) & MASK
+
+    def below(self, count):
+        """A random number from 0 to count - 1"""
+        return (self.next() >> 32) % count
+
+
+def seed_state(seed):
+    """The generator state for a seed, any seed ``numpy.random.RandomState`` takes"""
+    return int(numpy.random.RandomState(seed).randint(1, 2**63 - 1, dtype=numpy.int64))
+
+
+def grid(shape):
+    """All walls and the cells of a perfect maze, rows and columns of cells"""
+    maze = numpy.full(shape, -1, dtype=numpy.int8)
+    return maze, max((shape[0] - 1) // 2, 0), max((shape[1] - 1) // 2, 0)
+
+
+def carve(maze, columns, node, other):
+    """Opens both cells and the wall between them"""
+    row, column = 2*(node // columns) + 1, 2*(node % columns) + 1
+    orow, ocolumn = 2*(other // columns) + 1, 2*(other % columns) + 1
+    maze[row, column] = maze[orow, ocolumn] = 0
+    maze[(row + orow) // 2, (column + ocolumn) // 2] = 0
+
+
+def neighbours(rows, columns, node):
+    """Up, down, left, right"""
+    around = []
+    if node >= columns:
+        around.append(node - columns)
+    if node + columns < rows*columns:
+        around.append(node + columns)
+    if node % columns > 0:
+        around.append(node - 1)
+    if node % columns < columns - 1:
+        around.append(node + 1)
+    return around
+
+
+def backtracker(shape, seed=None):
+    """A perfect maze by a depth-first search that backtracks from dead ends, long winding corridors"""
+    maze, rows, columns = grid(shape)
+    if not rows or not columns:
+        return maze
+    random = Random(seed_state(seed))
+    visited = numpy.zeros(rows*columns, dtype=bool)
+    node = random.below(rows*columns)
+    visited[node] = True
+    maze[2*(node // columns) + 1, 2*(node % columns) + 1] = 0
+    stack = [node]
+    while stack:
+        node = stack[-1]
+        unvisited = [other for other in neighbours(rows, columns, node) if not visited[other]]
+        if not unvisited:
+            stack.pop()
+            continue
+        other = unvisited[random.below(len(unvisited))]
+        visited[other] = True
+        carve(maze, columns, node, other)
+        stack.append(other)
+    return maze
+
+
+def find(parents, node):
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
+
+def kruskal(shape, seed=None):
+    """A perfect maze by joining cells over the walls in a random order, short dead ends everywhere"""
+    maze, rows, columns = grid(shape)
+    if not rows or not columns:
+        return maze
+    random = Random(seed_state(seed))
+    # node*2 for the wall on the right and node*2 + 1 for the one below
+    edges = []
+    for node in range(rows*columns):
+        if node % columns < columns - 1:
+            edges.append(2*node)
+        if node + columns < rows*columns:
+            edges.append(2*node + 1)
+    # Fisher-Yates
+    for i in range(len(edges) - 1, 0, -1):
+        j = random.below(i + 1)
+        edges[i], edges[j] = edges[j], edges[i]
+    if rows*columns == 1:
+        maze[1, 1] = 0
+    parents = list(range(rows*columns))
+    for edge in edges:
+        node = edge // 2
+        other = node + (columns if edge & 1 else 1)
+        first, second = find(parents, node), find(parents, other)
+        if first != second:
+            parents[first] = second
+            carve(maze, columns, node, other)
+    return maze
+
+
+def prim(shape, seed=None):
+    """A perfect maze grown from one cell by adding random cells next to it, many short branches"""
+    maze, rows, columns = grid(shape)
+    if not rows or not columns:
+        return maze
+    random = Random(seed_state(seed))
+    # 0 outside, 1 in the frontier, 2 in the maze
+    states = numpy.zeros(rows*columns, dtype=numpy.uint8)
+    frontier = []
+    node = random.below(rows*columns)
+    maze[2*(node // columns) + 1, 2*(node % columns) + 1] = 0
+    while True:
+        states[node] = 2
+        for other in neighbours(rows, columns, node):
+            if states[other] == 0:
+                states[other] = 1
+                frontier.append(other)
+        if not frontier:
+            break
+        i = random.below(len(frontier))
+        node = frontier[i]
+        frontier[i] = frontier[-1]
+        frontier.pop()
+        joined = [other for other in neighbours(rows, columns, node) if states[other] == 2]
+        carve(maze, columns, node, joined[random.below(len(joined))])
+    return maze
+
+
+def random_walls(shape, density=0.3, seed=None):
+    """Each cell is a wall with the probability ``density``"""
+    rng = numpy.random.RandomState(seed)
+    # bytes rather than floats, a tenth of the memory for big mazes
+    walls = rng.randint(0, 256, size=shape, dtype=numpy.uint8) < int(round(density*256))
+    return -walls.view(numpy.int8)
+
+
+def caves(shape, density=0.45, steps=4, seed=None):
+    """Caves by a cellular automaton smoothing random walls
+
+    In every step a cell becomes a wall when at least five of its eight neighbours are walls,
+    a wall stays one with four. Cells outside the maze count as walls.
+    """
+    walls = random_walls(shape, density, seed) < 0
+    for i in range(steps):
+        padded = numpy.ones((shape[0] + 2, shape[1] + 2), dtype=numpy.uint8)
+        padded[1:-1, 1:-1] = walls
+        count = numpy.zeros(shape, dtype=numpy.uint8)
+        for row in range(3):
+            for column in range(3):
+                if row != 1 or column != 1:
+                    count += padded[row:row + shape[0], column:column + shape[1]]
+        walls = (count >= 5) | (walls & (count >= 4))
+    return -walls.view(numpy.int8)
+
+
+def grass(shape, seed=None):
+    """No walls at all"""
+    return numpy.zeros(shape, dtype=numpy.int8)
+
+
+GENERATORS = {
+    'grass': grass,
+    'backtracker': backtracker,
+    'kruskal': kruskal,
+    'prim': prim,
+    'caves': caves,
+    'random': random_walls,
+}
+
+
+def generate(name, shape, seed=None, **options):
+    """A new maze of the shape by the generator of the name, see ``GENERATORS``"""
+    try:
+        generator = GENERATORS[name]
+    except KeyError:
+        raise ValueError('Unknown generator {!r}, use one of {}'.format(name, ', '.join(GENERATORS)))
+    return generator(tuple(shape), seed=seed, **options)
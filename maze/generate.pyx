@@ -0,0 +1,269 @@
+#cython: language_level=3
+"""Maze generators
+
+Perfect mazes (backtracker, Kruskal, Prim) have their cells on odd rows and columns,
+the walls between them are knocked out so that any two cells are joined by exactly one path.
+All generators are seeded, the same seed gives the same maze here and in the fallback.
+"""
+import numpy
+cimport numpy
+cimport cython
+
+
+# xorshift64*, small enough to be repeated exactly by the fallback
+cdef inline numpy.uint64_t next_random(numpy.uint64_t * state) nogil:
+    state[0] ^= state[0] >> 12
+    state[0] ^= state[0] << 25
+    state[0] ^= state[0] >> 27
+    return state[0] * <numpy.uint64_t>2685821657736338717
+
+
+cdef inline Py_ssize_t below(numpy.uint64_t * state, Py_ssize_t count) nogil:
+    # a random number from 0 to count - 1
+    return <Py_ssize_t>((next_random(state) >> 32) % <numpy.uint64_t>count)
+
+
+def seed_state(seed):
+    """The generator state for a seed, any seed ``numpy.random.RandomState`` takes"""
+    return int(numpy.random.RandomState(seed).randint(1, 2**63 - 1, dtype=numpy.int64))
+
+
+def grid(shape):
+    """All walls and the cells of a perfect maze, rows and columns of cells"""
+    maze = numpy.full(shape, -1, dtype=numpy.int8)
+    return maze, max((shape[0] - 1) // 2, 0), max((shape[1] - 1) // 2, 0)
+
+
+cdef inline void carve(numpy.int8_t[:, ::1] maze, Py_ssize_t columns, Py_ssize_t node, Py_ssize_t other) nogil:
+    # opens both cells and the wall between them
+    cdef Py_ssize_t row = 2*(node // columns) + 1, column = 2*(node % columns) + 1
+    cdef Py_ssize_t orow = 2*(other // columns) + 1, ocolumn = 2*(other % columns) + 1
+    maze[row, column] = maze[orow, ocolumn] = 0
+    maze[(row + orow) // 2, (column + ocolumn) // 2] = 0
+
+
+cdef inline int neighbours(Py_ssize_t rows, Py_ssize_t columns, Py_ssize_t node, Py_ssize_t * out) nogil:
+    # up, down, left, right
+    cdef int count = 0
+    if node >= columns:
+        out[count] = node - columns
+        count += 1
+    if node + columns < rows*columns:
+        out[count] = node + columns
+        count += 1
+    if node % columns > 0:
+        out[count] = node - 1
+        count += 1
+    if node % columns < columns - 1:
+        out[count] = node + 1
+        count += 1
+    return count
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef void backtracker_kernel(numpy.int8_t[:, ::1] maze, Py_ssize_t rows, Py_ssize_t columns,
+                             numpy.uint8_t[::1] visited, numpy.intp_t[::1] stack, numpy.uint64_t state) nogil:
+    cdef Py_ssize_t top = 0, node, count, free, i
+    cdef Py_ssize_t around[4]
+    cdef Py_ssize_t unvisited[4]
+    node = below(&state, rows*columns)
+    visited[node] = 1
+    maze[2*(node // columns) + 1, 2*(node % columns) + 1] = 0
+    stack[0] = node
+    top = 1
+    while top:
+        node = stack[top - 1]
+        count = neighbours(rows, columns, node, around)
+        free = 0
+        for i in range(count):
+            if not visited[around[i]]:
+                unvisited[free] = around[i]
+                free += 1
+        if not free:
+            top -= 1
+            continue
+        i = unvisited[below(&state, free)]
+        visited[i] = 1
+        carve(maze, columns, node, i)
+        stack[top] = i
+        top += 1
+
+
+def backtracker(shape, seed=None):
+    """A perfect maze by a depth-first search that backtracks from dead ends, long winding corridors"""
+    maze, rows, columns = grid(shape)
+    if rows and columns:
+        backtracker_kernel(maze, rows, columns, numpy.zeros(rows*columns, dtype=numpy.uint8),
+                           numpy.empty(rows*columns, dtype=numpy.intp), seed_state(seed))
+    return maze
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef inline Py_ssize_t find(numpy.int32_t[::1] parents, Py_ssize_t node) nogil:
+    # roots hold minus the size of their tree, other nodes their parent
+    cdef Py_ssize_t parent
+    while parents[node] >= 0:
+        parent = parents[node]
+        if parents[parent] >= 0:
+            parents[node] = parents[parent]
+        node = parent
+    return node
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef void kruskal_kernel(numpy.int8_t[:, ::1] maze, Py_ssize_t rows, Py_ssize_t columns,
+                         numpy.int32_t[::1] edges, numpy.int32_t[::1] parents, numpy.uint8_t[::1] opened,
+                         numpy.uint64_t state) nogil:
+    # edges are node*2 for the wall on the right and node*2 + 1 for the one below
+    cdef Py_ssize_t count = 0, node, row, column, i, j, first, second, edge
+    for row in range(rows):
+        for column in range(columns):
+            node = row*columns + column
+            parents[node] = -1
+            if column < columns - 1:
+                edges[count] = <numpy.int32_t>(2*node)
+                count += 1
+            if row < rows - 1:
+                edges[count] = <numpy.int32_t>(2*node + 1)
+                count += 1
+    # Fisher-Yates
+    for i in range(count - 1, 0, -1):
+        j = below(&state, i + 1)
+        edges[i], edges[j] = edges[j], edges[i]
+    for i in range(count):
+        edge = edges[i]
+        node = edge // 2
+        first = find(parents, node)
+        second = find(parents, node + (columns if edge & 1 else 1))
+        if first == second:
+            continue
+        # the smaller tree goes under the larger one, the trees stay shallow
+        if parents[first] > parents[second]:
+            first, second = second, first
+        parents[first] += parents[second]
+        parents[second] = <numpy.int32_t>first
+        # a bit for each opened wall, carving the maze here would write all over it
+        opened[edge >> 3] |= 1 << (edge & 7)
+
+    for row in range(rows):
+        for column in range(columns):
+            edge = 2*(row*columns + column)
+            maze[2*row + 1, 2*column + 1] = 0
+            if opened[edge >> 3] & (1 << (edge & 7)):
+                maze[2*row + 1, 2*column + 2] = 0
+            edge += 1
+            if opened[edge >> 3] & (1 << (edge & 7)):
+                maze[2*row + 2, 2*column + 1] = 0
+
+
+def kruskal(shape, seed=None):
+    """A perfect maze by joining cells over the walls in a random order, short dead ends everywhere"""
+    maze, rows, columns = grid(shape)
+    if rows and columns:
+        # 32 bit edges and parents, half the memory to jump around in
+        if 2*rows*columns > numpy.iinfo(numpy.int32).max:
+            raise ValueError('The maze has too many cells')
+        kruskal_kernel(maze, rows, columns, numpy.empty(2*rows*columns, dtype=numpy.int32),
+                       numpy.empty(rows*columns, dtype=numpy.int32),
+                       numpy.zeros((2*rows*columns + 7) // 8, dtype=numpy.uint8), seed_state(seed))
+    return maze
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef void prim_kernel(numpy.int8_t[:, ::1] maze, Py_ssize_t rows, Py_ssize_t columns,
+                      numpy.uint8_t[::1] states, numpy.intp_t[::1] frontier, numpy.uint64_t state) nogil:
+    # states: 0 outside, 1 in the frontier, 2 in the maze
+    cdef Py_ssize_t count = 0, node, i, around_count, inside
+    cdef Py_ssize_t around[4]
+    cdef Py_ssize_t joined[4]
+    node = below(&state, rows*columns)
+    maze[2*(node // columns) + 1, 2*(node % columns) + 1] = 0
+    while True:
+        states[node] = 2
+        around_count = neighbours(rows, columns, node, around)
+        for i in range(around_count):
+            if states[around[i]] == 0:
+                states[around[i]] = 1
+                frontier[count] = around[i]
+                count += 1
+        if not count:
+            break
+        i = below(&state, count)
+        node = frontier[i]
+        count -= 1
+        frontier[i] = frontier[count]
+        around_count = neighbours(rows, columns, node, around)
+        inside = 0
+        for i in range(around_count):
+            if states[around[i]] == 2:
+                joined[inside] = around[i]
+                inside += 1
+        carve(maze, columns, node, joined[below(&state, inside)])
+
+
+def prim(shape, seed=None):
+    """A perfect maze grown from one cell by adding random cells next to it, many short branches"""
+    maze, rows, columns = grid(shape)
+    if rows and columns:
+        prim_kernel(maze, rows, columns, numpy.zeros(rows*columns, dtype=numpy.uint8),
+                    numpy.empty(rows*columns, dtype=numpy.intp), seed_state(seed))
+    return maze
+
+
+def random_walls(shape, density=0.3, seed=None):
+    """Each cell is a wall with the probability ``density``"""
+    rng = numpy.random.RandomState(seed)
+    # bytes rather than floats, a tenth of the memory for big mazes
+    walls = rng.randint(0, 256, size=shape, dtype=numpy.uint8) < int(round(density*256))
+    return -walls.view(numpy.int8)
+
+
+def caves(shape, density=0.45, steps=4, seed=None):
+    """Caves by a cellular automaton smoothing random walls
+
+    In every step a cell becomes a wall when at least five of its eight neighbours are walls,
+    a wall stays one with four. Cells outside the maze count as walls.
+    """
+    walls = random_walls(shape, density, seed) < 0
+    for i in range(steps):
+        padded = numpy.ones((shape[0] + 2, shape[1] + 2), dtype=numpy.uint8)
+        padded[1:-1, 1:-1] = walls
+        count = numpy.zeros(shape, dtype=numpy.uint8)
+        for row in range(3):
+            for column in range(3):
+                if row != 1 or column != 1:
+                    count += padded[row:row + shape[0], column:column + shape[1]]
+        walls = (count >= 5) | (walls & (count >= 4))
+    return -walls.view(numpy.int8)
+
+
+def grass(shape, seed=None):
+    """No walls at all"""
+    return numpy.zeros(shape, dtype=numpy.int8)
+
+
+GENERATORS = {
+    'grass': grass,
+    'backtracker': backtracker,
+    'kruskal': kruskal,
+    'prim': prim,
+    'caves': caves,
+    'random': random_walls,
+}
+
+
+def generate(name, shape, seed=None, **options):
+    """A new maze of the shape by the generator of the name, see ``GENERATORS``"""
+    try:
+        generator = GENERATORS[name]
+    except KeyError:
+        raise ValueError('Unknown generator {!r}, use one of {}'.format(name, ', '.join(GENERATORS)))
+    return generator(tuple(shape), seed=seed, **options)
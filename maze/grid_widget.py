@@ -2,8 +2,9 @@ from PyQt5 import QtWidgets, QtGui, QtCore, QtSvg
 import numpy
 import asyncio
 
-from maze import analyze
 from . import const
+from .cache import analyze
+from .solver import TARGET_CODE, ComponentIndex, CutIndex
 
 
 class GridWidget(QtWidgets.QWidget):
@@ -23,6 +24,26 @@ class GridWidget(QtWidgets.QWidget):
     def logical_to_pixels(self, row, column):
         return column * self.cell_size, row * self.cell_size
 
+    @property
+    def components(self):
+        # built on the first reachability check, edits keep it up to date from then on
+        if self._components is None:
+            self._components = ComponentIndex(self.array)
+        return self._components
+
+    @property
+    def cuts(self):
+        # built on the first wall of the game
+        if self._cuts is None:
+            self._cuts = CutIndex(self.array)
+        return self._cuts
+
+    def update_indices(self, changes):
+        # indices not built yet will be built from the array as it is then
+        for index in self._components, self._cuts:
+            if index is not None:
+                index.update_cells(changes)
+
     def init_grid(self, array):
         """
         Saves the input array as self.array and initializes grid of the appropriate size.
@@ -36,6 +57,7 @@ class GridWidget(QtWidgets.QWidget):
             self.array[1, 1] = const.TARGET_VALUE
 
         self.analyzed_maze = None
+        self._components = self._cuts = None
         self.path_list = None
         self.all_path_cells = None
 
@@ -65,7 +87,7 @@ class GridWidget(QtWidgets.QWidget):
 
                     # draw arrows
                     if self.array[row, column] == const.GRASS_VALUE:
-                        const.DIRS[self.analyzed_maze.directions[row, column]].render(painter, rect)
+                        const.DIRS[self.analyzed_maze.direction(row, column)].render(painter, rect)
 
                     break
 
@@ -143,7 +165,7 @@ class GridWidget(QtWidgets.QWidget):
                 if len(index[0]) < 2:
                     return
 
-            old_value = const.GRASS_VALUE
+            changes = []
 
             # removes existed dude path if this dude will be removed
             if self.array[row, column] in const.DUDE_VALUE_LIST:
@@ -151,32 +173,42 @@ class GridWidget(QtWidgets.QWidget):
 
             if event.button() == QtCore.Qt.LeftButton:
                 if self.game.game_mode:
-                    old_value = self.array[row, column]
-                    self.array[row, column] = const.WALL_VALUE
+                    dudes = [self.actor_cell(act) for act in self.game.actors]
+                    if self.cuts.cuts_off(row, column, dudes):
+                        # the wall would leave a dude without any way to a castle
+                        return
+                    changes.append((row, column, const.WALL_VALUE))
                 else:
                     if self.selected in const.DUDE_VALUE_LIST or self.selected == const.TARGET_VALUE:
-                        if self.analyzed_maze.directions[row, column] == b' ':
+                        if self.array[row, column] >= 0 and not self.components.reaches_target(row, column):
                             # a player cannot give dude or target on an unreachable cell
                             return
 
                         index = numpy.where(self.array == self.selected)
                         if len(index[0]) > 0:
-                            self.array[index[0][0], index[1][0]] = const.GRASS_VALUE
+                            changes.append((index[0][0], index[1][0], const.GRASS_VALUE))
 
-                    self.array[row, column] = self.selected
+                    changes.append((row, column, self.selected))
             elif event.button() == QtCore.Qt.RightButton:
-                self.array[row, column] = const.GRASS_VALUE
+                changes.append((row, column, const.GRASS_VALUE))
             else:
                 return
 
+            undo = [(r, c, self.array[r, c]) for r, c, _ in reversed(changes)]
+            for r, c, value in changes:
+                self.array[r, c] = value
+
             # tímto zajistíme překreslení celého widgetu
             self.update()
 
             # computes new paths
-            status = self.update_path()
+            status = self.update_path(changes)
             if status:
                 # revert changes
-                self.array[row, column] = old_value
+                for r, c, value in undo:
+                    self.array[r, c] = value
+                self.analyzed_maze.update_cells(undo)
+                self.update_indices(undo)
 
     def up(self, loc):
         if loc[0] == 0:
@@ -210,28 +242,32 @@ class GridWidget(QtWidgets.QWidget):
         else:
             return 0
 
+    def actor_cell(self, act):
+        """The cell an actor is in or moving to"""
+        if act.direction == const.RIGHT:
+            row = act.row
+            column = int(act.column + 1.0)
+        elif act.direction == const.LEFT:
+            row = act.row
+            column = int(act.column)
+        elif act.direction == const.UP:
+            row = int(act.row)
+            column = act.column
+        elif act.direction == const.DOWN:
+            row = int(act.row + 1.0)
+            column = act.column
+        else:
+            row = int(act.row)
+            column = int(act.column)
+        return int(row), int(column)
+
     def compute_paths(self):
         if self.game.game_mode:
             for act in self.game.actors:
                 try:
                     index = act.kind - 2
                     old_path = self.path_list[index]
-
-                    if act.direction == b'>':
-                        row = act.row
-                        column = int(act.column + 1.0)
-                    elif act.direction == b'<':
-                        row = act.row
-                        column = int(act.column)
-                    elif act.direction == b'^':
-                        row = int(act.row)
-                        column = act.column
-                    elif act.direction == b'v':
-                        row = int(act.row + 1.0)
-                        column = act.column
-                    else:
-                        row = int(act.row)
-                        column = int(act.column)
+                    row, column = self.actor_cell(act)
 
                     self.path_list[index] = self.analyzed_maze.path(int(column), int(row))
                 except ValueError:
@@ -252,13 +288,25 @@ class GridWidget(QtWidgets.QWidget):
 
         return False
 
-    def update_path(self):
+    def update_path(self, changes=None):
+        """
+        Analyzes the maze and computes paths of the dudes.
+
+        If ``changes`` (``(row, column, value)`` triples already written to the array) are given,
+        the current analysis is repaired instead of analyzing the whole maze again.
+        The caller is then responsible for reverting them when there are unreachable dudes.
+        """
         if self.analyzed_maze:
             prev_directions = self.analyzed_maze.directions
         else:
             prev_directions = None
 
-        self.analyzed_maze = analyze(self.array)
+        if changes is not None and self.analyzed_maze:
+            self.analyzed_maze.update_cells(changes)
+            self.update_indices(changes)
+        else:
+            self.analyzed_maze = analyze(self.array, compact=True)
+            self._components = self._cuts = None
 
         if not self.path_list:
             self.path_list = [[] for x in range(const.DUDE_NUM)]
@@ -273,7 +321,8 @@ class GridWidget(QtWidgets.QWidget):
                 self.unreachable = True
                 raise ValueError('There is an unreachable dude...')
 
-            self.analyzed_maze.directions = prev_directions
+            if changes is None:
+                self.analyzed_maze.directions = prev_directions
 
         self.unreachable = False
 
@@ -282,6 +331,7 @@ class GridWidget(QtWidgets.QWidget):
         self.all_path_cells = set(flatten(self.path_list))
 
         self.directions = self.analyzed_maze.directions
+        self.codes = self.analyzed_maze.codes
 
         return hopeless_fools
 
@@ -292,7 +342,7 @@ class GridWidget(QtWidgets.QWidget):
 
         # is it game over (dude is in a castle)?
         if actor.row - int(actor.row) == 0 and actor.column - int(actor.column) == 0 \
-                and self.directions[int(actor.row), int(actor.column)] == b'X':
+                and self.codes.item(int(actor.row), int(actor.column)) == TARGET_CODE:
             self.game.game_over = True
 
         self.update()
@@ -4,11 +4,18 @@ from os.path import expanduser
 from quamash import QEventLoop
 import asyncio
 
-from . import const
+from . import const, generate, storage
 from .game import Game
 
 
 PALETTE_WIDTH = 100
+# generators in the order of the "Maze" combo box of the new maze dialog
+NEW_MAZE_GENERATORS = ['grass', 'backtracker', 'kruskal', 'prim', 'caves', 'random']
+MAZE_FILTER = "Maze Files (*.maze)"
+COMPRESSED_FILTER = "Compressed Maze Files (*.maze)"
+TEXT_FILTER = "Text Files (*.txt)"
+SAVE_FILTERS = [MAZE_FILTER, COMPRESSED_FILTER, TEXT_FILTER]
+LOAD_FILTERS = ["Mazes (*.maze *.txt)", MAZE_FILTER, TEXT_FILTER]
 
 
 class MazeGUI:
@@ -114,24 +121,29 @@ class MazeGUI:
         self.palette.setMaximumWidth(PALETTE_WIDTH)
 
     def save_dialog(self):
-        filename = QtWidgets.QFileDialog.getSaveFileName(
-            self.window, "Save file", expanduser("~"), "Text Files (*.txt)"
-        )[0]
+        filename, file_filter = QtWidgets.QFileDialog.getSaveFileName(
+            self.window, "Save file", expanduser("~"), ";;".join(SAVE_FILTERS)
+        )
 
         try:
             if filename:
-                numpy.savetxt(filename, self.grid.array)
+                if file_filter != TEXT_FILTER and not filename.endswith(('.maze', '.txt')):
+                    filename += '.maze'
+                # the analysis makes loading big mazes fast, but takes more space than the maze
+                sidecar = self.window.findChild(QtWidgets.QAction, 'actionSave_analysis').isChecked()
+                storage.save(filename, self.grid.array, self.grid.analyzed_maze,
+                             compress=file_filter == COMPRESSED_FILTER, sidecar=sidecar)
         except Exception as e:
             self.error_dialog("Error", e.__str__())
 
     def load_dialog(self):
         filename = QtWidgets.QFileDialog.getOpenFileName(
-            self.window, "Open file", expanduser("~"), "Text Files (*.txt)"
+            self.window, "Open file", expanduser("~"), ";;".join(LOAD_FILTERS)
         )[0]
 
         try:
             if filename:
-                self.grid.init_grid(numpy.loadtxt(filename, dtype=numpy.int8))
+                self.grid.init_grid(storage.load(filename))
         except Exception as e:
             self.error_dialog("Error", e.__str__())
 
@@ -184,9 +196,16 @@ class MazeGUI:
         cols = dialog.findChild(QtWidgets.QSpinBox, 'widthBox').value()
         rows = dialog.findChild(QtWidgets.QSpinBox, 'heightBox').value()
 
+        generator = NEW_MAZE_GENERATORS[dialog.findChild(QtWidgets.QComboBox, 'generatorBox').currentIndex()]
+
         # Vytvoření nového bludiště
         # Bludiště může být jinak velké, tak musíme změnit velikost Gridu
-        self.grid.init_grid(numpy.zeros((rows, cols), dtype=numpy.int8))
+        array = generate.generate(generator, (rows, cols))
+        grass = numpy.argwhere(array == const.GRASS_VALUE)
+        if generator != 'grass' and len(grass):
+            # the target goes to the first open cell, the corner of caves may be a wall
+            array[tuple(grass[0])] = const.TARGET_VALUE
+        self.grid.init_grid(array)
 
         # Překreslení celého Gridu
         self.grid.update()
@@ -0,0 +1,59 @@
+import numpy
+
+
+class PackedMaze:
+    """A maze with one bit per cell for the walls, the other cells kept as lists
+
+    ``walls`` holds the rows packed by ``numpy.packbits``, a set bit is a wall.
+    ``targets`` are the ``(row, column)`` cells of the targets in row-major order,
+    ``dudes`` the ``(row, column, value)`` of the dudes. Numpy sees the maze
+    as the usual int8 array. ``analyze()`` keeps it packed until it is edited.
+    """
+    def __init__(self, shape, walls, targets=(), dudes=()):
+        self.shape = tuple(int(size) for size in shape)
+        if len(self.shape) != 2:
+            raise ValueError('Mazes have two dimensions')
+        self.walls = numpy.ascontiguousarray(walls, dtype=numpy.uint8)
+        if self.walls.shape != (self.shape[0], (self.shape[1] + 7) // 8):
+            raise ValueError('The walls do not match the maze shape')
+        targets = numpy.array(targets, dtype=numpy.intp).reshape(-1, 2)
+        # the flood queues the targets in the same order as from the int8 maze
+        self.targets = targets[numpy.lexsort((targets[:, 1], targets[:, 0]))]
+        self.dudes = numpy.array(dudes, dtype=numpy.intp).reshape(-1, 3)
+        for cells in self.targets, self.dudes[:, :2]:
+            if ((cells < 0) | (cells >= numpy.array(self.shape))).any():
+                raise IndexError('The cells are out of the maze')
+            if self.is_wall(cells[:, 0], cells[:, 1]).any():
+                raise ValueError('Targets and dudes cannot be in walls')
+
+    def __array__(self, dtype=None, copy=None):
+        maze = self.unpack()
+        return maze if dtype is None else maze.astype(dtype, copy=False)
+
+    @property
+    def nbytes(self):
+        return self.walls.nbytes + self.targets.nbytes + self.dudes.nbytes
+
+    def copy(self):
+        return PackedMaze(self.shape, self.walls.copy(), self.targets, self.dudes)
+
+    def is_wall(self, row, column):
+        return (self.walls[row, column >> 3] >> (7 - (column & 7))) & 1 == 1
+
+    def unpack(self):
+        """The maze as an int8 array"""
+        walls = numpy.unpackbits(self.walls, axis=1, count=self.shape[1])
+        maze = numpy.negative(walls.view(numpy.int8), out=walls.view(numpy.int8))
+        maze[self.targets[:, 0], self.targets[:, 1]] = 1
+        maze[self.dudes[:, 0], self.dudes[:, 1]] = self.dudes[:, 2]
+        return maze
+
+
+def pack(maze):
+    """The int8 maze as a ``PackedMaze``"""
+    maze = numpy.asarray(maze)
+    if maze.ndim != 2:
+        raise ValueError('Mazes have two dimensions')
+    dudes = numpy.argwhere(maze >= 2)
+    return PackedMaze(maze.shape, numpy.packbits(maze < 0, axis=1), numpy.argwhere(maze == 1),
+                      numpy.column_stack((dudes, maze[tuple(dudes.T)])))
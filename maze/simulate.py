@@ -0,0 +1,132 @@
+"""Headless games on a virtual clock
+
+The actors run by the rules of the game, see ``maze.actors``, but their time only moves
+when the simulation advances it, in fixed ticks and without sleeping. Their random numbers
+come from a seeded generator, so the same maze and seed always give the same game.
+"""
+import math
+import random
+
+import numpy
+
+from . import solver
+from .actors.accelerator import Accelerator
+from .actors.jumper import Jumper
+from .actors.scatterbrain import Scatterbrain
+from .actors.speedster import Speedster
+from .actors.teleporter import Teleporter
+
+# the dudes of the maze, as in maze.game
+ACTORS = {
+    2: Scatterbrain,
+    3: Speedster,
+    4: Accelerator,
+    5: Teleporter,
+    6: Jumper,
+}
+# as const.CELL_SIZE, which cannot be imported without Qt
+CELL_SIZE = 32
+
+
+class Wake:
+    """What a sleeping actor waits for, the time it wakes up at"""
+    def __init__(self, time):
+        self.time = time
+
+    def __await__(self):
+        # the simulation gets this from the actor's behavior and resumes it when the time comes
+        yield self
+
+
+class VirtualClock:
+    """Time that moves only when the simulation says so, see ``Actor`` for the interface"""
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        return Wake(self.now + seconds)
+
+
+class Simulation:
+    """A game of the maze played without a display
+
+    The dudes become actors as in the game. The simulation is the grid they move on,
+    it has the ``codes``, ``analyzed_maze``, ``path_list`` and ``update_actor``
+    of ``GridWidget``. ``tick`` is the step of the virtual clock in seconds,
+    actors that sleep wake up on the first tick after their time.
+    """
+    def __init__(self, maze, seed=None, tick=0.001, cell_size=CELL_SIZE):
+        self.array = numpy.array(maze, dtype=numpy.int8)
+        self.tick = tick
+        self.cell_size = cell_size
+        self.clock = VirtualClock()
+        self.random = random.Random(seed)
+        self.analyzed_maze = solver.analyze(self.array, compact=True)
+        self.codes = self.analyzed_maze.codes
+
+        self.actors = []
+        self.path_list = [[] for kind in ACTORS]
+        for index, (kind, actor) in enumerate(sorted(ACTORS.items())):
+            cells = numpy.argwhere(self.array == kind)
+            if not len(cells):
+                continue
+            row, column = (int(i) for i in cells[0])
+            try:
+                self.path_list[index] = self.analyzed_maze.path(row, column)
+            except ValueError:
+                raise ValueError('The dude at ({}, {}) cannot reach a target'.format(row, column))
+            self.actors.append(actor(self, row, column, kind, clock=self.clock, rng=self.random))
+            self.array[row, column] = 0
+
+        self.arrivals = {}
+        self.game_over = False
+
+    def update_actor(self, actor):
+        # the game is over when a dude stands in a castle
+        if actor.row - int(actor.row) == 0 and actor.column - int(actor.column) == 0 \
+                and self.codes.item(int(actor.row), int(actor.column)) == solver.TARGET_CODE:
+            self.game_over = True
+            self.arrivals.setdefault(actor.kind, self.clock.now)
+
+    def run(self, everyone=False, limit=3600):
+        """Plays the game until it is over, returns the arrival times
+
+        The game is over when the first dude arrives, with ``everyone`` when all of them do.
+        Returns a dict of the seconds each arrived dude took by its kind, dudes that
+        did not arrive in ``limit`` seconds of the game are left out.
+        """
+        behaviors = [(actor, actor.behavior()) for actor in self.actors]
+        wakes = [0]*len(behaviors)
+        ticks = 0
+        while behaviors and not (self.game_over and not everyone):
+            # ticks when nobody wakes up change nothing, they are skipped
+            ticks = max(ticks, min(wakes))
+            self.clock.now = ticks*self.tick
+            if self.clock.now > limit:
+                break
+            finished = False
+            for i, (actor, behavior) in enumerate(behaviors):
+                if wakes[i] > ticks:
+                    continue
+                try:
+                    wake = behavior.send(None)
+                except StopIteration:
+                    wakes[i] = None
+                    finished = True
+                    continue
+                wakes[i] = max(math.ceil(wake.time/self.tick - 1e-9), ticks + 1)
+            if finished:
+                behaviors = [behavior for behavior, wake in zip(behaviors, wakes) if wake is not None]
+                wakes = [wake for wake in wakes if wake is not None]
+            ticks += 1
+        for _, behavior in behaviors:
+            behavior.close()
+        return dict(self.arrivals)
+
+
+def simulate(maze, seed=None, everyone=False, limit=3600, tick=0.001):
+    """Plays a game of the maze headless, see ``Simulation.run``"""
+    return Simulation(maze, seed, tick).run(everyone, limit)
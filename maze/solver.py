@@ -1,7 +1,11 @@
-import queue
+import collections
+import heapq
+import time
 
 import numpy
 
+from .packed import PackedMaze
+
 
 def up(maze, loc):
     if loc[0] == 0:
@@ -27,6 +31,30 @@ def right(maze, loc):
     return loc[0], loc[1] + 1
 
 
+# Named direction codes, the directions array viewed as uint8 holds these
+WALL_CODE = ord('#')
+SPACE_CODE = ord(' ')
+TARGET_CODE = ord('X')
+UP_CODE = ord('^')
+DOWN_CODE = ord('v')
+LEFT_CODE = ord('<')
+RIGHT_CODE = ord('>')
+UNKNOWN_CODE = ord('?')
+
+
+def distance_dtype(shape, cost=1):
+    """The smallest dtype able to hold any distance in a maze of this shape
+
+    ``cost`` is the most a single step can cost.
+    """
+    # no path has more steps than the maze has cells and -1 is kept for unreachable cells
+    longest = cost*(shape[0]*shape[1] - 1)
+    for dtype in numpy.int16, numpy.int32:
+        if longest <= numpy.iinfo(dtype).max:
+            return numpy.dtype(dtype)
+    return numpy.dtype(numpy.int64)
+
+
 def ends(maze):
     return numpy.asarray(numpy.where(maze == 1)).T
 
@@ -45,12 +73,16 @@ ANTIDIRS = {
     up: b'v'
 }
 
+ARROWS = {func: char for char, func in DIRS.items()}
+
 
 def arrows_to_path(arrows, loc):
     if arrows[loc] == b'#':
         raise ValueError('Cannot construct path for wall')
     if arrows[loc] == b' ':
         raise ValueError('Cannot construct path for unreachable cell')
+    if arrows[loc] == b'?':
+        raise ValueError('Cannot construct path for cell the flood did not get to')
     path = [loc]
 
     nloc = loc
@@ -61,47 +93,1115 @@ def arrows_to_path(arrows, loc):
     return path
 
 
-def flood(maze):
-    distances = numpy.full(maze.shape, -1, dtype=numpy.int)
+def arrows_to_paths(arrows, starts):
+    """Paths from many starts at once, in one contiguous array
+
+    Returns ``steps``, an int32 array of the ``(row, column)`` steps of all paths
+    one after another, and ``offsets``, path ``i`` is ``steps[offsets[i]:offsets[i + 1]]``.
+    Walls, unreachable starts and starts the flood did not get to get empty paths.
+    """
+    starts = numpy.asarray(starts, dtype=numpy.intp).reshape(-1, 2)
+    offsets = numpy.zeros(len(starts) + 1, dtype=numpy.intp)
+    paths = []
+    for i, (row, column) in enumerate(starts):
+        if not (0 <= row < arrows.shape[0] and 0 <= column < arrows.shape[1]):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        path = []
+        if arrows[row, column] not in (b'#', b' ', b'?'):
+            path = arrows_to_path(arrows, (row, column))
+        paths.extend(path)
+        offsets[i + 1] = offsets[i] + len(path)
+    return numpy.array(paths, dtype=numpy.int32).reshape(-1, 2), offsets
+
+
+def flood_weighted(maze, costs, compact=False, stats=None):
+    """Floods the maze where a step costs as much as the cell it leaves
+
+    Dijkstra on a ring of FIFO buckets, one for each distance modulo
+    the largest cost plus one. The first neighbour to reach a cell
+    is the closest one, so cells are marked when queued.
+    """
+    if stats is not None:
+        start = time.perf_counter()
+    costs = numpy.asarray(costs)
+    if costs.shape != maze.shape:
+        raise ValueError('The costs do not match the maze shape')
+    used = costs[maze >= 0]
+    if used.size and (used.min() < 1 or used.max() > 255):
+        raise ValueError('Costs of open cells have to be between 1 and 255')
+    longest = int(used.max()) if used.size else 1
+    dtype = distance_dtype(maze.shape, longest) if compact else numpy.int64
 
-    # Initialize everything as walls
     directions = numpy.full(maze.shape, b'#', dtype=('a', 1))
-    # Add spaces where there are no walls
+    distances = numpy.full(maze.shape, -1, dtype=dtype)
     directions[maze >= 0] = b' '
-
-    jobs = queue.Queue()
+    buckets = [collections.deque() for i in range(longest + 1)]
     for end in ends(maze):
-        jobs.put((tuple(end), 0, b'X'))
+        end = tuple(end)
+        directions[end] = b'X'
+        distances[end] = 0
+        buckets[0].append(end)
+
+    if stats is not None:
+        seeded = time.perf_counter()
+    dist = 0
+    pending = peak = queued = len(buckets[0])
+    while pending:
+        bucket = buckets[dist % len(buckets)]
+        while bucket:
+            loc = bucket.popleft()
+            pending -= 1
+            for func in (down, up, left, right):
+                try:
+                    nloc = func(maze, loc)
+                except ValueError:
+                    continue
+                if directions[nloc] == b' ':
+                    directions[nloc] = ANTIDIRS[func]
+                    distances[nloc] = dist + costs[nloc]
+                    buckets[distances[nloc] % len(buckets)].append(nloc)
+                    pending += 1
+                    queued += 1
+            peak = max(peak, pending)
+        dist += 1
+    if stats is not None:
+        # every cell queued is taken before the loop ends
+        record_flood(stats, start, seeded, queued, queued, peak)
+    return distances, directions
+
+
+def record_flood(stats, start, seeded, enqueued, settled, peak=None):
+    """Adds the counters of a flood that started at ``start`` and queued its targets by ``seeded``
+
+    ``enqueued`` and ``settled`` are the cells queued and taken from the queue,
+    ``peak`` the most cells queued at once. Floods mark cells when
+    they queue them, so they never have stale jobs, ``repair`` may.
+    The times are ``time.perf_counter`` seconds, setup is everything before the search.
+    """
+    done = time.perf_counter()
+    stats['setup_seconds'] = stats.get('setup_seconds', 0) + seeded - start
+    stats['bfs_seconds'] = stats.get('bfs_seconds', 0) + done - seeded
+    stats['enqueued'] = stats.get('enqueued', 0) + enqueued
+    stats['stale'] = stats.get('stale', 0)
+    stats['settled'] = stats.get('settled', 0) + settled
+    if peak is not None:
+        stats['peak'] = max(stats.get('peak', 0), peak)
+
+
+# Flood engines of the compiled solver, the queue one unless told otherwise
+ENGINES = ('queue', 'bitparallel')
+
+
+def check_engine(engine, threads=None, costs=None, stop_when_reached=None, owners=False):
+    """Whether the bit-parallel engine is asked for"""
+    if engine is not None and engine not in ENGINES:
+        raise ValueError('Unknown flood engine {!r}, use one of {}'.format(engine, ', '.join(ENGINES)))
+    if engine != 'bitparallel':
+        return False
+    if threads is not None or costs is not None or stop_when_reached is not None or owners:
+        raise ValueError('The bit-parallel engine does only the plain flood')
+    return True
+
+
+def flood(maze, compact=False, threads=None, costs=None, stop_when_reached=None, owners=False, engine=None,
+          stats=None):
+    """Floods the maze from all targets at once, one distance level per step
+
+    The frontier is kept as flat indices into the maze padded with walls,
+    so each step expands it with four vectorized index shifts.
+    A cell points to the first neighbour one step closer to a target
+    in the order up, down, left, right.
+    ``threads`` and ``engine`` are accepted for compatibility with the compiled flood and ignored,
+    this flood already expands whole levels at once.
+    With ``costs`` the flood is weighted, see ``flood_weighted``.
+    With ``stop_when_reached`` (``(row, column)`` cells) the flood stops after the level
+    where all of them have their distances, cells it did not get to are '?'.
+    With ``owners`` an int16 array of the index of the target each cell leads to,
+    in the order of ``ends()``, is returned as well, -1 for walls and cells that reach none.
+    A ``PackedMaze`` is unpacked first.
+    ``stats``, a dict, gets the counters of the flood, see ``record_flood``.
+    """
+    check_engine(engine, threads, costs, stop_when_reached, owners)
+    if stats is not None:
+        start = time.perf_counter()
+    if isinstance(maze, PackedMaze):
+        maze = maze.unpack()
+    if owners and costs is not None:
+        raise ValueError('Only the plain flood can find owners')
+    if stop_when_reached is not None:
+        if costs is not None:
+            raise ValueError('Only the plain flood can stop early')
+        stops = numpy.array(stop_when_reached, dtype=numpy.intp).reshape(-1, 2)
+        if ((stops < 0) | (stops >= numpy.array(maze.shape))).any():
+            raise IndexError('The cells are out of the maze')
+    if costs is not None:
+        if stats is not None:
+            stats['setup_seconds'] = stats.get('setup_seconds', 0) + time.perf_counter() - start
+        return flood_weighted(maze, costs, compact, stats)
+    # compact distances are int16 or int32 depending on the maze size, int64 otherwise
+    dtype = distance_dtype(maze.shape) if compact else numpy.int64
+    height, width = maze.shape[0] + 2, maze.shape[1] + 2
+
+    padded = numpy.full((height, width), -1, dtype=numpy.int8)
+    padded[1:-1, 1:-1] = maze
+    padded = padded.ravel()
+
+    # Initialize everything as walls
+    codes = numpy.full(padded.shape, WALL_CODE, dtype=numpy.uint8)
+    distances = numpy.full(padded.shape, -1, dtype=dtype)
+    # Add spaces where there are no walls
+    free = padded >= 0
+    codes[free] = SPACE_CODE
+
+    if stop_when_reached is not None:
+        stops = (stops[:, 0] + 1)*width + stops[:, 1] + 1
+
+    frontier = numpy.flatnonzero(padded == 1)
+    free[frontier] = False
+    codes[frontier] = TARGET_CODE
+    distances[frontier] = 0
+    if owners:
+        if frontier.size > numpy.iinfo(numpy.int16).max:
+            raise ValueError('The maze has more targets than int16 owners can tell apart')
+        owners = numpy.full(padded.shape, -1, dtype=numpy.int16)
+        owners[frontier] = numpy.arange(frontier.size)
+
+    # Shift from the frontier to the new cell and the arrow leading back, by priority
+    steps = [(width, UP_CODE), (-width, DOWN_CODE), (1, LEFT_CODE), (-1, RIGHT_CODE)]
+    if stats is not None:
+        seeded = time.perf_counter()
+    # a frontier is queued and taken as a whole
+    settled = peak = frontier.size
+    dist = 0
+    while frontier.size:
+        if stop_when_reached is not None and not free[stops].any():
+            # cells not reached yet are not computed
+            codes[free] = UNKNOWN_CODE
+            break
+        dist += 1
+        reached = []
+        for shift, code in steps:
+            cells = frontier + shift
+            cells = cells[free[cells]]
+            free[cells] = False
+            codes[cells] = code
+            if owners is not False:
+                owners[cells] = owners[cells - shift]
+            reached.append(cells)
+        frontier = numpy.concatenate(reached)
+        distances[frontier] = dist
+        settled += frontier.size
+        peak = max(peak, frontier.size)
+
+    distances = distances.reshape(height, width)[1:-1, 1:-1].copy()
+    directions = codes.reshape(height, width)[1:-1, 1:-1].copy().view(('a', 1))
+    if stats is not None:
+        record_flood(stats, start, seeded, settled, settled, peak)
+    if owners is False:
+        return distances, directions
+    return distances, directions, owners.reshape(height, width)[1:-1, 1:-1].copy()
 
-    while not jobs.empty():
-        loc, dist, char = jobs.get()
-        # It's a wall or we've been there better
+
+def relax_tile(maze, distances, first, last):
+    """Floods the cells from ``first`` to ``last`` of a tile whose other cells are fixed
+
+    Every cell inside takes the smallest distance of its neighbours plus one,
+    until none changes. Returns bits of the changed edges:
+    1 top, 2 bottom, 4 left, 8 right, 16 if anything changed.
+    """
+    inside = numpy.zeros(maze.shape, dtype=bool)
+    inside[first[0]:last[0], first[1]:last[1]] = maze[first[0]:last[0], first[1]:last[1]] >= 0
+    unknown = numpy.iinfo(numpy.int64).max // 2
+    work = numpy.where(distances < 0, unknown, distances).astype(numpy.int64)
+    while True:
+        closest = numpy.full(work.shape, unknown, dtype=numpy.int64)
+        closest[1:] = work[:-1]
+        closest[:-1] = numpy.minimum(closest[:-1], work[1:])
+        closest[:, 1:] = numpy.minimum(closest[:, 1:], work[:, :-1])
+        closest[:, :-1] = numpy.minimum(closest[:, :-1], work[:, 1:])
+        better = inside & (closest + 1 < work)
+        if not better.any():
+            break
+        work[better] = closest[better] + 1
+
+    lowered = inside & (work != numpy.where(distances < 0, unknown, distances))
+    distances[lowered] = work[lowered]
+    tile = lowered[first[0]:last[0], first[1]:last[1]]
+    if not tile.any():
+        return 0
+    return 16 | tile[0].any() | tile[-1].any() << 1 | tile[:, 0].any() << 2 | tile[:, -1].any() << 3
+
+
+def arrows_tile(maze, distances, first, last):
+    """The directions of the cells from ``first`` to ``last`` of a tile and how many reach a target"""
+    padded = numpy.full((maze.shape[0] + 2, maze.shape[1] + 2), -1, dtype=numpy.int64)
+    padded[1:-1, 1:-1] = distances
+    rows, columns = slice(first[0] + 1, last[0] + 1), slice(first[1] + 1, last[1] + 1)
+    dist = padded[rows, columns]
+    directions = numpy.full(dist.shape, b' ', dtype=('a', 1))
+    # the first neighbour one step closer in the order up, down, left, right wins
+    for arrow, (row, column) in ((b'>', (0, 1)), (b'<', (0, -1)), (b'v', (1, 0)), (b'^', (-1, 0))):
+        neighbour = padded[rows.start + row:rows.stop + row, columns.start + column:columns.stop + column]
+        directions[(dist > 0) & (neighbour == dist - 1)] = arrow
+    cells = maze[first[0]:last[0], first[1]:last[1]]
+    directions[cells == 1] = b'X'
+    directions[cells < 0] = b'#'
+    return directions, int(numpy.count_nonzero((dist >= 0) & (cells >= 0)))
+
+
+def tiles(shape, tile):
+    """The tiles of the maze as ``(row, column)`` slices of them and of the cells around them"""
+    for row in range(0, shape[0], tile):
+        for column in range(0, shape[1], tile):
+            yield ((slice(row, min(row + tile, shape[0])), slice(column, min(column + tile, shape[1]))),
+                   (slice(max(row - 1, 0), min(row + tile + 1, shape[0])),
+                    slice(max(column - 1, 0), min(column + tile + 1, shape[1]))))
+
+
+def flood_tiled(maze, distances, directions, tile=1024):
+    """Floods the maze one tile at a time, for mazes too big for memory
+
+    ``maze``, ``distances`` and ``directions`` can be memory mapped, only one tile
+    and the cells around it are copied to memory at once. Tiles are flooded again
+    whenever a neighbouring tile lowers the distances of its edge, until none does.
+    A cell points to the first neighbour one step closer in the order up, down, left, right.
+    Returns the number of cells that cannot reach any target.
+    """
+    shape = maze.shape
+    if distances.shape != shape or directions.shape != shape:
+        raise ValueError('The arrays do not match the maze shape')
+    if directions.dtype != numpy.dtype(('a', 1)):
+        raise ValueError('The directions have to be single characters')
+    if tile < 1:
+        raise ValueError('Tiles have at least one cell')
+    layout = list(tiles(shape, tile))
+    free = 0
+    # a tile at a time, rows of very wide mazes do not fit in memory either
+    for (rows, cols), _ in layout:
+        block = numpy.asarray(maze[rows, cols])
+        distances[rows, cols] = numpy.where(block == 1, 0, -1)
+        free += numpy.count_nonzero(block >= 0)
+
+    columns = (shape[1] + tile - 1) // tile
+    dirty = numpy.ones(len(layout), dtype=bool)
+    forward = True
+    while dirty.any():
+        # sweeping both ways carries distances across the maze in fewer passes
+        for index in (range(len(layout)) if forward else reversed(range(len(layout)))):
+            if not dirty[index]:
+                continue
+            dirty[index] = False
+            (rows, cols), (hrows, hcols) = layout[index]
+            first = rows.start - hrows.start, cols.start - hcols.start
+            last = rows.stop - hrows.start, cols.stop - hcols.start
+            local = numpy.array(distances[hrows, hcols])
+            changed = relax_tile(numpy.asarray(maze[hrows, hcols]), local, first, last)
+            if not changed:
+                continue
+            distances[rows, cols] = local[first[0]:last[0], first[1]:last[1]]
+            for bit, neighbour, exists in ((1, index - columns, rows.start > 0),
+                                           (2, index + columns, rows.stop < shape[0]),
+                                           (4, index - 1, cols.start > 0),
+                                           (8, index + 1, cols.stop < shape[1])):
+                if changed & bit and exists:
+                    dirty[neighbour] = True
+        forward = not forward
+
+    reached = 0
+    for (rows, cols), (hrows, hcols) in layout:
+        first = rows.start - hrows.start, cols.start - hcols.start
+        last = rows.stop - hrows.start, cols.stop - hcols.start
+        arrows, count = arrows_tile(numpy.asarray(maze[hrows, hcols]), numpy.asarray(distances[hrows, hcols]),
+                                    first, last)
+        directions[rows, cols] = arrows
+        reached += count
+    return free - reached
+
+
+def neighbours(maze, loc):
+    for func in [up, left, right, down]:
+        try:
+            yield func, func(maze, loc)
+        except ValueError:
+            # Out of matrix
+            pass
+
+
+def invalidate(distances, directions, owners, root, region):
+    # Forgets the root and every cell whose arrows lead through it
+    if distances[root] < 0:
+        return 0
+    start = len(region)
+    distances[root] = -1
+    directions[root] = b' '
+    if owners is not None:
+        owners[root] = -1
+    region.append(root)
+    i = start
+    while i < len(region):
+        loc = region[i]
+        i += 1
+        for func, nloc in neighbours(directions, loc):
+            if directions[nloc] == ANTIDIRS[func]:
+                distances[nloc] = -1
+                directions[nloc] = b' '
+                if owners is not None:
+                    owners[nloc] = -1
+                region.append(nloc)
+    return len(region) - start
+
+
+def repair(distances, directions, changes, owners=None, stats=None):
+    """Repairs the flood results in place after cells of the maze were edited
+
+    ``changes`` are ``(row, column, value)`` triples with the new values.
+    ``owners`` from ``flood`` are repaired too, as long as no target is added or removed.
+    ``stats``, a dict, gets the jobs enqueued, the stale ones skipped and the cells settled.
+    Returns the change in the number of unreachable cells.
+    """
+    delta = 0
+    region = []
+    seeds = []
+    # a cell edited more than once in the batch only gets its last value
+    last = {}
+    for row, column, value in changes:
+        last[int(row), int(column)] = int(value)
+    changes = [(row, column, value) for (row, column), value in last.items()]
+    for row, column, value in changes:
+        if owners is not None and (value == 1) != (directions[row, column] == b'X'):
+            raise ValueError('Owners cannot be repaired when targets change')
+
+    # Walls and removed targets break the paths leading through them
+    for row, column, value in changes:
+        old = directions[row, column]
+        if value < 0 and old != b'#' or value != 1 and old == b'X':
+            delta += invalidate(distances, directions, owners, (row, column), region)
+
+    for row, column, value in changes:
+        loc = (row, column)
+        old = directions[loc]
+        if value < 0:
+            if old == b' ':
+                delta -= 1
+            distances[loc] = -1
+            directions[loc] = b'#'
+        elif value == 1:
+            if old == b'#':
+                directions[loc] = b' '
+                delta += 1
+            seeds.append((0, loc, b'X'))
+        elif old == b'#':
+            directions[loc] = b' '
+            delta += 1
+            region.append(loc)
+
+    # The region is entered from its settled border
+    for loc in region:
+        if directions[loc] != b' ':
+            continue
+        best = None
+        for func, nloc in neighbours(directions, loc):
+            if distances[nloc] >= 0 and (best is None or distances[nloc] + 1 < best[0]):
+                best = (distances[nloc] + 1, loc, ARROWS[func])
+        if best:
+            seeds.append(best)
+    seeds.sort(key=lambda seed: seed[0])
+
+    # Merging the sorted seeds with the FIFO keeps the jobs ordered by distance
+    jobs = collections.deque()
+    i = taken = settled = 0
+    while i < len(seeds) or jobs:
+        if i < len(seeds) and (not jobs or seeds[i][0] <= jobs[0][0]):
+            dist, loc, char = seeds[i]
+            i += 1
+        else:
+            dist, loc, char = jobs.popleft()
+        taken += 1
         if directions[loc] == b'#' or 0 <= distances[loc] <= dist:
             continue
+        settled += 1
+        if distances[loc] < 0:
+            delta -= 1
         directions[loc] = char
         distances[loc] = dist
-        for func in [up, left, right, down]:
-            try:
-                jobs.put((func(maze, loc), dist+1, ANTIDIRS[func]))
-            except ValueError:
-                # Out of matrix
-                pass
+        if owners is not None and char != b'X':
+            # the cell belongs to the target of the neighbour its arrow points to
+            owners[loc] = owners[DIRS[char](directions, loc)]
+        for func, nloc in neighbours(directions, loc):
+            if directions[nloc] != b'#' and not 0 <= distances[nloc] <= dist + 1:
+                jobs.append((dist + 1, nloc, ANTIDIRS[func]))
 
-    return distances, directions
+    if stats is not None:
+        # every job queued is taken before the loop ends
+        stats['enqueued'] = stats.get('enqueued', 0) + taken
+        stats['stale'] = stats.get('stale', 0) + taken - settled
+        stats['settled'] = stats.get('settled', 0) + settled
+    return delta
+
+
+def shortest_path(maze, start, goal=None, finder=None):
+    """The shortest path from ``start`` to ``goal``, or to the nearest target
+
+    A* with the Manhattan distance, without a goal it is a plain BFS
+    stopping at the first target. ``finder`` is accepted for compatibility
+    with the compiled solver and ignored.
+    """
+    maze = numpy.asarray(maze)
+    start = tuple(start)
+    for loc in (start, goal):
+        if loc is not None and not (0 <= loc[0] < maze.shape[0] and 0 <= loc[1] < maze.shape[1]):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(*loc))
+    if maze[start] < 0:
+        raise ValueError('Cannot construct path for wall')
+    if goal is not None:
+        goal = tuple(goal)
+        if maze[goal] < 0:
+            raise ValueError('Cannot construct path to wall')
+
+    def estimate(loc):
+        return 0 if goal is None else abs(loc[0] - goal[0]) + abs(loc[1] - goal[1])
+
+    costs = {start: 0}
+    back = {}
+    heap = [(estimate(start), 0, start)]
+    while heap:
+        _, cost, loc = heapq.heappop(heap)
+        cost = -cost
+        if cost > costs[loc]:
+            continue
+        if loc == goal or goal is None and maze[loc] == 1:
+            path = [loc]
+            while loc != start:
+                loc = back[loc]
+                path.append(loc)
+            return path[::-1]
+        for func, nloc in neighbours(maze, loc):
+            if maze[nloc] >= 0 and costs.get(nloc, cost + 2) > cost + 1:
+                costs[nloc] = cost + 1
+                back[nloc] = loc
+                # the lowest estimate first, among equal ones the cell furthest from the start
+                heapq.heappush(heap, (cost + 1 + estimate(nloc), -cost - 1, nloc))
+
+    raise ValueError('Cannot construct path for unreachable cell')
+
+
+def regions(owners, count=None):
+    """Cells owned by each target, in the layout of ``arrows_to_paths``
+
+    Returns ``cells``, an int32 array of the ``(row, column)`` cells of all targets
+    one after another, and ``offsets``, target ``i`` owns ``cells[offsets[i]:offsets[i + 1]]``.
+    ``count`` is the number of targets, by default one more than the largest owner.
+    """
+    owners = numpy.asarray(owners)
+    if count is None:
+        count = int(owners.max(initial=-1)) + 1
+    order = numpy.argsort(owners.ravel(), kind='stable')
+    sizes = numpy.bincount(owners.ravel() + 1, minlength=count + 1)
+    offsets = numpy.zeros(count + 1, dtype=numpy.intp)
+    numpy.cumsum(sizes[1:count + 1], out=offsets[1:])
+    order = order[sizes[0]:sizes[0] + offsets[-1]]
+    cells = numpy.empty((len(order), 2), dtype=numpy.int32)
+    cells[:, 0], cells[:, 1] = numpy.divmod(order, owners.shape[1])
+    return cells, offsets
 
 
 def is_reachable(arrows):
     return b' ' not in arrows
 
 
+def count_unreachable(arrows):
+    return numpy.count_nonzero(arrows == b' ')
+
+
 class AnalyzedMaze:
+    """Flood results of a maze, each one computed on first use and then kept
+
+    ``materialize()`` computes all of them at once.
+    With ``stop_when_reached`` the flood stops once those cells have their distances,
+    see ``flood``, and whether other cells are reachable is not known.
+    With ``stats`` (or a ``stats_hook``) ``stats`` is a dict of counters summed over
+    the work done so far, see ``record_stats``, otherwise it is None and nothing is measured.
+    A ``PackedMaze`` is kept as ``packed`` until an edit or ``maze`` needs the int8 array.
+    """
+    def __init__(self, maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None,
+                 stats=False, stats_hook=None):
+        check_engine(engine, threads, costs, stop_when_reached)
+        # an own copy, the caller may edit the maze before anything is computed
+        if isinstance(maze, PackedMaze):
+            self.packed, self._maze = maze.copy(), None
+        else:
+            self.packed, self._maze = None, numpy.array(maze, dtype=numpy.int8)
+        self.compact = compact
+        self.threads = threads
+        self.costs = costs
+        self.engine = engine
+        self.stop_when_reached = stop_when_reached
+        self.stats = {} if stats or stats_hook is not None else None
+        self.stats_hook = stats_hook
+        self.partial = False
+        self._distances = self._directions = self._unreachable = self._owners = None
+
+    def share(self):
+        """A new analysis of the same maze sharing the results computed so far
+
+        The shared arrays become read-only, the first edit of either analysis copies them.
+        """
+        shared = AnalyzedMaze(self.packed or self.maze, self.compact, self.threads, self.costs, self.stop_when_reached,
+                              self.engine, self.stats is not None, self.stats_hook)
+        for array in self._distances, self._directions, self._owners:
+            if array is not None:
+                array.flags.writeable = False
+        shared._distances, shared._directions, shared._owners = self._distances, self._directions, self._owners
+        shared._unreachable = self._unreachable
+        shared.partial = self.partial
+        return shared
+
+    @property
+    def maze(self):
+        """The maze as an int8 array, a ``PackedMaze`` is unpacked when this is first used"""
+        if self._maze is None:
+            self._maze, self.packed = self.packed.unpack(), None
+        return self._maze
+
+    def materialize(self):
+        """Computes everything that is not computed yet"""
+        # the properties keep what they compute
+        self.distances, self.unreachable
+        return self
+
+    def record_stats(self, event, values):
+        """Adds ``values`` measured by ``event`` to ``stats`` and passes them to ``stats_hook``
+
+        The events are ``'flood'`` (``floods``, the counters of ``record_flood``),
+        ``'repair'`` (``repairs``, the counters of ``repair`` and ``repair_seconds``)
+        and ``'reachable'`` (``reachable_seconds``).
+        ``peak`` keeps the largest value, the others are summed.
+        """
+        for name, value in values.items():
+            if name == 'peak':
+                self.stats[name] = max(self.stats.get(name, 0), value)
+            else:
+                self.stats[name] = self.stats.get(name, 0) + value
+        if self.stats_hook is not None:
+            self.stats_hook(event, values)
+
+    def flood(self, owners=False):
+        """Floods the maze again, with ``owners`` the owners are found in the same pass"""
+        measured = None if self.stats is None else {'floods': 1}
+        results = flood(self.packed or self.maze, self.compact, costs=self.costs,
+                        stop_when_reached=self.stop_when_reached, owners=owners, stats=measured)
+        if measured is not None:
+            self.record_stats('flood', measured)
+        self._distances, self._directions = results[:2]
+        self._owners = results[2] if owners else None
+        self.partial = self.stop_when_reached is not None and UNKNOWN_CODE in self._directions.view(numpy.uint8)
+        self._unreachable = None
+
+    @property
+    def distances(self):
+        if self._distances is None:
+            self.flood()
+        return self._distances
+
+    @property
+    def directions(self):
+        if self._directions is None:
+            self.flood()
+        return self._directions
+
+    @directions.setter
+    def directions(self, directions):
+        # the distances stay as they are, so they have to exist
+        self.distances
+        self._directions = directions
+        self._unreachable = self._owners = None
+
+    @property
+    def unreachable(self):
+        """The number of open cells that cannot reach any target, None if the flood stopped early"""
+        if self._unreachable is None:
+            directions = self.directions
+            if self.partial:
+                return None
+            if self.stats is None:
+                self._unreachable = count_unreachable(directions)
+            else:
+                start = time.perf_counter()
+                self._unreachable = count_unreachable(directions)
+                self.record_stats('reachable', {'reachable_seconds': time.perf_counter() - start})
+        return self._unreachable
+
+    @property
+    def is_reachable(self):
+        unreachable = self.unreachable
+        return None if unreachable is None else unreachable == 0
+
+    @property
+    def codes(self):
+        """The directions as an uint8 array of direction codes"""
+        return self.directions.view(numpy.uint8)
+
+    @property
+    def targets(self):
+        """Cells of the targets, target ``i`` is ``targets[i]``"""
+        return ends(self.maze) if self.packed is None else self.packed.targets.copy()
+
+    @property
+    def owners(self):
+        """The index of the target each cell leads to as an int16 array, -1 for none"""
+        if self._owners is None:
+            self.flood(owners=True)
+        return self._owners
+
+    @property
+    def region_sizes(self):
+        """The number of cells each target owns"""
+        owners = self.owners
+        return numpy.bincount(owners[owners >= 0], minlength=len(self.targets))
+
+    @property
+    def regions(self):
+        """Cells owned by each target, see ``regions``"""
+        return regions(self.owners, len(self.targets))
+
+    def region(self, index):
+        """Cells owned by the target as an ``(n, 2)`` int32 array"""
+        return numpy.argwhere(self.owners == index).astype(numpy.int32)
+
+    def direction(self, row, column):
+        """The direction code of a cell, as a plain int"""
+        return self.directions.view(numpy.uint8).item(row, column)
+
+    def path(self, column, row, as_array=False):
+        """The path from the cell to a target, an ``(n, 2)`` int32 array with ``as_array``"""
+        path = arrows_to_path(self.directions, (column, row))
+        return numpy.array(path, dtype=numpy.int32) if as_array else path
+
+    def paths(self, starts):
+        """Paths from many cells at once, see ``arrows_to_paths``"""
+        return arrows_to_paths(self.directions, starts)
+
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
+
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze to the analysis
+
+        Only the region affected by the edits is recomputed,
+        mazes with costs are flooded again.
+        """
+        costs = None if self.costs is None else numpy.asarray(self.costs)
+        # the whole batch is checked before the maze changes
+        for row, column, value in changes:
+            if not (0 <= row < self.maze.shape[0] and 0 <= column < self.maze.shape[1]):
+                raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+            if costs is not None and value >= 0 and not 1 <= costs[row, column] <= 255:
+                raise ValueError('Costs of open cells have to be between 1 and 255')
+        for row, column, value in changes:
+            if (value == 1) != (self.maze[row, column] == 1):
+                # targets are numbered in order, owners are found again when needed
+                self._owners = None
+            self.maze[row, column] = value
+
+        # nothing to repair before the first flood
+        if self._directions is None:
+            return
+        if self.partial:
+            # cells the flood did not get to cannot be repaired, it is redone when needed
+            self._distances = self._directions = self._unreachable = self._owners = None
+            self.partial = False
+            return
+        if self.costs is not None:
+            self.flood()
+            return
+        if not self._directions.flags.writeable:
+            # shared with another analysis, see share()
+            self._distances, self._directions = self._distances.copy(), self._directions.copy()
+            if self._owners is not None:
+                self._owners = self._owners.copy()
+        if self.stats is None:
+            delta = repair(self._distances, self._directions, changes, self._owners)
+        else:
+            measured = {'repairs': 1}
+            start = time.perf_counter()
+            delta = repair(self._distances, self._directions, changes, self._owners, measured)
+            measured['repair_seconds'] = time.perf_counter() - start
+            self.record_stats('repair', measured)
+        if self._unreachable is not None:
+            self._unreachable += delta
+
+
+def analyze(maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None,
+            stats=False, stats_hook=None):
+    return AnalyzedMaze(maze, compact, threads, costs, stop_when_reached, engine, stats, stats_hook)
+
+
+class ComponentIndex:
+    """Connected components of the open cells for reachability queries without a flood
+
+    A union-find over the cells, walls belong to no component.
+    Removing a wall joins the components around it in place, changing targets
+    only updates counts, a new wall may split a component, so the index is
+    built again on the next query.
+    """
     def __init__(self, maze):
-        self.distances, self.directions = flood(maze)
-        self.is_reachable = is_reachable(self.directions)
+        # an own copy, kept up to date by update_cells
+        self.maze = numpy.array(maze, dtype=numpy.int8)
+        self.build()
+
+    def build(self):
+        self.parents = {}
+        self.sizes = {}
+        self.targets = {}
+        self.lost = 0
+        for row, column in numpy.argwhere(self.maze >= 0).tolist():
+            self.open((row, column))
+            # the cells above and to the left are already open
+            for nloc in (row - 1, column), (row, column - 1):
+                if nloc in self.parents:
+                    self.join((row, column), nloc)
+        self.stale = False
+
+    def open(self, loc):
+        # A new component of one cell
+        self.parents[loc] = loc
+        self.sizes[loc] = 1
+        self.targets[loc] = int(self.maze[loc] == 1)
+        if not self.targets[loc]:
+            self.lost += 1
+
+    def find(self, loc):
+        # path halving, every other cell on the way skips to its grandparent
+        while self.parents[loc] != loc:
+            self.parents[loc] = self.parents[self.parents[loc]]
+            loc = self.parents[loc]
+        return loc
+
+    def join(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.sizes[a] < self.sizes[b]:
+            a, b = b, a
+        # a component without targets becomes reachable through the other one
+        if self.targets[a] and not self.targets[b]:
+            self.lost -= self.sizes[b]
+        elif self.targets[b] and not self.targets[a]:
+            self.lost -= self.sizes[a]
+        self.parents[b] = a
+        self.sizes[a] += self.sizes[b]
+        self.targets[a] += self.targets[b]
+
+    def label(self, row, column):
+        if not (0 <= row < self.maze.shape[0] and 0 <= column < self.maze.shape[1]):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        if self.stale:
+            self.build()
+        if (row, column) not in self.parents:
+            return None
+        return self.find((row, column))
+
+    def component(self, row, column):
+        """A label of the component of the cell, -1 for walls
+
+        Labels are the same for cells of the same component until the next edit.
+        """
+        label = self.label(row, column)
+        return -1 if label is None else label[0]*self.maze.shape[1] + label[1]
+
+    def labels(self):
+        """Labels of all cells as ``component`` gives them, in an array of the maze shape"""
+        if self.stale:
+            self.build()
+        labels = numpy.full(self.maze.shape, -1, dtype=numpy.intp)
+        for loc in self.parents:
+            root = self.find(loc)
+            labels[loc] = root[0]*self.maze.shape[1] + root[1]
+        return labels
+
+    def same_component(self, a, b):
+        """Whether open cells ``a`` and ``b`` (``(row, column)``) are connected"""
+        label = self.label(*a)
+        return label is not None and label == self.label(*b)
+
+    def reaches_target(self, row, column):
+        """Whether the cell is open and connected to a target"""
+        label = self.label(row, column)
+        return label is not None and self.targets[label] > 0
+
+    @property
+    def unreachable(self):
+        """The number of open cells that cannot reach any target"""
+        if self.stale:
+            self.build()
+        return self.lost
+
+    @property
+    def is_reachable(self):
+        return self.unreachable == 0
+
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
+
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze"""
+        for row, column, value in changes:
+            if not (0 <= row < self.maze.shape[0] and 0 <= column < self.maze.shape[1]):
+                raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+            loc = (int(row), int(column))
+            old = self.maze[loc]
+            self.maze[loc] = value
+            if self.stale or old < 0 and value < 0:
+                continue
+            if value < 0:
+                self.stale = True
+                continue
+            if old < 0:
+                self.open(loc)
+                for func, nloc in neighbours(self.maze, loc):
+                    if nloc in self.parents:
+                        self.join(loc, nloc)
+                continue
+            if (old == 1) == (value == 1):
+                continue
+            label = self.find(loc)
+            if value == 1:
+                if not self.targets[label]:
+                    self.lost -= self.sizes[label]
+                self.targets[label] += 1
+            else:
+                self.targets[label] -= 1
+                if not self.targets[label]:
+                    self.lost += self.sizes[label]
+
+
+# cells a local search of CutIndex may visit before it asks the whole index
+CUT_BUDGET = 16384
+
+
+class CutIndex:
+    """Cells whose blocking would cut others off from every target
+
+    Blocking a cell splits its component into at most four parts, one for each open
+    neighbour. A breadth first search grows them in turns, parts that meet are joined
+    and a part with a target stops growing. A part that runs out of cells without a target
+    is cut off, a single part left growing holds the targets of the component, so in open
+    areas a query visits only a few cells around the blocked one. Which cells reach a target
+    is kept up to date through edits by the same search.
+
+    When the search grows too big, a depth first search over the open cells from
+    a virtual root joined to all targets answers instead. It keeps the discovery order,
+    the end of each subtree and the lowest discovery reachable from it. Blocking a cell
+    cuts off a subtree of one of its children exactly when nothing in that subtree reaches
+    above the cell. Edits that open, close, add or remove targets make it run again
+    the next time it is needed.
+    """
+    def __init__(self, maze):
+        # an own copy, kept up to date by update_cells
+        self.maze = numpy.array(maze, dtype=numpy.int8)
+        self.build()
+
+    def build(self):
+        self.discovered = {}
+        self.lowest = {}
+        self.finished = {}
+        self.parents = {}
+        time = 1
+        for end in ends(self.maze).tolist():
+            end = tuple(end)
+            if end not in self.discovered:
+                self.parents[end] = None
+                time = self.search(end, time)
+        self.reaches = set(self.discovered)
+        self.stale = self.unknown = False
+
+    def search(self, start, time):
+        # Iterative depth first search from a target, returns the next discovery time
+        self.discovered[start] = self.lowest[start] = time
+        time += 1
+        stack = [(start, iter(list(neighbours(self.maze, start))))]
+        while stack:
+            loc, todo = stack[-1]
+            for func, nloc in todo:
+                if self.maze[nloc] < 0:
+                    continue
+                if nloc not in self.discovered:
+                    self.parents[nloc] = loc
+                    self.discovered[nloc] = self.lowest[nloc] = time
+                    time += 1
+                    # targets found deeper are joined to the root as well
+                    if self.maze[nloc] == 1:
+                        self.lowest[nloc] = 0
+                    stack.append((nloc, iter(list(neighbours(self.maze, nloc)))))
+                    break
+                if nloc != self.parents[loc]:
+                    self.lowest[loc] = min(self.lowest[loc], self.discovered[nloc])
+            else:
+                stack.pop()
+                self.finished[loc] = time - 1
+                parent = self.parents[loc]
+                if parent is not None:
+                    self.lowest[parent] = min(self.lowest[parent], self.lowest[loc])
+        return time
+
+    def separates(self, loc, other):
+        # Whether blocking loc cuts other off, other None for any cell
+        if loc not in self.discovered:
+            return False
+        if other == loc:
+            return True
+        if other is not None and other not in self.discovered:
+            return False
+        for func, child in neighbours(self.maze, loc):
+            if child not in self.discovered or self.parents[child] != loc or \
+                    self.lowest[child] < self.discovered[loc]:
+                continue
+            if other is None or self.discovered[child] <= self.discovered[other] <= self.finished[child]:
+                return True
+        return False
+
+    def split(self, loc, wanted, full):
+        # The search around the blocked cell, which has to reach a target and not be one.
+        # Returns True when a part without targets has a wanted cell, any with wanted None,
+        # and None when it gave up. With full it looks for all such parts and marks them unreachable.
+        groups = {loc: None}
+        queues, links, safe, wants = [], [], [], []
+        for func, nloc in neighbours(self.maze, loc):
+            if self.maze[nloc] >= 0:
+                groups[nloc] = len(queues)
+                links.append(len(queues))
+                queues.append([nloc])
+                safe.append(self.maze[nloc] == 1)
+                wants.append(wanted is None or nloc in wanted)
+        heads = [0]*len(queues)
+
+        def root(part):
+            while links[part] != part:
+                part = links[part]
+            return part
+
+        turn = 0
+        while True:
+            ended = [True]*len(queues)
+            for part in range(len(queues)):
+                if heads[part] < len(queues[part]):
+                    ended[root(part)] = False
+            roots = [part for part in range(len(queues)) if links[part] == part]
+            growing = sum(not safe[part] and not ended[part] for part in roots)
+            holding = sum(safe[part] for part in roots)
+            cut = any(not safe[part] and ended[part] and wants[part] for part in roots)
+            if len(roots) <= 1:
+                result = False
+                break
+            if cut and not full:
+                result = True
+                break
+            # the only part left growing holds the targets
+            if growing == 0 or growing == 1 and holding == 0:
+                result = cut
+                break
+            if len(groups) > CUT_BUDGET:
+                return None
+            # the next cell of a part still growing, in turns
+            turn = (turn + 1) % len(queues)
+            a = root(turn)
+            if safe[a] or heads[turn] == len(queues[turn]):
+                continue
+            current = queues[turn][heads[turn]]
+            heads[turn] += 1
+            for func, nloc in neighbours(self.maze, current):
+                if self.maze[nloc] < 0 or nloc == loc:
+                    continue
+                if nloc in groups:
+                    b = root(groups[nloc])
+                    if a != b:
+                        links[b] = a
+                        safe[a] = safe[a] or safe[b]
+                        wants[a] = wants[a] or wants[b]
+                    continue
+                groups[nloc] = turn
+                queues[turn].append(nloc)
+                if self.maze[nloc] == 1:
+                    safe[a] = True
+                if wanted is not None and nloc in wanted:
+                    wants[a] = True
+        if full:
+            for part, queue in enumerate(queues):
+                if ended[root(part)] and not safe[root(part)]:
+                    self.reaches.difference_update(queue)
+        return result
+
+    def spread(self, loc):
+        # Marks the cell and the open cells joined to it as reaching a target
+        self.reaches.add(loc)
+        stack = [loc]
+        while stack:
+            loc = stack.pop()
+            for func, nloc in neighbours(self.maze, loc):
+                if self.maze[nloc] >= 0 and nloc not in self.reaches:
+                    self.reaches.add(nloc)
+                    stack.append(nloc)
+
+    def follow(self, loc, old, value):
+        # Keeps reaches up to date after an edit of the cell, False when it cannot tell
+        if old == 1:
+            # whether the component has other targets is not known
+            return False
+        if value < 0:
+            if loc not in self.reaches:
+                return True
+            self.reaches.discard(loc)
+            return self.split(loc, None, True) is not None
+        # an opened wall reaches a target through its neighbours
+        if value != 1 and not any(self.maze[nloc] >= 0 and nloc in self.reaches
+                                  for func, nloc in neighbours(self.maze, loc)):
+            return True
+        self.spread(loc)
+        return True
+
+    def check(self, row, column):
+        if not (0 <= row < self.maze.shape[0] and 0 <= column < self.maze.shape[1]):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        return int(row), int(column)
+
+    def cuts_off(self, row, column, cells=None):
+        """Whether blocking the cell cuts any of ``cells`` off from every target
 
-    def path(self, column, row):
-        return arrows_to_path(self.directions, (column, row))
+        ``cells`` are ``(row, column)`` pairs, by default any open cell counts.
+        Cells that cannot reach a target now are never cut off.
+        """
+        loc = self.check(row, column)
+        others = [] if cells is None else [self.check(*cell) for cell in cells]
+        if self.unknown:
+            self.build()
+        if self.maze[loc] < 0 or loc not in self.reaches:
+            return False
+        if loc in others:
+            return True
+        others = [other for other in others if other in self.reaches]
+        if cells is not None and not others:
+            return False
+        result = None
+        # the search cannot tell whether a blocked target was the only one
+        if self.maze[loc] != 1:
+            result = self.split(loc, None if cells is None else set(others), False)
+        if result is not None:
+            return result
+        if self.stale:
+            self.build()
+        return any(self.separates(loc, other) for other in others or [None])
 
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
 
-def analyze(maze):
-    return AnalyzedMaze(maze)
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze"""
+        for row, column, value in changes:
+            loc = self.check(row, column)
+            old = self.maze[loc]
+            self.maze[loc] = value
+            if (old < 0) == (value < 0) and (old == 1) == (value == 1):
+                continue
+            self.stale = True
+            if not self.unknown:
+                self.unknown = not self.follow(loc, old, value)
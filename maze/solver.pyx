@@ -1,8 +1,19 @@
 #cython: language_level=3
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy
 cimport numpy
 cimport cython
 from cpython.mem cimport PyMem_Malloc, PyMem_Realloc, PyMem_Free
+from libc.stdlib cimport qsort, calloc, free
+from libc.string cimport memset, memcpy
+from libc.limits cimport INT_MAX
+from cython.parallel cimport prange
+
+from .packed import PackedMaze
 
 
 cdef struct coords:
@@ -10,28 +21,36 @@ cdef struct coords:
     int c
 
 
-cdef coords up(coords shape, coords loc):
+cdef coords up(coords shape, coords loc) nogil:
     if loc.r == 0:
-        return coords(-1, -1)
-    return coords(loc.r - 1, loc.c)
+        loc.r = loc.c = -1
+    else:
+        loc.r -= 1
+    return loc
 
 
-cdef coords down(coords shape, coords loc):
+cdef coords down(coords shape, coords loc) nogil:
     if loc.r == shape.r - 1:
-        return coords(-1, -1)
-    return coords(loc.r + 1, loc.c)
+        loc.r = loc.c = -1
+    else:
+        loc.r += 1
+    return loc
 
 
-cdef coords left(coords shape, coords loc):
+cdef coords left(coords shape, coords loc) nogil:
     if loc.c == 0:
-        return coords(-1, -1)
-    return coords(loc.r, loc.c - 1)
+        loc.r = loc.c = -1
+    else:
+        loc.c -= 1
+    return loc
 
 
-cdef coords right(coords shape, coords loc):
+cdef coords right(coords shape, coords loc) nogil:
     if loc.c == shape.c - 1:
-        return coords(-1, -1)
-    return coords(loc.r, loc.c + 1)
+        loc.r = loc.c = -1
+    else:
+        loc.c += 1
+    return loc
 
 
 def ends(maze):
@@ -49,6 +68,36 @@ cdef char UP = ord('^')
 cdef char DOWN = ord('v')
 cdef char WALL = ord('#')
 cdef char SPACE = ord(' ')
+# cells an early stopped flood did not get to
+cdef char UNKNOWN = ord('?')
+
+# Named direction codes, the directions array viewed as uint8 holds these
+WALL_CODE = WALL
+SPACE_CODE = SPACE
+TARGET_CODE = TARGET
+UP_CODE = UP
+DOWN_CODE = DOWN
+LEFT_CODE = LEFT
+RIGHT_CODE = RIGHT
+UNKNOWN_CODE = UNKNOWN
+
+ctypedef fused distance_t:
+    numpy.int16_t
+    numpy.int32_t
+    numpy.int64_t
+
+
+def distance_dtype(shape, cost=1):
+    """The smallest dtype able to hold any distance in a maze of this shape
+
+    ``cost`` is the most a single step can cost.
+    """
+    # no path has more steps than the maze has cells and -1 is kept for unreachable cells
+    longest = cost*(shape[0]*shape[1] - 1)
+    for dtype in numpy.int16, numpy.int32:
+        if longest <= numpy.iinfo(dtype).max:
+            return numpy.dtype(dtype)
+    return numpy.dtype(numpy.int64)
 
 
 @cython.boundscheck(False)
@@ -63,6 +112,8 @@ def arrows_to_path(numpy.ndarray[numpy.int8_t, ndim=2] arrows, int column, int r
         raise ValueError('Cannot construct path for wall')
     if arrows[loc.r, loc.c] == SPACE:
         raise ValueError('Cannot construct path for unreachable cell')
+    if arrows[loc.r, loc.c] == UNKNOWN:
+        raise ValueError('Cannot construct path for cell the flood did not get to')
 
     # the path can never be longer than number of cells
     cdef coords * path = <coords *>PyMem_Malloc(shape.r*shape.c*sizeof(coords))
@@ -94,9 +145,77 @@ def arrows_to_path(numpy.ndarray[numpy.int8_t, ndim=2] arrows, int column, int r
     return lpath
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def arrows_to_paths(char[:, ::1] arrows, starts):
+    """Paths from many starts at once, in one contiguous array
+
+    Returns ``steps``, an int32 array of the ``(row, column)`` steps of all paths
+    one after another, and ``offsets``, path ``i`` is ``steps[offsets[i]:offsets[i + 1]]``.
+    Walls, unreachable starts and starts the flood did not get to get empty paths.
+    """
+    cdef numpy.intp_t[:, :] locations = numpy.asarray(starts, dtype=numpy.intp).reshape(-1, 2)
+    cdef Py_ssize_t count = locations.shape[0], size, used = 0, i
+    cdef numpy.intp_t[::1] bounds
+    cdef numpy.int32_t[:, ::1] view
+    cdef numpy.int32_t * buffer
+    cdef numpy.int32_t * grown
+    cdef coords shape, loc
+    cdef char symb
+    shape.r, shape.c = arrows.shape[0], arrows.shape[1]
+    for i in range(count):
+        if not (0 <= locations[i, 0] < shape.r and 0 <= locations[i, 1] < shape.c):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(locations[i, 0], locations[i, 1]))
+
+    offsets = numpy.empty(count + 1, dtype=numpy.intp)
+    bounds = offsets
+    # the buffer doubles when full, paths are copied out once at the end
+    size = max(16, 2*count)
+    buffer = <numpy.int32_t *>PyMem_Malloc(2*size*sizeof(numpy.int32_t))
+    if buffer == NULL:
+        raise MemoryError()
+    try:
+        for i in range(count):
+            bounds[i] = used
+            loc.r, loc.c = locations[i, 0], locations[i, 1]
+            symb = arrows[loc.r, loc.c]
+            if symb == WALL or symb == SPACE or symb == UNKNOWN:
+                continue
+            while True:
+                if used == size:
+                    grown = <numpy.int32_t *>PyMem_Realloc(buffer, 4*size*sizeof(numpy.int32_t))
+                    if grown == NULL:
+                        raise MemoryError()
+                    buffer = grown
+                    size *= 2
+                buffer[2*used] = loc.r
+                buffer[2*used + 1] = loc.c
+                used += 1
+                symb = arrows[loc.r, loc.c]
+                if symb == UP:
+                    loc = up(shape, loc)
+                elif symb == LEFT:
+                    loc = left(shape, loc)
+                elif symb == RIGHT:
+                    loc = right(shape, loc)
+                elif symb == DOWN:
+                    loc = down(shape, loc)
+                else:
+                    break
+        bounds[count] = used
+
+        steps = numpy.empty((used, 2), dtype=numpy.int32)
+        if used:
+            view = steps
+            memcpy(&view[0, 0], buffer, 2*used*sizeof(numpy.int32_t))
+    finally:
+        PyMem_Free(buffer)
+    return steps, offsets
+
+
 cdef struct job:
     coords loc
-    int dist
+    numpy.int64_t dist
     char symb
 
 
@@ -105,9 +224,9 @@ cdef struct job:
 @cython.initializedcheck(False)
 cdef class JobQueue:
     cdef job * jobs
-    cdef int top, bottom, size
+    cdef Py_ssize_t top, bottom, size
 
-    def __cinit__(self, int size):
+    def __cinit__(self, Py_ssize_t size):
         self.jobs = <job *>PyMem_Malloc(size*sizeof(job))
         if self.jobs == NULL:
             raise MemoryError()
@@ -119,14 +238,36 @@ cdef class JobQueue:
         if self.jobs != NULL:
             PyMem_Free(self.jobs)
 
-    cdef void put(self, job ajob):
+    cdef int put(self, job ajob) except -1:
+        if self.top - self.bottom == self.size:
+            self.grow()
         self.jobs[self.top % self.size] = ajob
         self.top += 1
+        return 0
+
+    cdef int grow(self) except -1:
+        # unwrap the ring into a buffer twice as large
+        cdef Py_ssize_t size = max(2*self.size, 16)
+        cdef job * jobs = <job *>PyMem_Malloc(size*sizeof(job))
+        if jobs == NULL:
+            raise MemoryError()
+        cdef Py_ssize_t i
+        for i in range(self.top - self.bottom):
+            jobs[i] = self.jobs[(self.bottom + i) % self.size]
+        PyMem_Free(self.jobs)
+        self.jobs = jobs
+        self.top -= self.bottom
+        self.bottom = 0
+        self.size = size
+        return 0
 
     cdef job get(self):
         self.bottom += 1
         return self.jobs[(self.bottom-1) % self.size]
 
+    cdef job peek(self):
+        return self.jobs[self.bottom % self.size]
+
     cdef bint empty(self):
         return self.bottom == self.top
 
@@ -134,85 +275,2753 @@ cdef class JobQueue:
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.initializedcheck(False)
-def flood(numpy.ndarray[numpy.int8_t, ndim=2] maze):
-    cdef coords shape = coords(maze.shape[0], maze.shape[1])
-    cdef numpy.ndarray[numpy.int_t, ndim=2] distances = numpy.full((shape.r, shape.c), -1, dtype=numpy.int)
+cdef class CellQueue:
+    """Ring buffer of cells for the flood
+
+    Cells are marked when they are queued, so a flood never holds
+    more than one entry per cell. ``peak`` is the most entries held at once.
+    """
+    cdef coords * cells
+    cdef Py_ssize_t top, bottom
+    cdef readonly Py_ssize_t size, peak
+
+    def __cinit__(self, Py_ssize_t size):
+        self.cells = <coords *>PyMem_Malloc(size*sizeof(coords))
+        if self.cells == NULL:
+            raise MemoryError()
+        self.size = size
+        self.clear()
 
-    # int8_t is the same type as ('a', 1), but we'll need to work with ords
-    # Initialize everything as walls
-    # Cannot use WALL here, Python is handling this, not C
-    cdef numpy.ndarray[numpy.int8_t, ndim=2]  directions = numpy.full((shape.r, shape.c), b'#', dtype=('a', 1))
-    # Add spaces where there are no walls
-    # Cannot use SPACE here, dtto
-    directions[maze >= 0] = b' '
+    def __dealloc__(self):
+        if self.cells != NULL:
+            PyMem_Free(self.cells)
 
-    # TODO allocate what we actually need, this is a guess
-    ends_ = ends(maze)
-    cdef JobQueue jobs = JobQueue(shape.r*shape.c*min(len(ends_), 4))
+    @property
+    def nbytes(self):
+        return self.size*sizeof(coords)
 
-    for end in ends_:
-        jobs.put(job(coords(end[0], end[1]), 0, TARGET))
+    @property
+    def peak_bytes(self):
+        return self.peak*sizeof(coords)
 
+    cdef void clear(self) nogil:
+        self.top = 0
+        self.bottom = 0
+        self.peak = 0
+
+    cdef void put(self, coords loc) nogil:
+        self.cells[self.top % self.size] = loc
+        self.top += 1
+        if self.top - self.bottom > self.peak:
+            self.peak = self.top - self.bottom
+
+    cdef coords get(self) nogil:
+        self.bottom += 1
+        return self.cells[(self.bottom-1) % self.size]
+
+    cdef bint empty(self) nogil:
+        return self.bottom == self.top
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t bfs(distance_t[:, ::1] distances, char[:, ::1] directions, coords shape, CellQueue queue,
+                    Py_ssize_t pending, numpy.int16_t[:, ::1] owners, bint owned) nogil:
+    # Requested cells are marked UNKNOWN, the flood stops when the last one is queued.
+    # With owned, cells belong to the same target as the cell they were reached from
     cdef coords loc, nloc
-    cdef size_t i
-    cdef int dist
-    cdef char symb
-    cdef job ajob
-    while not jobs.empty():
-        ajob = jobs.get()
-        loc = ajob.loc
-        dist = ajob.dist
-        symb = ajob.symb
-        # It's a wall or we've been there better
-        if directions[loc.r, loc.c] == WALL or 0 <= distances[loc.r, loc.c] <= dist:
-            continue
-        directions[loc.r, loc.c] = symb
-        distances[loc.r, loc.c] = dist
+    cdef distance_t dist
+    cdef numpy.int16_t owner = -1
+    while pending and not queue.empty():
+        loc = queue.get()
+        dist = distances[loc.r, loc.c] + 1
+        if owned:
+            owner = owners[loc.r, loc.c]
 
+        # Only cells we have not been to yet are queued
         nloc = down(shape, loc)
-        if nloc.r != -1:
-            jobs.put(job(nloc, dist+1, UP))
+        if nloc.r != -1 and (directions[nloc.r, nloc.c] == SPACE or directions[nloc.r, nloc.c] == UNKNOWN):
+            pending -= directions[nloc.r, nloc.c] == UNKNOWN
+            directions[nloc.r, nloc.c] = UP
+            distances[nloc.r, nloc.c] = dist
+            if owned:
+                owners[nloc.r, nloc.c] = owner
+            queue.put(nloc)
 
         nloc = up(shape, loc)
-        if nloc.r != -1:
-            jobs.put(job(nloc, dist+1, DOWN))
+        if nloc.r != -1 and (directions[nloc.r, nloc.c] == SPACE or directions[nloc.r, nloc.c] == UNKNOWN):
+            pending -= directions[nloc.r, nloc.c] == UNKNOWN
+            directions[nloc.r, nloc.c] = DOWN
+            distances[nloc.r, nloc.c] = dist
+            if owned:
+                owners[nloc.r, nloc.c] = owner
+            queue.put(nloc)
 
         nloc = left(shape, loc)
-        if nloc.r != -1:
-            jobs.put(job(nloc, dist+1, RIGHT))
+        if nloc.r != -1 and (directions[nloc.r, nloc.c] == SPACE or directions[nloc.r, nloc.c] == UNKNOWN):
+            pending -= directions[nloc.r, nloc.c] == UNKNOWN
+            directions[nloc.r, nloc.c] = RIGHT
+            distances[nloc.r, nloc.c] = dist
+            if owned:
+                owners[nloc.r, nloc.c] = owner
+            queue.put(nloc)
 
         nloc = right(shape, loc)
-        if nloc.r != -1:
-            jobs.put(job(nloc, dist+1, LEFT))
+        if nloc.r != -1 and (directions[nloc.r, nloc.c] == SPACE or directions[nloc.r, nloc.c] == UNKNOWN):
+            pending -= directions[nloc.r, nloc.c] == UNKNOWN
+            directions[nloc.r, nloc.c] = LEFT
+            distances[nloc.r, nloc.c] = dist
+            if owned:
+                owners[nloc.r, nloc.c] = owner
+            queue.put(nloc)
+    return pending
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t seed_flood(const numpy.int8_t[:, :] maze, distance_t[:, ::1] distances,
+                           char[:, ::1] directions, CellQueue queue,
+                           numpy.int16_t[:, ::1] owners, bint owned, Py_ssize_t * targets) nogil:
+    # Marks walls and spaces, queues the targets and returns the number of free cells.
+    # With owned, targets own themselves, numbered in the order of ends(), other cells nothing
+    cdef coords loc
+    cdef Py_ssize_t free = 0
+    targets[0] = 0
+    queue.clear()
+
+    # directions are ('a', 1), the same type as int8_t, so we work with ords
+    for loc.r in range(maze.shape[0]):
+        for loc.c in range(maze.shape[1]):
+            distances[loc.r, loc.c] = -1
+            if owned:
+                owners[loc.r, loc.c] = -1
+            if maze[loc.r, loc.c] < 0:
+                directions[loc.r, loc.c] = WALL
+                continue
+            free += 1
+            if maze[loc.r, loc.c] == 1:
+                directions[loc.r, loc.c] = TARGET
+                distances[loc.r, loc.c] = 0
+                if owned:
+                    owners[loc.r, loc.c] = <numpy.int16_t>targets[0]
+                targets[0] += 1
+                queue.put(loc)
+            else:
+                directions[loc.r, loc.c] = SPACE
+    return free
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t flood_kernel(const numpy.int8_t[:, :] maze, distance_t[:, ::1] distances,
+                             char[:, ::1] directions, CellQueue queue,
+                             const numpy.intp_t[:, :] stops, numpy.int16_t[:, ::1] owners,
+                             Py_ssize_t free) nogil:
+    # Floods from the targets queued by seed_flood, which found the free cells.
+    # Returns the number of unreachable cells, or -1 if the flood stopped early
+    cdef coords shape, loc
+    cdef bint owned = owners is not None
+    cdef Py_ssize_t pending = -1, i
+    shape.r = maze.shape[0]
+    shape.c = maze.shape[1]
+    if stops is not None:
+        pending = 0
+        for i in range(stops.shape[0]):
+            if directions[stops[i, 0], stops[i, 1]] == SPACE:
+                directions[stops[i, 0], stops[i, 1]] = UNKNOWN
+                pending += 1
+
+    pending = bfs(distances, directions, shape, queue, pending, owners, owned)
+    if pending == 0 and not queue.empty():
+        # cells not reached yet are not computed
+        for loc.r in range(shape.r):
+            for loc.c in range(shape.c):
+                if directions[loc.r, loc.c] == SPACE:
+                    directions[loc.r, loc.c] = UNKNOWN
+        return -1
+    if pending > 0:
+        # the requested cells left are unreachable
+        for i in range(stops.shape[0]):
+            if directions[stops[i, 0], stops[i, 1]] == UNKNOWN:
+                directions[stops[i, 0], stops[i, 1]] = SPACE
+    # every reached cell has been queued once
+    return free - queue.top
+
+
+# Frontier cells handled by one task of the level-synchronous flood
+DEF BLOCK = 4096
+
+# Arrows in the order of preference, a cell points to the first neighbour one step closer
+cdef char[4] PREFERENCE = [UP, DOWN, LEFT, RIGHT]
+
+
+cdef inline coords step(coords shape, coords loc, int preference) nogil:
+    # The neighbour an arrow of the given preference points to
+    if preference == 0:
+        return up(shape, loc)
+    if preference == 1:
+        return down(shape, loc)
+    if preference == 2:
+        return left(shape, loc)
+    return right(shape, loc)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t claim_block(distance_t[:, ::1] distances, char[:, ::1] directions, coords shape,
+                            coords * cells, unsigned char * masks, Py_ssize_t count,
+                            distance_t dist) nogil:
+    # Only reads the arrays: marks in masks which new cells each frontier cell is the parent of
+    cdef Py_ssize_t i, claimed = 0
+    cdef int preference, earlier
+    cdef unsigned char mask
+    cdef coords loc, nloc, ploc
+    for i in range(count):
+        loc = cells[i]
+        mask = 0
+        for preference in range(4):
+            # the cell that would point at loc with this arrow
+            nloc = step(shape, loc, preference ^ 1)
+            if nloc.r == -1 or directions[nloc.r, nloc.c] != SPACE:
+                continue
+            for earlier in range(preference):
+                ploc = step(shape, nloc, earlier)
+                if ploc.r != -1 and distances[ploc.r, ploc.c] == dist - 1:
+                    break
+            else:
+                mask |= 1 << preference
+                claimed += 1
+        masks[i] = mask
+    return claimed
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef void spread_block(distance_t[:, ::1] distances, char[:, ::1] directions, coords shape,
+                       coords * cells, unsigned char * masks, Py_ssize_t count,
+                       distance_t dist, coords * out, numpy.int16_t[:, ::1] owners, bint owned) nogil:
+    # Writes the cells claimed by claim_block, each new cell has exactly one parent.
+    # With owned, the new cells belong to the same target as their parent
+    cdef Py_ssize_t i
+    cdef int preference
+    cdef coords nloc
+    for i in range(count):
+        for preference in range(4):
+            if masks[i] & (1 << preference):
+                nloc = step(shape, cells[i], preference ^ 1)
+                directions[nloc.r, nloc.c] = PREFERENCE[preference]
+                distances[nloc.r, nloc.c] = dist
+                if owned:
+                    owners[nloc.r, nloc.c] = owners[cells[i].r, cells[i].c]
+                out[0] = nloc
+                out += 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t level_kernel(const numpy.int8_t[:, :] maze, distance_t[:, ::1] distances,
+                             char[:, ::1] directions, CellQueue queue,
+                             unsigned char[::1] masks, Py_ssize_t[::1] claimed, int threads,
+                             Py_ssize_t free, numpy.int16_t[:, ::1] owners) nogil:
+    # Level-synchronous flood from the targets queued by seed_flood,
+    # the frontiers are stored one after another in the queue
+    cdef coords shape
+    cdef bint owned = owners is not None
+    cdef Py_ssize_t bottom = 0, top = queue.top, blocks, block, first, count, total
+    cdef distance_t dist = 0
+    shape.r = maze.shape[0]
+    shape.c = maze.shape[1]
+
+    while bottom < top:
+        dist += 1
+        blocks = (top - bottom + BLOCK - 1) // BLOCK
+        for block in prange(blocks, num_threads=threads if blocks > 1 else 1,
+                            schedule='static'):
+            first = bottom + block*BLOCK
+            claimed[block] = claim_block(distances, directions, shape, queue.cells + first,
+                                         &masks[first], min(BLOCK, top - first), dist)
+
+        # each block writes its new cells to its own part of the next frontier
+        total = top
+        for block in range(blocks):
+            count = claimed[block]
+            claimed[block] = total
+            total += count
+
+        for block in prange(blocks, num_threads=threads if blocks > 1 else 1,
+                            schedule='static'):
+            first = bottom + block*BLOCK
+            spread_block(distances, directions, shape, queue.cells + first, &masks[first],
+                         min(BLOCK, top - first), dist, queue.cells + claimed[block], owners, owned)
+
+        if top - bottom > queue.peak:
+            queue.peak = top - bottom
+        bottom, top = top, total
+
+    queue.top = queue.bottom = top
+    return free - top
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef void bucket_put(Py_ssize_t[::1] links, Py_ssize_t[::1] heads, Py_ssize_t[::1] tails,
+                     Py_ssize_t bucket, Py_ssize_t cell) nogil:
+    links[cell] = -1
+    if heads[bucket] == -1:
+        heads[bucket] = cell
+    else:
+        links[tails[bucket]] = cell
+    tails[bucket] = cell
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t dial_kernel(const numpy.int8_t[:, :] maze, const numpy.uint8_t[:, :] costs,
+                            distance_t[:, ::1] distances, char[:, ::1] directions,
+                            Py_ssize_t[::1] links, Py_ssize_t[::1] heads, Py_ssize_t[::1] tails,
+                            Py_ssize_t * counts) nogil:
+    # Dijkstra on a ring of FIFO buckets, one for each distance modulo the largest cost plus one.
+    # counts get the number of settled cells and the most cells queued at once
+    cdef Py_ssize_t width = maze.shape[1], span = heads.shape[0]
+    cdef Py_ssize_t free = 0, reached = 0, pending = 0, most = 0, bucket, cell
+    cdef distance_t dist = 0, ndist
+    cdef coords shape, loc, nloc
+    shape.r = maze.shape[0]
+    shape.c = maze.shape[1]
+    for bucket in range(span):
+        heads[bucket] = -1
+
+    for loc.r in range(shape.r):
+        for loc.c in range(shape.c):
+            distances[loc.r, loc.c] = -1
+            if maze[loc.r, loc.c] < 0:
+                directions[loc.r, loc.c] = WALL
+                continue
+            free += 1
+            if maze[loc.r, loc.c] == 1:
+                directions[loc.r, loc.c] = TARGET
+                distances[loc.r, loc.c] = 0
+                bucket_put(links, heads, tails, 0, loc.r*width + loc.c)
+                pending += 1
+            else:
+                directions[loc.r, loc.c] = SPACE
+
+    # A step costs as much as the cell it leaves, so the first neighbour
+    # to reach a cell is the closest one and cells are marked when queued
+    most = pending
+    while pending:
+        bucket = dist % span
+        while heads[bucket] != -1:
+            cell = heads[bucket]
+            heads[bucket] = links[cell]
+            pending -= 1
+            reached += 1
+            loc.r = cell // width
+            loc.c = cell % width
+
+            nloc = down(shape, loc)
+            if nloc.r != -1 and directions[nloc.r, nloc.c] == SPACE:
+                ndist = dist + costs[nloc.r, nloc.c]
+                directions[nloc.r, nloc.c] = UP
+                distances[nloc.r, nloc.c] = ndist
+                bucket_put(links, heads, tails, ndist % span, nloc.r*width + nloc.c)
+                pending += 1
+
+            nloc = up(shape, loc)
+            if nloc.r != -1 and directions[nloc.r, nloc.c] == SPACE:
+                ndist = dist + costs[nloc.r, nloc.c]
+                directions[nloc.r, nloc.c] = DOWN
+                distances[nloc.r, nloc.c] = ndist
+                bucket_put(links, heads, tails, ndist % span, nloc.r*width + nloc.c)
+                pending += 1
+
+            nloc = left(shape, loc)
+            if nloc.r != -1 and directions[nloc.r, nloc.c] == SPACE:
+                ndist = dist + costs[nloc.r, nloc.c]
+                directions[nloc.r, nloc.c] = RIGHT
+                distances[nloc.r, nloc.c] = ndist
+                bucket_put(links, heads, tails, ndist % span, nloc.r*width + nloc.c)
+                pending += 1
+
+            nloc = right(shape, loc)
+            if nloc.r != -1 and directions[nloc.r, nloc.c] == SPACE:
+                ndist = dist + costs[nloc.r, nloc.c]
+                directions[nloc.r, nloc.c] = LEFT
+                distances[nloc.r, nloc.c] = ndist
+                bucket_put(links, heads, tails, ndist % span, nloc.r*width + nloc.c)
+                pending += 1
+            if pending > most:
+                most = pending
+        dist += 1
+
+    counts[0] = reached
+    counts[1] = most
+    return free - reached
+
+
+def check_costs(maze, costs):
+    """The costs as uint8 and the largest cost of an open cell"""
+    maze = numpy.asarray(maze)
+    costs = numpy.asarray(costs)
+    if costs.shape != maze.shape:
+        raise ValueError('The costs do not match the maze shape')
+    # costs of walls are never used
+    used = costs[maze >= 0]
+    if used.size and (used.min() < 1 or used.max() > 255):
+        raise ValueError('Costs of open cells have to be between 1 and 255')
+    return numpy.ascontiguousarray(costs).astype(numpy.uint8, copy=False), int(used.max()) if used.size else 1
+
+
+def flood_into(const numpy.int8_t[:, :] maze, distance_t[:, ::1] distances, char[:, ::1] directions,
+               CellQueue queue=None, threads=None, costs=None, stop_when_reached=None,
+               numpy.int16_t[:, ::1] owners=None, stats=None):
+    """Floods the maze into preallocated arrays without holding the GIL
+
+    With ``threads`` the flood goes one distance level at a time and splits
+    each level across that many OpenMP threads. Its distances are the same,
+    a cell points to the first neighbour one step closer in the order
+    up, down, left, right, no matter how many threads there are.
+    With ``costs`` a step takes as much as the cell it leaves costs,
+    the distances are the sums of the costs along the cheapest paths.
+    With ``stop_when_reached`` (``(row, column)`` cells) the flood stops as soon as
+    all of them have their distances, cells it did not get to are '?'.
+    With ``owners``, an int16 array, each cell gets the index of the target its
+    arrows lead to, in the order of ``ends()``, walls and cells that reach none get -1.
+    ``stats``, a dict, gets the counters of the flood, see ``record_flood``.
+    Returns the number of cells that cannot reach any target, -1 if the flood stopped early.
+    """
+    cdef Py_ssize_t unreachable, free
+    cdef numpy.intp_t[:, :] stops = None
+    cdef Py_ssize_t targets
+    cdef Py_ssize_t counts[2]
+    cdef unsigned char[::1] masks
+    cdef Py_ssize_t[::1] claimed, links, heads, tails
+    cdef const numpy.uint8_t[:, :] weights
+    cdef int nthreads
+    if stats is not None:
+        start = time.perf_counter()
+    if distances.shape[0] != maze.shape[0] or distances.shape[1] != maze.shape[1] or \
+            directions.shape[0] != maze.shape[0] or directions.shape[1] != maze.shape[1]:
+        raise ValueError('The arrays do not match the maze shape')
 
+    if stop_when_reached is not None:
+        if threads is not None or costs is not None:
+            raise ValueError('Only the plain flood can stop early')
+        stops = check_stops(maze, stop_when_reached)
+    if owners is not None:
+        if costs is not None:
+            raise ValueError('Only the plain flood can find owners')
+        if owners.shape[0] != maze.shape[0] or owners.shape[1] != maze.shape[1]:
+            raise ValueError('The arrays do not match the maze shape')
+
+    if costs is not None:
+        if threads is not None:
+            raise ValueError('Floods with costs run on one thread')
+        costs, longest = check_costs(maze, costs)
+        weights = costs
+        links = numpy.empty(maze.shape[0]*maze.shape[1], dtype=numpy.intp)
+        heads = numpy.empty(longest + 1, dtype=numpy.intp)
+        tails = numpy.empty(longest + 1, dtype=numpy.intp)
+        if stats is not None:
+            # the targets are queued by the kernel, in the time of the search
+            seeded = time.perf_counter()
+        with nogil:
+            unreachable = dial_kernel(maze, weights, distances, directions, links, heads, tails, counts)
+        if stats is not None:
+            record_flood(stats, start, seeded, counts[0], counts[0], counts[1])
+        return unreachable
+
+    # Every cell is queued at most once, a queue can be reused for mazes up to its size
+    if queue is None:
+        queue = CellQueue(maze.shape[0]*maze.shape[1])
+    elif queue.size < maze.shape[0]*maze.shape[1]:
+        raise ValueError('The queue is too small for this maze')
+
+    if threads is None:
+        with nogil:
+            free = seed_flood(maze, distances, directions, queue, owners, owners is not None, &targets)
+        check_owners(owners, targets)
+        if stats is not None:
+            seeded = time.perf_counter()
+        with nogil:
+            unreachable = flood_kernel(maze, distances, directions, queue, stops, owners, free)
+        if stats is not None:
+            record_flood(stats, start, seeded, queue.top, queue.bottom, queue.peak)
+        return unreachable
+
+    if threads < 1:
+        raise ValueError('At least one thread is needed')
+    nthreads = threads
+    masks = numpy.empty(maze.shape[0]*maze.shape[1], dtype=numpy.uint8)
+    claimed = numpy.empty((maze.shape[0]*maze.shape[1] + BLOCK - 1) // BLOCK + 1, dtype=numpy.intp)
+    with nogil:
+        free = seed_flood(maze, distances, directions, queue, owners, owners is not None, &targets)
+    check_owners(owners, targets)
+    if stats is not None:
+        seeded = time.perf_counter()
+    with nogil:
+        unreachable = level_kernel(maze, distances, directions, queue, masks, claimed, nthreads, free, owners)
+    if stats is not None:
+        record_flood(stats, start, seeded, queue.top, queue.top, queue.peak)
+    return unreachable
+
+
+cdef check_owners(numpy.int16_t[:, ::1] owners, Py_ssize_t targets):
+    # Checked before the flood spreads the owners of the targets, int16 labels would wrap around
+    if owners is not None and targets > 32767:
+        raise ValueError('The maze has more targets than int16 owners can tell apart')
+
+
+def record_flood(stats, start, seeded, enqueued, settled, peak=None):
+    """Adds the counters of a flood that started at ``start`` and queued its targets by ``seeded``
+
+    ``enqueued`` and ``settled`` are the cells queued and taken from the queue,
+    ``peak`` the most cells queued at once (when known). Floods mark cells when
+    they queue them, so they never have stale jobs, ``repair`` may.
+    The times are ``time.perf_counter`` seconds, setup is everything before the search.
+    """
+    done = time.perf_counter()
+    stats['setup_seconds'] = stats.get('setup_seconds', 0) + seeded - start
+    stats['bfs_seconds'] = stats.get('bfs_seconds', 0) + done - seeded
+    stats['enqueued'] = stats.get('enqueued', 0) + enqueued
+    stats['stale'] = stats.get('stale', 0)
+    stats['settled'] = stats.get('settled', 0) + settled
+    if peak is not None:
+        stats['peak'] = max(stats.get('peak', 0), peak)
+
+
+def check_stops(maze, stops):
+    stops = numpy.array(stops, dtype=numpy.intp).reshape(-1, 2)
+    if ((stops < 0) | (stops >= numpy.array(maze.shape[:2]))).any():
+        raise IndexError('The cells are out of the maze')
+    return stops
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t packed_kernel(const numpy.uint8_t[:, ::1] walls, const numpy.intp_t[:, ::1] targets,
+                              distance_t[:, ::1] distances, char[:, ::1] directions, CellQueue queue) nogil:
+    # The plain flood reading the walls from their bits, returns the number of unreachable cells
+    cdef coords shape, loc
+    cdef Py_ssize_t free = 0, i
+    cdef numpy.uint8_t bits
+    cdef numpy.int16_t[:, ::1] owners = None
+    shape.r = distances.shape[0]
+    shape.c = distances.shape[1]
+    queue.clear()
+
+    for loc.r in range(shape.r):
+        for loc.c in range(shape.c):
+            if loc.c & 7 == 0:
+                bits = walls[loc.r, loc.c >> 3]
+            distances[loc.r, loc.c] = -1
+            if bits & 0x80:
+                directions[loc.r, loc.c] = WALL
+            else:
+                directions[loc.r, loc.c] = SPACE
+                free += 1
+            bits <<= 1
+
+    # in row-major order, as seed_flood queues them
+    for i in range(targets.shape[0]):
+        loc.r = targets[i, 0]
+        loc.c = targets[i, 1]
+        directions[loc.r, loc.c] = TARGET
+        distances[loc.r, loc.c] = 0
+        queue.put(loc)
+
+    bfs(distances, directions, shape, queue, -1, owners, False)
+    return free - queue.top
+
+
+def flood_packed(maze, CellQueue queue=None, compact=False, stats=None):
+    """Floods a ``PackedMaze`` without unpacking it, the results are those of ``flood``"""
+    if stats is not None:
+        start = time.perf_counter()
+    shape = maze.shape
+    dtype = distance_dtype(shape) if compact else numpy.dtype(numpy.int64)
+    distances = numpy.empty(shape, dtype=dtype)
+    directions = numpy.empty(shape, dtype=('a', 1))
+    if queue is None:
+        queue = CellQueue(shape[0]*shape[1])
+    elif queue.size < shape[0]*shape[1]:
+        raise ValueError('The queue is too small for this maze')
+    if stats is not None:
+        # the walls are read by the kernel, in the time of the search
+        seeded = time.perf_counter()
+    flood_packed_into(maze.walls, maze.targets, distances, directions, queue)
+    if stats is not None:
+        record_flood(stats, start, seeded, queue.top, queue.bottom, queue.peak)
     return distances, directions
 
 
+def flood_packed_into(const numpy.uint8_t[:, ::1] walls, const numpy.intp_t[:, ::1] targets,
+                      distance_t[:, ::1] distances, char[:, ::1] directions, CellQueue queue):
+    """Floods packed walls and targets into preallocated arrays, returns the number of unreachable cells"""
+    cdef Py_ssize_t unreachable
+    with nogil:
+        unreachable = packed_kernel(walls, targets, distances, directions, queue)
+    return unreachable
+
+
+cdef extern from "bits.h":
+    # the index of the lowest set bit, by the compiler's builtin where there is one
+    int lowest_bit(unsigned long long) nogil
+
+
+cdef inline Py_ssize_t add_bits(numpy.uint64_t * fresh, const numpy.uint64_t * free,
+                                const numpy.uint64_t * visited, numpy.intp_t * upcoming, Py_ssize_t count,
+                                Py_ssize_t word, numpy.uint64_t bits) nogil:
+    # Adds the bits not seen yet to the fresh cells, lists words the first time they get any
+    bits &= free[word] & ~visited[word]
+    if bits:
+        if not fresh[word]:
+            upcoming[count] = word
+            count += 1
+        fresh[word] |= bits
+    return count
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t bitparallel_kernel(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances,
+                                   char[:, ::1] directions, numpy.uint64_t * free, numpy.uint64_t * visited,
+                                   numpy.uint64_t * frontier, numpy.uint64_t * fresh,
+                                   numpy.intp_t * current, numpy.intp_t * upcoming) nogil:
+    # Level-synchronous flood on rows of 64 cell words, a set bit is a cell.
+    # Only the words with frontier cells are listed and visited, so a level costs
+    # as much as its words, not as the rows it spans.
+    cdef Py_ssize_t rows = maze.shape[0], words = (maze.shape[1] + 63) // 64, size = rows*words
+    cdef Py_ssize_t free_cells = 0, count = 0, added, i, word, row, column
+    cdef numpy.uint64_t bits
+    cdef numpy.intp_t * swap
+    cdef distance_t dist = 0
+    cdef coords begin, end
+
+    memset(free, 0, size*sizeof(numpy.uint64_t))
+    memset(visited, 0, size*sizeof(numpy.uint64_t))
+    memset(fresh, 0, size*sizeof(numpy.uint64_t))
+    for row in range(rows):
+        for column in range(maze.shape[1]):
+            distances[row, column] = -1
+            if maze[row, column] < 0:
+                continue
+            free_cells += 1
+            word = row*words + (column >> 6)
+            free[word] |= (<numpy.uint64_t>1) << (column & 63)
+            if maze[row, column] == 1:
+                distances[row, column] = 0
+                count = add_bits(fresh, free, visited, current, count, word, (<numpy.uint64_t>1) << (column & 63))
+    # the targets are the first frontier
+    for i in range(count):
+        frontier[current[i]] = visited[current[i]] = fresh[current[i]]
+        fresh[current[i]] = 0
+
+    while count:
+        dist += 1
+        # the neighbours of the frontier, 64 cells at a time
+        added = 0
+        for i in range(count):
+            word = current[i]
+            bits = frontier[word]
+            row = word // words
+            added = add_bits(fresh, free, visited, upcoming, added, word, (bits << 1) | (bits >> 1))
+            if word - row*words + 1 < words:
+                added = add_bits(fresh, free, visited, upcoming, added, word + 1, bits >> 63)
+            if word > row*words:
+                added = add_bits(fresh, free, visited, upcoming, added, word - 1, bits << 63)
+            if row > 0:
+                added = add_bits(fresh, free, visited, upcoming, added, word - words, bits)
+            if row + 1 < rows:
+                added = add_bits(fresh, free, visited, upcoming, added, word + words, bits)
+
+        # the fresh cells get their distance and become the frontier
+        for i in range(added):
+            word = upcoming[i]
+            bits = fresh[word]
+            fresh[word] = 0
+            frontier[word] = bits
+            visited[word] |= bits
+            row = word // words
+            column = (word - row*words) << 6
+            while bits:
+                distances[row, column + lowest_bit(bits)] = dist
+                bits &= bits - 1
+        swap = current
+        current = upcoming
+        upcoming = swap
+        count = added
+
+    begin.r = begin.c = 0
+    end.r = rows
+    end.c = maze.shape[1]
+    return free_cells - arrows_kernel(maze, distances, directions, begin, end)
+
+
+def flood_bitparallel_into(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances, char[:, ::1] directions):
+    """Floods the maze a distance level at a time with the frontier kept as bits, 64 cells per word
+
+    A cell points to the first neighbour one step closer in the order up, down, left, right,
+    as with ``flood_into`` with ``threads``. Returns the number of unreachable cells.
+    """
+    cdef Py_ssize_t unreachable
+    if distances.shape[0] != maze.shape[0] or distances.shape[1] != maze.shape[1] or \
+            directions.shape[0] != maze.shape[0] or directions.shape[1] != maze.shape[1]:
+        raise ValueError('The arrays do not match the maze shape')
+    size = max(maze.shape[0]*((maze.shape[1] + 63) // 64), 1)
+    cdef numpy.uint64_t[:, ::1] bits = numpy.empty((4, size), dtype=numpy.uint64)
+    cdef numpy.intp_t[:, ::1] lists = numpy.empty((2, size), dtype=numpy.intp)
+    with nogil:
+        unreachable = bitparallel_kernel(maze, distances, directions, &bits[0, 0], &bits[1, 0],
+                                         &bits[2, 0], &bits[3, 0], &lists[0, 0], &lists[1, 0])
+    return unreachable
+
+
+# Flood engines, the queue one unless told otherwise
+ENGINES = ('queue', 'bitparallel')
+
+
+def check_engine(engine, threads=None, costs=None, stop_when_reached=None, owners=False):
+    """Whether the bit-parallel engine is asked for"""
+    if engine is not None and engine not in ENGINES:
+        raise ValueError('Unknown flood engine {!r}, use one of {}'.format(engine, ', '.join(ENGINES)))
+    if engine != 'bitparallel':
+        return False
+    if threads is not None or costs is not None or stop_when_reached is not None or owners:
+        raise ValueError('The bit-parallel engine does only the plain flood')
+    return True
+
+
+def flood(maze, CellQueue queue=None, compact=False, threads=None,
+          costs=None, stop_when_reached=None, owners=False, engine=None, stats=None):
+    cdef numpy.ndarray[numpy.int8_t, ndim=2] grid
+    bitparallel = check_engine(engine, threads, costs, stop_when_reached, owners)
+    if stats is not None:
+        start = time.perf_counter()
+    if isinstance(maze, PackedMaze):
+        if not bitparallel and threads is None and costs is None and stop_when_reached is None and not owners:
+            return flood_packed(maze, queue, compact, stats)
+        maze = maze.unpack()
+    grid = maze
+    shape = (grid.shape[0], grid.shape[1])
+    longest = 1
+    if costs is not None:
+        costs, longest = check_costs(maze, costs)
+    # compact distances are int16, int32 or int64 depending on the longest possible path
+    dtype = distance_dtype(shape, longest) if compact else numpy.dtype(numpy.int64)
+    distances = numpy.empty(shape, dtype=dtype)
+    directions = numpy.empty(shape, dtype=('a', 1))
+    if bitparallel:
+        if stats is not None:
+            seeded = time.perf_counter()
+        unreachable = flood_bitparallel_into(numpy.ascontiguousarray(grid), distances, directions)
+        if stats is not None:
+            # levels are spread as bits, there is no queue
+            reached = numpy.count_nonzero(grid >= 0) - unreachable
+            record_flood(stats, start, seeded, reached, reached)
+        return distances, directions
+    if stats is not None:
+        stats['setup_seconds'] = stats.get('setup_seconds', 0) + time.perf_counter() - start
+    if not owners:
+        flood_into(maze, distances, directions, queue, threads, costs, stop_when_reached, stats=stats)
+        return distances, directions
+    owners = numpy.empty(shape, dtype=numpy.int16)
+    flood_into(maze, distances, directions, queue, threads, costs, stop_when_reached, owners, stats)
+    return distances, directions, owners
+
+
+cdef struct seed:
+    numpy.int64_t dist
+    Py_ssize_t cell
+
+
+cdef int compare_seeds(const void * a, const void * b) nogil:
+    cdef numpy.int64_t diff = (<seed *>a).dist - (<seed *>b).dist
+    return (diff > 0) - (diff < 0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef inline Py_ssize_t add_seed(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances,
+                                seed * seeds, Py_ssize_t count, int row, int column) nogil:
+    if maze[row, column] >= 0 and distances[row, column] >= 0:
+        seeds[count].dist = distances[row, column]
+        seeds[count].cell = row*maze.shape[1] + column
+        count += 1
+    return count
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef int relax_kernel(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances,
+                      coords first, coords last, bint targets, seed * seeds, Py_ssize_t * queue) nogil:
+    # Dijkstra inside the cells from first to last of a tile, the cells around them are kept.
+    # The seeds are the cells around (and the targets inside on the first visit), sorted,
+    # merged with the FIFO of cells they reach. Cells inside are already consistent
+    # with each other, only what changed around them spreads.
+    # Returns bits of the changed edges: 1 top, 2 bottom, 4 left, 8 right, 16 if anything changed.
+    cdef Py_ssize_t width = maze.shape[1], count = 0, used = 0, bottom = 0, top = 0, cell
+    cdef numpy.int64_t dist
+    cdef int preference, changed = 0
+    cdef coords shape, loc, nloc
+    shape.r = maze.shape[0]
+    shape.c = maze.shape[1]
+
+    if targets:
+        for loc.r in range(first.r, last.r):
+            for loc.c in range(first.c, last.c):
+                if maze[loc.r, loc.c] == 1:
+                    count = add_seed(maze, distances, seeds, count, loc.r, loc.c)
+    for loc.r in range(shape.r):
+        if first.r <= loc.r < last.r:
+            if first.c > 0:
+                count = add_seed(maze, distances, seeds, count, loc.r, first.c - 1)
+            if last.c < shape.c:
+                count = add_seed(maze, distances, seeds, count, loc.r, last.c)
+            continue
+        for loc.c in range(first.c, last.c):
+            count = add_seed(maze, distances, seeds, count, loc.r, loc.c)
+    qsort(seeds, count, sizeof(seed), compare_seeds)
+
+    while used < count or bottom < top:
+        if bottom < top and (used == count or
+                             distances[queue[bottom] // width, queue[bottom] % width] <= seeds[used].dist):
+            cell = queue[bottom]
+            bottom += 1
+        else:
+            cell = seeds[used].cell
+            used += 1
+        loc.r = cell // width
+        loc.c = cell % width
+        dist = distances[loc.r, loc.c] + 1
+        for preference in range(4):
+            nloc = step(shape, loc, preference)
+            if nloc.r < first.r or nloc.r >= last.r or nloc.c < first.c or nloc.c >= last.c:
+                continue
+            if maze[nloc.r, nloc.c] < 0 or 0 <= distances[nloc.r, nloc.c] <= dist:
+                continue
+            # cells are taken by increasing distance, the first one to get here is the closest
+            distances[nloc.r, nloc.c] = dist
+            queue[top] = nloc.r*width + nloc.c
+            top += 1
+            changed |= 16
+            if nloc.r == first.r:
+                changed |= 1
+            if nloc.r == last.r - 1:
+                changed |= 2
+            if nloc.c == first.c:
+                changed |= 4
+            if nloc.c == last.c - 1:
+                changed |= 8
+    return changed
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t arrows_kernel(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances,
+                              char[:, ::1] directions, coords first, coords last) nogil:
+    # Arrows of the cells from first to last of a tile, directions holds only those cells.
+    # Returns how many of them reach a target.
+    cdef Py_ssize_t reached = 0
+    cdef int preference
+    cdef coords shape, loc, nloc
+    shape.r = maze.shape[0]
+    shape.c = maze.shape[1]
+    for loc.r in range(first.r, last.r):
+        for loc.c in range(first.c, last.c):
+            if maze[loc.r, loc.c] < 0:
+                directions[loc.r - first.r, loc.c - first.c] = WALL
+                continue
+            if distances[loc.r, loc.c] < 0:
+                directions[loc.r - first.r, loc.c - first.c] = SPACE
+                continue
+            reached += 1
+            if maze[loc.r, loc.c] == 1:
+                directions[loc.r - first.r, loc.c - first.c] = TARGET
+                continue
+            for preference in range(4):
+                nloc = step(shape, loc, preference)
+                if nloc.r != -1 and distances[nloc.r, nloc.c] == distances[loc.r, loc.c] - 1:
+                    directions[loc.r - first.r, loc.c - first.c] = PREFERENCE[preference]
+                    break
+    return reached
+
+
+def relax_tile(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances, first, last, bint targets):
+    """Floods the cells from ``first`` to ``last`` of a tile whose other cells are fixed, see ``relax_kernel``"""
+    cdef coords begin, end
+    cdef int changed
+    cdef seed * seeds = <seed *>PyMem_Malloc(maze.shape[0]*maze.shape[1]*sizeof(seed) + 1)
+    cdef Py_ssize_t * queue = <Py_ssize_t *>PyMem_Malloc(maze.shape[0]*maze.shape[1]*sizeof(Py_ssize_t) + 1)
+    begin.r, begin.c = first
+    end.r, end.c = last
+    try:
+        if seeds == NULL or queue == NULL:
+            raise MemoryError()
+        with nogil:
+            changed = relax_kernel(maze, distances, begin, end, targets, seeds, queue)
+    finally:
+        PyMem_Free(seeds)
+        PyMem_Free(queue)
+    return changed
+
+
+def arrows_tile(const numpy.int8_t[:, ::1] maze, distance_t[:, ::1] distances, first, last):
+    """The directions of the cells from ``first`` to ``last`` of a tile and how many reach a target"""
+    cdef coords begin, end
+    cdef Py_ssize_t reached
+    cdef char[:, ::1] view
+    begin.r, begin.c = first
+    end.r, end.c = last
+    directions = numpy.empty((end.r - begin.r, end.c - begin.c), dtype=('a', 1))
+    view = directions
+    with nogil:
+        reached = arrows_kernel(maze, distances, view, begin, end)
+    return directions, reached
+
+
+def tiles(shape, tile):
+    """The tiles of the maze as ``(row, column)`` slices of them and of the cells around them"""
+    for row in range(0, shape[0], tile):
+        for column in range(0, shape[1], tile):
+            yield ((slice(row, min(row + tile, shape[0])), slice(column, min(column + tile, shape[1]))),
+                   (slice(max(row - 1, 0), min(row + tile + 1, shape[0])),
+                    slice(max(column - 1, 0), min(column + tile + 1, shape[1]))))
+
+
+def flood_tiled(maze, distances, directions, tile=1024):
+    """Floods the maze one tile at a time, for mazes too big for memory
+
+    ``maze``, ``distances`` and ``directions`` can be memory mapped, only one tile
+    and the cells around it are copied to memory at once. Tiles are flooded again
+    whenever a neighbouring tile lowers the distances of its edge, until none does.
+    The results are those of ``flood_into`` with ``threads``.
+    Returns the number of cells that cannot reach any target.
+    """
+    shape = maze.shape
+    if distances.shape != shape or directions.shape != shape:
+        raise ValueError('The arrays do not match the maze shape')
+    if directions.dtype != numpy.dtype(('a', 1)):
+        raise ValueError('The directions have to be single characters')
+    if tile < 1:
+        raise ValueError('Tiles have at least one cell')
+    layout = list(tiles(shape, tile))
+    free = 0
+    # a tile at a time, rows of very wide mazes do not fit in memory either
+    for (rows, cols), _ in layout:
+        block = numpy.asarray(maze[rows, cols])
+        distances[rows, cols] = numpy.where(block == 1, 0, -1)
+        free += numpy.count_nonzero(block >= 0)
+
+    columns = (shape[1] + tile - 1) // tile
+    dirty = numpy.ones(len(layout), dtype=bool)
+    visited = numpy.zeros(len(layout), dtype=bool)
+    forward = True
+    while dirty.any():
+        # sweeping both ways carries distances across the maze in fewer passes
+        for index in (range(len(layout)) if forward else reversed(range(len(layout)))):
+            if not dirty[index]:
+                continue
+            dirty[index] = False
+            (rows, cols), (hrows, hcols) = layout[index]
+            first = rows.start - hrows.start, cols.start - hcols.start
+            last = rows.stop - hrows.start, cols.stop - hcols.start
+            local = numpy.array(distances[hrows, hcols])
+            changed = relax_tile(numpy.ascontiguousarray(maze[hrows, hcols], dtype=numpy.int8), local,
+                                 first, last, not visited[index])
+            visited[index] = True
+            if not changed:
+                continue
+            distances[rows, cols] = local[first[0]:last[0], first[1]:last[1]]
+            for bit, neighbour, exists in ((1, index - columns, rows.start > 0),
+                                           (2, index + columns, rows.stop < shape[0]),
+                                           (4, index - 1, cols.start > 0),
+                                           (8, index + 1, cols.stop < shape[1])):
+                if changed & bit and exists:
+                    dirty[neighbour] = True
+        forward = not forward
+
+    reached = 0
+    for (rows, cols), (hrows, hcols) in layout:
+        first = rows.start - hrows.start, cols.start - hcols.start
+        last = rows.stop - hrows.start, cols.stop - hcols.start
+        arrows, count = arrows_tile(numpy.ascontiguousarray(maze[hrows, hcols], dtype=numpy.int8),
+                                    numpy.ascontiguousarray(distances[hrows, hcols]), first, last)
+        directions[rows, cols] = arrows
+        reached += count
+    return free - reached
+
+
+def analyze_batch(stack, workers=None, compact=False):
+    """Floods a stack of equally shaped mazes on a pool of threads
+
+    ``stack`` is an ``(N, H, W)`` int8 array or a list of ``(H, W)`` arrays,
+    ``workers`` is the number of threads (the number of CPUs by default).
+    Returns stacked ``distances`` and ``directions`` and a boolean vector
+    telling which mazes are fully reachable.
+    """
+    stack = numpy.ascontiguousarray(stack, dtype=numpy.int8)
+    if stack.ndim != 3:
+        raise ValueError('Expected a stack of 2D mazes')
+    count, height, width = stack.shape
+    dtype = distance_dtype((height, width)) if compact else numpy.dtype(numpy.int64)
+    distances = numpy.empty(stack.shape, dtype=dtype)
+    directions = numpy.empty(stack.shape, dtype=('a', 1))
+    unreachable = numpy.empty(count, dtype=numpy.intp)
+
+    # each thread reuses its own queue
+    local = threading.local()
+
+    def work(i):
+        queue = getattr(local, 'queue', None)
+        if queue is None:
+            queue = local.queue = CellQueue(height*width)
+        unreachable[i] = flood_into(stack[i], distances[i], directions[i], queue)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or count < 2:
+        for i in range(count):
+            work(i)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises exceptions of the workers
+            list(executor.map(work, range(count)))
+
+    return distances, directions, unreachable == 0
+
+
+cdef struct open_cell:
+    int f
+    int g
+    coords loc
+
+
+cdef inline bint before(open_cell a, open_cell b):
+    # the lowest estimate first, among equal ones the cell furthest from the start
+    return a.f < b.f or (a.f == b.f and a.g > b.g)
+
+
+cdef class PathFinder:
+    """A* search of single paths, reusable for mazes of up to ``size`` cells
+
+    Cells are stamped with the number of the search that saw them,
+    so the scratch buffers are never cleared between searches.
+    ``explored`` is the number of cells the last search expanded.
+    """
+    cdef unsigned int * stamps
+    cdef unsigned int stamp
+    cdef int * costs
+    cdef char * back
+    cdef open_cell * heap
+    cdef Py_ssize_t count, capacity
+    cdef readonly Py_ssize_t size, explored
+
+    def __cinit__(self, Py_ssize_t size):
+        # calloc leaves untouched pages of a huge maze unused
+        self.stamps = <unsigned int *>calloc(size, sizeof(unsigned int))
+        self.costs = <int *>PyMem_Malloc(size*sizeof(int))
+        self.back = <char *>PyMem_Malloc(size*sizeof(char))
+        self.heap = <open_cell *>PyMem_Malloc(16*sizeof(open_cell))
+        if self.stamps == NULL or self.costs == NULL or self.back == NULL or self.heap == NULL:
+            raise MemoryError()
+        self.size = size
+        self.capacity = 16
+
+    def __dealloc__(self):
+        free(self.stamps)
+        PyMem_Free(self.costs)
+        PyMem_Free(self.back)
+        PyMem_Free(self.heap)
+
+    cdef int push(self, open_cell cell) except -1:
+        cdef Py_ssize_t i = self.count, parent
+        cdef open_cell * heap
+        if self.count == self.capacity:
+            heap = <open_cell *>PyMem_Realloc(self.heap, 2*self.capacity*sizeof(open_cell))
+            if heap == NULL:
+                raise MemoryError()
+            self.heap = heap
+            self.capacity *= 2
+        self.count += 1
+        while i > 0:
+            parent = (i - 1) // 2
+            if not before(cell, self.heap[parent]):
+                break
+            self.heap[i] = self.heap[parent]
+            i = parent
+        self.heap[i] = cell
+        return 0
+
+    cdef open_cell pop(self):
+        cdef open_cell top = self.heap[0], last
+        cdef Py_ssize_t i = 0, child
+        self.count -= 1
+        last = self.heap[self.count]
+        while True:
+            child = 2*i + 1
+            if child >= self.count:
+                break
+            if child + 1 < self.count and before(self.heap[child + 1], self.heap[child]):
+                child += 1
+            if not before(self.heap[child], last):
+                break
+            self.heap[i] = self.heap[child]
+            i = child
+        self.heap[i] = last
+        return top
+
+    cdef void next_stamp(self):
+        self.stamp += 1
+        if self.stamp == 0:
+            memset(self.stamps, 0, self.size*sizeof(unsigned int))
+            self.stamp = 1
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.initializedcheck(False)
+    def search(self, const numpy.int8_t[:, :] maze, start, goal=None):
+        """The shortest path from ``start`` to ``goal`` or to the nearest target
+
+        Without a goal the search stops at the first target it reaches.
+        The path is a list of ``(row, column)`` tuples like from ``arrows_to_path``.
+        """
+        cdef coords shape, loc, nloc, target
+        cdef bint anywhere = goal is None
+        cdef open_cell cell, ncell
+        cdef Py_ssize_t index, nindex
+        cdef int preference
+        shape.r = maze.shape[0]
+        shape.c = maze.shape[1]
+        target.r = target.c = -1
+        if shape.r*shape.c > self.size:
+            raise ValueError('The path finder is too small for this maze')
+
+        loc.r, loc.c = start
+        if not (0 <= loc.r < shape.r and 0 <= loc.c < shape.c):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(loc.r, loc.c))
+        if maze[loc.r, loc.c] < 0:
+            raise ValueError('Cannot construct path for wall')
+        if not anywhere:
+            target.r, target.c = goal
+            if not (0 <= target.r < shape.r and 0 <= target.c < shape.c):
+                raise IndexError('Cell ({}, {}) is out of the maze'.format(target.r, target.c))
+            if maze[target.r, target.c] < 0:
+                raise ValueError('Cannot construct path to wall')
+
+        self.next_stamp()
+        self.count = 0
+        self.explored = 0
+        index = loc.r*shape.c + loc.c
+        self.stamps[index] = self.stamp
+        self.costs[index] = 0
+        cell.g = 0
+        cell.loc = loc
+        # Manhattan distance to the goal, without a goal the search is a plain BFS
+        cell.f = 0 if anywhere else abs(loc.r - target.r) + abs(loc.c - target.c)
+        self.push(cell)
+
+        while self.count:
+            cell = self.pop()
+            loc = cell.loc
+            index = loc.r*shape.c + loc.c
+            if cell.g > self.costs[index]:
+                continue
+            self.explored += 1
+            if (anywhere and maze[loc.r, loc.c] == 1) or \
+                    (not anywhere and loc.r == target.r and loc.c == target.c):
+                return self.trace(shape, loc, cell.g)
+
+            for preference in range(4):
+                nloc = step(shape, loc, preference)
+                if nloc.r == -1 or maze[nloc.r, nloc.c] < 0:
+                    continue
+                nindex = nloc.r*shape.c + nloc.c
+                if self.stamps[nindex] == self.stamp and self.costs[nindex] <= cell.g + 1:
+                    continue
+                self.stamps[nindex] = self.stamp
+                self.costs[nindex] = cell.g + 1
+                # the way back from the neighbour
+                self.back[nindex] = preference ^ 1
+                ncell.g = ncell.f = cell.g + 1
+                ncell.loc = nloc
+                if not anywhere:
+                    ncell.f += abs(nloc.r - target.r) + abs(nloc.c - target.c)
+                self.push(ncell)
+
+        raise ValueError('Cannot construct path for unreachable cell')
+
+    cdef list trace(self, coords shape, coords loc, int length):
+        path = [None]*(length + 1)
+        cdef int i
+        for i in range(length, -1, -1):
+            path[i] = (loc.r, loc.c)
+            if i:
+                loc = step(shape, loc, self.back[loc.r*shape.c + loc.c])
+        return path
+
+
+def shortest_path(maze, start, goal=None, PathFinder finder=None):
+    """The shortest path from ``start`` to ``goal``, or to the nearest target
+
+    Only the cells on the way are explored, a full flood is not needed.
+    Pass the same ``finder`` to reuse its buffers for many searches.
+    """
+    maze = numpy.asarray(maze, dtype=numpy.int8)
+    if finder is None:
+        finder = PathFinder(maze.size)
+    return finder.search(maze, start, goal)
+
+
+cdef int compare_jobs(const void * a, const void * b) nogil:
+    cdef numpy.int64_t diff = (<job *>a).dist - (<job *>b).dist
+    return (diff > 0) - (diff < 0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef int forget(distance_t[:, :] distances, char[:, :] directions, numpy.int16_t[:, :] owners,
+                coords loc, JobQueue region) except -1:
+    distances[loc.r, loc.c] = -1
+    directions[loc.r, loc.c] = SPACE
+    if owners is not None:
+        owners[loc.r, loc.c] = -1
+    region.put(job(loc, -1, SPACE))
+    return 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef Py_ssize_t invalidate(distance_t[:, :] distances, char[:, :] directions, numpy.int16_t[:, :] owners,
+                           coords shape, coords root, JobQueue region) except -1:
+    # Forgets the root and every cell whose arrows lead through it,
+    # returns the number of forgotten cells
+    if distances[root.r, root.c] < 0:
+        return 0
+    cdef Py_ssize_t start = region.top
+    cdef Py_ssize_t i = start
+    forget(distances, directions, owners, root, region)
+
+    cdef coords loc, nloc
+    while i < region.top:
+        loc = region.jobs[i].loc
+        i += 1
+
+        nloc = down(shape, loc)
+        if nloc.r != -1 and directions[nloc.r, nloc.c] == UP:
+            forget(distances, directions, owners, nloc, region)
+
+        nloc = up(shape, loc)
+        if nloc.r != -1 and directions[nloc.r, nloc.c] == DOWN:
+            forget(distances, directions, owners, nloc, region)
+
+        nloc = left(shape, loc)
+        if nloc.r != -1 and directions[nloc.r, nloc.c] == RIGHT:
+            forget(distances, directions, owners, nloc, region)
+
+        nloc = right(shape, loc)
+        if nloc.r != -1 and directions[nloc.r, nloc.c] == LEFT:
+            forget(distances, directions, owners, nloc, region)
+
+    return region.top - start
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef int settle(distance_t[:, :] distances, char[:, :] directions, numpy.int16_t[:, :] owners,
+                coords shape, job ajob, JobQueue jobs) except -1:
+    # Writes the job and queues every neighbour it improves
+    distances[ajob.loc.r, ajob.loc.c] = ajob.dist
+    directions[ajob.loc.r, ajob.loc.c] = ajob.symb
+
+    cdef numpy.int64_t dist = ajob.dist + 1
+    cdef coords nloc
+    if owners is not None and ajob.symb != TARGET:
+        # the cell belongs to the target of the neighbour its arrow points to
+        nloc = follow(shape, ajob.loc, ajob.symb)
+        owners[ajob.loc.r, ajob.loc.c] = owners[nloc.r, nloc.c]
+
+    nloc = down(shape, ajob.loc)
+    if nloc.r != -1 and directions[nloc.r, nloc.c] != WALL and not 0 <= distances[nloc.r, nloc.c] <= dist:
+        jobs.put(job(nloc, dist, UP))
+
+    nloc = up(shape, ajob.loc)
+    if nloc.r != -1 and directions[nloc.r, nloc.c] != WALL and not 0 <= distances[nloc.r, nloc.c] <= dist:
+        jobs.put(job(nloc, dist, DOWN))
+
+    nloc = left(shape, ajob.loc)
+    if nloc.r != -1 and directions[nloc.r, nloc.c] != WALL and not 0 <= distances[nloc.r, nloc.c] <= dist:
+        jobs.put(job(nloc, dist, RIGHT))
+
+    nloc = right(shape, ajob.loc)
+    if nloc.r != -1 and directions[nloc.r, nloc.c] != WALL and not 0 <= distances[nloc.r, nloc.c] <= dist:
+        jobs.put(job(nloc, dist, LEFT))
+    return 0
+
+
+cdef inline coords follow(coords shape, coords loc, char symb) nogil:
+    # The neighbour an arrow points to
+    if symb == UP:
+        return up(shape, loc)
+    if symb == DOWN:
+        return down(shape, loc)
+    if symb == LEFT:
+        return left(shape, loc)
+    return right(shape, loc)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef job best_neighbour(distance_t[:, :] distances, coords shape, coords loc):
+    # The job for loc coming from its closest settled neighbour, dist -1 if none
+    cdef job best = job(loc, -1, SPACE)
+    cdef coords nloc = up(shape, loc)
+    if nloc.r != -1 and distances[nloc.r, nloc.c] >= 0:
+        best = job(loc, distances[nloc.r, nloc.c] + 1, UP)
+
+    nloc = down(shape, loc)
+    if nloc.r != -1 and distances[nloc.r, nloc.c] >= 0 and \
+            (best.dist < 0 or distances[nloc.r, nloc.c] + 1 < best.dist):
+        best = job(loc, distances[nloc.r, nloc.c] + 1, DOWN)
+
+    nloc = left(shape, loc)
+    if nloc.r != -1 and distances[nloc.r, nloc.c] >= 0 and \
+            (best.dist < 0 or distances[nloc.r, nloc.c] + 1 < best.dist):
+        best = job(loc, distances[nloc.r, nloc.c] + 1, LEFT)
+
+    nloc = right(shape, loc)
+    if nloc.r != -1 and distances[nloc.r, nloc.c] >= 0 and \
+            (best.dist < 0 or distances[nloc.r, nloc.c] + 1 < best.dist):
+        best = job(loc, distances[nloc.r, nloc.c] + 1, RIGHT)
+    return best
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+def repair(distance_t[:, :] distances, char[:, :] directions, changes, numpy.int16_t[:, :] owners=None,
+           stats=None):
+    """Repairs the flood results in place after cells of the maze were edited
+
+    ``changes`` are ``(row, column, value)`` triples with the new values.
+    Only cells whose paths led through a removed cell and cells that get
+    closer to a target are touched.
+    ``owners`` from ``flood_into`` are repaired too, as long as no target is added or removed.
+    ``stats``, a dict, gets the jobs enqueued, the stale ones skipped and the cells settled.
+    Returns the change in the number of unreachable cells.
+    """
+    cdef coords shape = coords(distances.shape[0], distances.shape[1])
+    cdef JobQueue region = JobQueue(64)
+    cdef JobQueue seeds = JobQueue(64)
+    cdef JobQueue jobs = JobQueue(64)
+    cdef Py_ssize_t delta = 0, i
+    cdef int value
+    cdef Py_ssize_t taken = 0, settled = 0
+    cdef char old
+    cdef coords loc
+    cdef job ajob
+
+    # a cell edited more than once in the batch only gets its last value
+    last = {}
+    for row, column, value in changes:
+        last[int(row), int(column)] = int(value)
+    changes = [(row, column, value) for (row, column), value in last.items()]
+    for row, column, value in changes:
+        if not (0 <= row < shape.r and 0 <= column < shape.c):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        if owners is not None and (value == 1) != (directions[row, column] == TARGET):
+            raise ValueError('Owners cannot be repaired when targets change')
+
+    # Walls and removed targets break the paths leading through them
+    for row, column, value in changes:
+        loc = coords(row, column)
+        old = directions[loc.r, loc.c]
+        if value < 0 and old != WALL or value != 1 and old == TARGET:
+            delta += invalidate(distances, directions, owners, shape, loc, region)
+
+    for row, column, value in changes:
+        loc = coords(row, column)
+        old = directions[loc.r, loc.c]
+        if value < 0:
+            if old == SPACE:
+                delta -= 1
+            distances[loc.r, loc.c] = -1
+            directions[loc.r, loc.c] = WALL
+        elif value == 1:
+            if old == WALL:
+                directions[loc.r, loc.c] = SPACE
+                delta += 1
+            seeds.put(job(loc, 0, TARGET))
+        elif old == WALL:
+            directions[loc.r, loc.c] = SPACE
+            delta += 1
+            region.put(job(loc, -1, SPACE))
+
+    # The region is entered from its settled border
+    for i in range(region.top):
+        loc = region.jobs[i].loc
+        if directions[loc.r, loc.c] == SPACE:
+            ajob = best_neighbour(distances, shape, loc)
+            if ajob.dist >= 0:
+                seeds.put(ajob)
+    qsort(seeds.jobs, seeds.top, sizeof(job), compare_jobs)
+
+    # Merging the sorted seeds with the FIFO keeps the jobs ordered by distance
+    i = 0
+    while i < seeds.top or not jobs.empty():
+        if i < seeds.top and (jobs.empty() or seeds.jobs[i].dist <= jobs.peek().dist):
+            ajob = seeds.jobs[i]
+            i += 1
+        else:
+            ajob = jobs.get()
+        taken += 1
+        loc = ajob.loc
+        if directions[loc.r, loc.c] == WALL or 0 <= distances[loc.r, loc.c] <= ajob.dist:
+            continue
+        if distances[loc.r, loc.c] < 0:
+            delta -= 1
+        settle(distances, directions, owners, shape, ajob, jobs)
+        settled += 1
+
+    if stats is not None:
+        # every job queued is taken before the loop ends
+        stats['enqueued'] = stats.get('enqueued', 0) + taken
+        stats['stale'] = stats.get('stale', 0) + taken - settled
+        stats['settled'] = stats.get('settled', 0) + settled
+    return delta
+
+
 def create_lines(arrows, locations):
-    ret = []
-    for loc in locations:
-        loc = tuple(loc)
-        try:
-            ret.append(arrows_to_path(arrows, *loc))
-        except ValueError:
-            # unreachable
-            pass
-    return ret
+    steps, offsets = arrows_to_paths(arrows, locations)
+    return lines_of(steps, offsets)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def lines_of(const numpy.int32_t[:, ::1] steps, const numpy.intp_t[::1] offsets):
+    # Lists of tuples of the nonempty paths
+    cdef Py_ssize_t i, j
+    lines = []
+    for i in range(offsets.shape[0] - 1):
+        if offsets[i + 1] > offsets[i]:
+            lines.append([(steps[j, 0], steps[j, 1]) for j in range(offsets[i], offsets[i + 1])])
+    return lines
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def regions(const numpy.int16_t[:, :] owners, count=None):
+    """Cells owned by each target, in the layout of ``arrows_to_paths``
+
+    Returns ``cells``, an int32 array of the ``(row, column)`` cells of all targets
+    one after another, and ``offsets``, target ``i`` owns ``cells[offsets[i]:offsets[i + 1]]``.
+    ``count`` is the number of targets, by default one more than the largest owner.
+    """
+    cdef Py_ssize_t row, column, owner, targets
+    cdef numpy.intp_t[::1] bounds, fill
+    cdef numpy.int32_t[:, ::1] view
+    if count is None:
+        count = int(numpy.asarray(owners).max(initial=-1)) + 1
+    targets = count
+    offsets = numpy.zeros(count + 1, dtype=numpy.intp)
+    bounds = offsets
+
+    # A counting sort, cells of each target stay in row major order
+    for row in range(owners.shape[0]):
+        for column in range(owners.shape[1]):
+            owner = owners[row, column]
+            if 0 <= owner < targets:
+                bounds[owner + 1] += 1
+    for owner in range(targets):
+        bounds[owner + 1] += bounds[owner]
+    fill = offsets[:-1].copy()
+
+    cells = numpy.empty((bounds[targets], 2), dtype=numpy.int32)
+    view = cells
+    for row in range(owners.shape[0]):
+        for column in range(owners.shape[1]):
+            owner = owners[row, column]
+            if 0 <= owner < targets:
+                view[fill[owner], 0] = row
+                view[fill[owner], 1] = column
+                fill[owner] += 1
+    return cells, offsets
 
 
 def is_reachable(arrows):
     return b' ' not in arrows
 
 
+def count_unreachable(arrows):
+    return numpy.count_nonzero(arrows == b' ')
+
+
 class AnalyzedMaze:
+    """Flood results of a maze, each one computed on first use and then kept
+
+    ``materialize()`` computes all of them at once.
+    With ``stop_when_reached`` the flood stops once those cells have their distances,
+    see ``flood_into``, and whether other cells are reachable is not known.
+    ``engine`` picks the flood, see ``ENGINES``.
+    With ``stats`` (or a ``stats_hook``) ``stats`` is a dict of counters summed over
+    the work done so far, see ``record_stats``, otherwise it is None and nothing is measured.
+    A ``PackedMaze`` is kept as ``packed`` until an edit or ``maze`` needs the int8 array.
+    """
+    def __init__(self, maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None,
+                 stats=False, stats_hook=None):
+        check_engine(engine, threads, costs, stop_when_reached)
+        # an own copy, the caller may edit the maze before anything is computed
+        if isinstance(maze, PackedMaze):
+            self.packed, self._maze = maze.copy(), None
+        else:
+            self.packed, self._maze = None, numpy.array(maze, dtype=numpy.int8)
+        self.compact = compact
+        self.threads = threads
+        self.costs = costs
+        self.stop_when_reached = stop_when_reached
+        self.engine = engine
+        self.stats = {} if stats or stats_hook is not None else None
+        self.stats_hook = stats_hook
+        self.partial = False
+        self._distances = self._directions = self._owners = None
+        self._starts = self._start_paths = self._lines = self._unreachable = None
+
+    def share(self):
+        """A new analysis of the same maze sharing the results computed so far
+
+        The shared arrays become read-only, the first edit of either analysis copies them.
+        """
+        shared = AnalyzedMaze(self.packed or self.maze, self.compact, self.threads, self.costs, self.stop_when_reached,
+                              self.engine, self.stats is not None, self.stats_hook)
+        for array in self._distances, self._directions, self._owners, *(self._start_paths or ()):
+            if array is not None:
+                array.flags.writeable = False
+        shared._distances, shared._directions, shared._owners = self._distances, self._directions, self._owners
+        shared._unreachable = self._unreachable
+        shared.partial = self.partial
+        shared._starts = None if self._starts is None else set(self._starts)
+        shared._start_paths = self._start_paths
+        return shared
+
+    @property
+    def maze(self):
+        """The maze as an int8 array, a ``PackedMaze`` is unpacked when this is first used"""
+        if self._maze is None:
+            self._maze, self.packed = self.packed.unpack(), None
+        return self._maze
+
+    def materialize(self):
+        """Computes everything that is not computed yet"""
+        # the properties keep what they compute
+        self.distances, self.starts, self.lines, self.unreachable
+        return self
+
+    def record_stats(self, event, values):
+        """Adds ``values`` measured by ``event`` to ``stats`` and passes them to ``stats_hook``
+
+        The events are ``'flood'`` (``floods``, the counters of ``record_flood``),
+        ``'repair'`` (``repairs``, the counters of ``repair`` and ``repair_seconds``),
+        ``'lines'`` (``lines_seconds``) and ``'reachable'`` (``reachable_seconds``).
+        ``peak`` keeps the largest value, the others are summed.
+        """
+        for name, value in values.items():
+            if name == 'peak':
+                self.stats[name] = max(self.stats.get(name, 0), value)
+            else:
+                self.stats[name] = self.stats.get(name, 0) + value
+        if self.stats_hook is not None:
+            self.stats_hook(event, values)
+
+    def flood(self, owners=False):
+        """Floods the maze again, with ``owners`` the owners are found in the same pass"""
+        measured = None if self.stats is None else {'floods': 1}
+        threads, engine = self.threads, self.engine
+        if owners and engine == 'bitparallel':
+            # the bit-parallel flood has no owners, the level flood breaks ties the same way
+            threads, engine = 1, None
+        # a packed maze is flooded from its bits, see flood_packed
+        results = flood(self.packed or self.maze, compact=self.compact, threads=threads, costs=self.costs,
+                        stop_when_reached=self.stop_when_reached, owners=owners, engine=engine, stats=measured)
+        if measured is not None:
+            self.record_stats('flood', measured)
+        self._distances, self._directions = results[:2]
+        self._owners = results[2] if owners else None
+        self.partial = self.stop_when_reached is not None and UNKNOWN_CODE in self._directions.view(numpy.uint8)
+        self._start_paths = self._lines = self._unreachable = None
+
+    @property
+    def distances(self):
+        if self._distances is None:
+            self.flood()
+        return self._distances
+
+    @property
+    def directions(self):
+        if self._directions is None:
+            self.flood()
+        return self._directions
+
+    @directions.setter
+    def directions(self, directions):
+        # the distances stay as they are, so they have to exist
+        self.distances
+        self._directions = directions
+        self._start_paths = self._lines = self._unreachable = self._owners = None
+
+    @property
+    def starts(self):
+        """Cells of the dudes as a set of tuples"""
+        if self._starts is None:
+            cells = starts(self.maze) if self.packed is None else self.packed.dudes[:, :2]
+            self._starts = set(map(tuple, cells))
+        return self._starts
+
+    @property
+    def start_paths(self):
+        """Paths of the starts in the layout of ``arrows_to_paths``"""
+        if self._start_paths is None:
+            self._start_paths = self.paths(sorted(self.starts))
+        return self._start_paths
+
+    @property
+    def lines(self):
+        """Paths of the reachable starts as lists of tuples"""
+        if self._lines is None:
+            if self.stats is None:
+                self._lines = lines_of(*self.start_paths)
+            else:
+                start = time.perf_counter()
+                self._lines = lines_of(*self.start_paths)
+                self.record_stats('lines', {'lines_seconds': time.perf_counter() - start})
+        return self._lines
+
+    @property
+    def unreachable(self):
+        """The number of open cells that cannot reach any target, None if the flood stopped early"""
+        if self._unreachable is None:
+            directions = self.directions
+            if self.partial:
+                return None
+            if self.stats is None:
+                self._unreachable = count_unreachable(directions)
+            else:
+                start = time.perf_counter()
+                self._unreachable = count_unreachable(directions)
+                self.record_stats('reachable', {'reachable_seconds': time.perf_counter() - start})
+        return self._unreachable
+
+    @property
+    def is_reachable(self):
+        unreachable = self.unreachable
+        return None if unreachable is None else unreachable == 0
+
+    @property
+    def codes(self):
+        """The directions as an uint8 array of direction codes"""
+        return self.directions.view(numpy.uint8)
+
+    @property
+    def targets(self):
+        """Cells of the targets, target ``i`` is ``targets[i]``"""
+        return ends(self.maze) if self.packed is None else self.packed.targets.copy()
+
+    @property
+    def owners(self):
+        """The index of the target each cell leads to as an int16 array, -1 for none"""
+        if self._owners is None:
+            # the flood is redone with owners, it takes a single pass either way
+            self.flood(owners=True)
+        return self._owners
+
+    @property
+    def region_sizes(self):
+        """The number of cells each target owns"""
+        owners = self.owners
+        return numpy.bincount(owners[owners >= 0], minlength=len(self.targets))
+
+    @property
+    def regions(self):
+        """Cells owned by each target, see ``regions``"""
+        return regions(self.owners, len(self.targets))
+
+    def region(self, index):
+        """Cells owned by the target as an ``(n, 2)`` int32 array"""
+        return numpy.argwhere(self.owners == index).astype(numpy.int32)
+
+    def direction(self, row, column):
+        """The direction code of a cell, as a plain int"""
+        return self.directions.view(numpy.uint8).item(row, column)
+
+    def path(self, column, row, as_array=False):
+        """The path from the cell to a target, an ``(n, 2)`` int32 array with ``as_array``"""
+        if not as_array:
+            return arrows_to_path(self.directions, column, row)
+        steps, _ = arrows_to_paths(self.directions, [(column, row)])
+        if not len(steps):
+            # raises the same errors as for lists
+            arrows_to_path(self.directions, column, row)
+        return steps
+
+    def paths(self, starts):
+        """Paths from many cells at once, see ``arrows_to_paths``"""
+        return arrows_to_paths(self.directions, starts)
+
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
+
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze to the analysis
+
+        Only the region affected by the edits is recomputed.
+        The distances are the same as after a new flood,
+        the directions may pick another one of equally short paths.
+        Mazes with costs are flooded again.
+        """
+        changes = [(int(row), int(column), int(value)) for row, column, value in changes]
+        costs = None if self.costs is None else numpy.asarray(self.costs)
+        # the whole batch is checked before the maze changes
+        for row, column, value in changes:
+            if not (0 <= row < self.maze.shape[0] and 0 <= column < self.maze.shape[1]):
+                raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+            if costs is not None and value >= 0 and not 1 <= costs[row, column] <= 255:
+                raise ValueError('Costs of open cells have to be between 1 and 255')
+        for row, column, value in changes:
+            if (value == 1) != (self.maze[row, column] == 1):
+                # targets are numbered in order, owners are found again when needed
+                self._owners = None
+            self.maze[row, column] = value
+            if self._starts is None:
+                continue
+            if value >= 2:
+                self._starts.add((row, column))
+            else:
+                self._starts.discard((row, column))
+
+        # nothing to repair before the first flood
+        if self._directions is None:
+            return
+        if self.partial:
+            # cells the flood did not get to cannot be repaired, it is redone when needed
+            self._distances = self._directions = self._owners = None
+            self._start_paths = self._lines = self._unreachable = None
+            self.partial = False
+            return
+        if self.costs is not None:
+            self.flood()
+            return
+        if not self._directions.flags.writeable:
+            # shared with another analysis, see share()
+            self._distances, self._directions = self._distances.copy(), self._directions.copy()
+            if self._owners is not None:
+                self._owners = self._owners.copy()
+        if self.stats is None:
+            delta = repair(self._distances, self._directions, changes, self._owners)
+        else:
+            measured = {'repairs': 1}
+            start = time.perf_counter()
+            delta = repair(self._distances, self._directions, changes, self._owners, measured)
+            measured['repair_seconds'] = time.perf_counter() - start
+            self.record_stats('repair', measured)
+        if self._unreachable is not None:
+            self._unreachable += delta
+        self._start_paths = self._lines = None
+
+
+def analyze(maze, compact=False, threads=None, costs=None, stop_when_reached=None, engine=None,
+            stats=False, stats_hook=None):
+    return AnalyzedMaze(maze, compact, threads, costs, stop_when_reached, engine, stats, stats_hook)
+
+
+# Open runs of border cells at least this wide get a node at each end, others one in the middle
+DEF WIDE_ENTRANCE = 6
+# With at most this many targets the search is guided by the distance to the nearest one
+DEF GUIDING_TARGETS = 16
+
+
+cdef class Cluster:
+    # One chunk of a HierarchicalMaze, its nodes are the entrances on its borders
+    cdef coords lo, hi
+    cdef int count
+    cdef coords * cells
+    # distances between the nodes and from them to the nearest target, -1 if there is no way
+    cdef int * table
+    cdef int * exits
+    # the node across the border in each direction, as a global node number
+    cdef Py_ssize_t * links
+    cdef unsigned int * stamps
+    cdef int * costs
+    cdef Py_ssize_t * parents
+    cdef dict index
+    cdef list pending
+
+    def __cinit__(self, int count):
+        self.cells = <coords *>PyMem_Malloc(max(count, 1)*sizeof(coords))
+        self.table = <int *>PyMem_Malloc(max(count*count, 1)*sizeof(int))
+        self.exits = <int *>PyMem_Malloc(max(count, 1)*sizeof(int))
+        self.links = <Py_ssize_t *>PyMem_Malloc(max(4*count, 1)*sizeof(Py_ssize_t))
+        self.stamps = <unsigned int *>calloc(max(count, 1), sizeof(unsigned int))
+        self.costs = <int *>PyMem_Malloc(max(count, 1)*sizeof(int))
+        self.parents = <Py_ssize_t *>PyMem_Malloc(max(count, 1)*sizeof(Py_ssize_t))
+        if self.cells == NULL or self.table == NULL or self.exits == NULL or self.links == NULL or \
+                self.stamps == NULL or self.costs == NULL or self.parents == NULL:
+            raise MemoryError()
+        self.count = count
+
+    def __dealloc__(self):
+        PyMem_Free(self.cells)
+        PyMem_Free(self.table)
+        PyMem_Free(self.exits)
+        PyMem_Free(self.links)
+        free(self.stamps)
+        PyMem_Free(self.costs)
+        PyMem_Free(self.parents)
+
+
+cdef struct open_node:
+    int f
+    int g
+    Py_ssize_t node
+
+
+cdef class HierarchicalMaze:
+    """Cluster graph of a maze for many path queries on huge maps
+
+    The maze is cut into ``chunk`` x ``chunk`` clusters. Every open run of cells
+    along a cluster border is an entrance with one or two nodes, and each cluster
+    knows the distances between its nodes and from them to its nearest target.
+    Paths are searched on this graph and refined inside the clusters,
+    so a path is valid but may be a few steps longer than the shortest one.
+    Edits only rebuild the clusters they touch.
+    """
+    cdef readonly object maze
+    cdef readonly int chunk
+    cdef readonly Py_ssize_t explored
+    cdef numpy.int8_t[:, ::1] grid
+    cdef coords shape, grid_shape
+    cdef Py_ssize_t stride
+    cdef list clusters
+    cdef int * window
+    cdef coords * queue
+    cdef open_node * heap
+    cdef Py_ssize_t count, capacity
+    cdef unsigned int stamp
+    cdef set targets
+    cdef coords[GUIDING_TARGETS] guides
+    cdef int guide_count
+
+    def __cinit__(self, maze, int chunk=16):
+        if chunk < 2:
+            raise ValueError('The chunks have to be at least 2 cells wide')
+        self.window = <int *>PyMem_Malloc(chunk*chunk*sizeof(int))
+        self.queue = <coords *>PyMem_Malloc(chunk*chunk*sizeof(coords))
+        self.heap = <open_node *>PyMem_Malloc(16*sizeof(open_node))
+        if self.window == NULL or self.queue == NULL or self.heap == NULL:
+            raise MemoryError()
+        self.capacity = 16
+
+    def __dealloc__(self):
+        PyMem_Free(self.window)
+        PyMem_Free(self.queue)
+        PyMem_Free(self.heap)
+
+    def __init__(self, maze, int chunk=16):
+        # an own copy, kept up to date by update_cells
+        self.maze = numpy.array(maze, dtype=numpy.int8)
+        self.grid = self.maze
+        self.chunk = chunk
+        self.shape.r, self.shape.c = self.maze.shape
+        self.grid_shape.r = (self.shape.r + chunk - 1) // chunk
+        self.grid_shape.c = (self.shape.c + chunk - 1) // chunk
+        # global node numbers are the cluster number times the most nodes a cluster can have
+        self.stride = 4*chunk
+        self.targets = set(map(tuple, ends(self.maze)))
+        self.clusters = [self.build(k) for k in range(self.grid_shape.r*self.grid_shape.c)]
+        for k in range(len(self.clusters)):
+            self.link(k)
+
+    @property
+    def nodes(self):
+        """The number of nodes of the cluster graph"""
+        return sum((<Cluster>cluster).count for cluster in self.clusters)
+
+    cdef list border(self, coords lo, coords hi, int side):
+        # Pairs of cells inside and outside of the cluster where entrances cross its side
+        cdef coords inside, outside
+        cdef int first, last, position, run
+        pairs = []
+        if side < 2:
+            first, last = lo.c, hi.c
+        else:
+            first, last = lo.r, hi.r
+        run = first
+        for position in range(first, last + 1):
+            if position < last:
+                if side == 0:
+                    inside.r, inside.c = lo.r, position
+                elif side == 1:
+                    inside.r, inside.c = hi.r - 1, position
+                elif side == 2:
+                    inside.r, inside.c = position, lo.c
+                else:
+                    inside.r, inside.c = position, hi.c - 1
+                outside = step(self.shape, inside, side)
+                if outside.r != -1 and self.grid[inside.r, inside.c] >= 0 and \
+                        self.grid[outside.r, outside.c] >= 0:
+                    continue
+            # the run of open pairs ends before position
+            if position - run >= WIDE_ENTRANCE:
+                ends = (run, position - 1)
+            elif position > run:
+                ends = ((run + position - 1) // 2,)
+            else:
+                ends = ()
+            for end in ends:
+                if side < 2:
+                    inside.r, inside.c = (lo.r if side == 0 else hi.r - 1), end
+                else:
+                    inside.r, inside.c = end, (lo.c if side == 2 else hi.c - 1)
+                outside = step(self.shape, inside, side)
+                pairs.append(((inside.r, inside.c), (outside.r, outside.c)))
+            run = position + 1
+        return pairs
+
+    cdef Cluster build(self, Py_ssize_t k):
+        cdef coords lo, hi, loc
+        cdef int i, j, side, width
+        cdef Cluster cluster
+        lo.r = k // self.grid_shape.c * self.chunk
+        lo.c = k % self.grid_shape.c * self.chunk
+        hi.r = min(lo.r + self.chunk, self.shape.r)
+        hi.c = min(lo.c + self.chunk, self.shape.c)
+
+        index = {}
+        pending = []
+        for side in range(4):
+            for inside, outside in self.border(lo, hi, side):
+                local = index.setdefault(inside, len(index))
+                pending.append((local, side, outside))
+
+        cluster = Cluster(len(index))
+        cluster.lo, cluster.hi = lo, hi
+        cluster.index = index
+        cluster.pending = pending
+        for (loc.r, loc.c), i in index.items():
+            cluster.cells[i] = loc
+
+        width = hi.c - lo.c
+        for i in range(cluster.count):
+            self.window_bfs(lo, hi, cluster.cells[i], False)
+            for j in range(cluster.count):
+                loc = cluster.cells[j]
+                cluster.table[i*cluster.count + j] = self.window[(loc.r - lo.r)*width + loc.c - lo.c]
+        self.window_bfs(lo, hi, lo, True)
+        for i in range(cluster.count):
+            loc = cluster.cells[i]
+            cluster.exits[i] = self.window[(loc.r - lo.r)*width + loc.c - lo.c]
+        return cluster
+
+    cdef void link(self, Py_ssize_t k):
+        cdef Cluster cluster = self.clusters[k]
+        cdef Py_ssize_t across
+        cdef int i
+        for i in range(4*cluster.count):
+            cluster.links[i] = -1
+        for local, side, outside in cluster.pending:
+            across = k + (-self.grid_shape.c, self.grid_shape.c, -1, 1)[side]
+            cluster.links[4*local + side] = \
+                across*self.stride + (<Cluster>self.clusters[across]).index[outside]
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void window_bfs(self, coords lo, coords hi, coords source, bint targets):
+        # Distances inside the window from the source, or from all targets in it
+        cdef int width = hi.c - lo.c, top = 0, bottom = 0, dist, preference
+        cdef coords loc, nloc
+        for dist in range((hi.r - lo.r)*width):
+            self.window[dist] = -1
+        if targets:
+            for loc.r in range(lo.r, hi.r):
+                for loc.c in range(lo.c, hi.c):
+                    if self.grid[loc.r, loc.c] == 1:
+                        self.window[(loc.r - lo.r)*width + loc.c - lo.c] = 0
+                        self.queue[top] = loc
+                        top += 1
+        else:
+            self.window[(source.r - lo.r)*width + source.c - lo.c] = 0
+            self.queue[top] = source
+            top += 1
+
+        while bottom < top:
+            loc = self.queue[bottom]
+            bottom += 1
+            dist = self.window[(loc.r - lo.r)*width + loc.c - lo.c] + 1
+            for preference in range(4):
+                nloc = step(self.shape, loc, preference)
+                if nloc.r < lo.r or nloc.r >= hi.r or nloc.c < lo.c or nloc.c >= hi.c or \
+                        self.grid[nloc.r, nloc.c] < 0 or \
+                        self.window[(nloc.r - lo.r)*width + nloc.c - lo.c] >= 0:
+                    continue
+                self.window[(nloc.r - lo.r)*width + nloc.c - lo.c] = dist
+                self.queue[top] = nloc
+                top += 1
+
+    cdef list window_trace(self, coords lo, coords hi, coords loc):
+        # Walks down the window distances from loc to the source
+        cdef int width = hi.c - lo.c, dist, preference
+        cdef coords nloc
+        path = [(loc.r, loc.c)]
+        dist = self.window[(loc.r - lo.r)*width + loc.c - lo.c]
+        while dist > 0:
+            for preference in range(4):
+                nloc = step(self.shape, loc, preference)
+                if lo.r <= nloc.r < hi.r and lo.c <= nloc.c < hi.c and \
+                        self.window[(nloc.r - lo.r)*width + nloc.c - lo.c] == dist - 1:
+                    break
+            loc = nloc
+            dist -= 1
+            path.append((loc.r, loc.c))
+        return path
+
+    cdef int push(self, int f, int g, Py_ssize_t node) except -1:
+        cdef Py_ssize_t i = self.count, parent
+        cdef open_node * heap
+        if self.count == self.capacity:
+            heap = <open_node *>PyMem_Realloc(self.heap, 2*self.capacity*sizeof(open_node))
+            if heap == NULL:
+                raise MemoryError()
+            self.heap = heap
+            self.capacity *= 2
+        self.count += 1
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.heap[parent].f <= f:
+                break
+            self.heap[i] = self.heap[parent]
+            i = parent
+        self.heap[i].f = f
+        self.heap[i].g = g
+        self.heap[i].node = node
+        return 0
+
+    cdef open_node pop(self):
+        cdef open_node top = self.heap[0], last
+        cdef Py_ssize_t i = 0, child
+        self.count -= 1
+        last = self.heap[self.count]
+        while True:
+            child = 2*i + 1
+            if child >= self.count:
+                break
+            if child + 1 < self.count and self.heap[child + 1].f < self.heap[child].f:
+                child += 1
+            if self.heap[child].f >= last.f:
+                break
+            self.heap[i] = self.heap[child]
+            i = child
+        self.heap[i] = last
+        return top
+
+    cdef int relax(self, Py_ssize_t node, int g, Py_ssize_t parent) except -1:
+        cdef Cluster cluster = self.clusters[node // self.stride]
+        cdef Py_ssize_t i = node % self.stride
+        cdef int j, h = INT_MAX
+        cdef coords loc = cluster.cells[i]
+        if cluster.stamps[i] == self.stamp and cluster.costs[i] <= g:
+            return 0
+        cluster.stamps[i] = self.stamp
+        cluster.costs[i] = g
+        cluster.parents[i] = parent
+        # the Manhattan distance to the nearest target never overestimates
+        for j in range(self.guide_count):
+            h = min(h, abs(loc.r - self.guides[j].r) + abs(loc.c - self.guides[j].c))
+        return self.push(g + (h if self.guide_count else 0), g, node)
+
+    cdef coords cell(self, Py_ssize_t node):
+        return (<Cluster>self.clusters[node // self.stride]).cells[node % self.stride]
+
+    def path(self, int row, int column):
+        """A path from the cell to a target, like ``AnalyzedMaze.path``"""
+        cdef coords start, loc
+        cdef Cluster cluster
+        cdef open_node current
+        cdef Py_ssize_t k, node, last = -2
+        cdef int i, j, g, best = INT_MAX, width
+        if not (0 <= row < self.shape.r and 0 <= column < self.shape.c):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        if self.grid[row, column] < 0:
+            raise ValueError('Cannot construct path for wall')
+        start.r, start.c = row, column
+
+        self.stamp += 1
+        if self.stamp == 0:
+            for cluster in self.clusters:
+                memset(cluster.stamps, 0, cluster.count*sizeof(unsigned int))
+            self.stamp = 1
+        self.count = 0
+        self.explored = 0
+        self.guide_count = 0
+        if len(self.targets) <= GUIDING_TARGETS:
+            for row, column in self.targets:
+                self.guides[self.guide_count].r = row
+                self.guides[self.guide_count].c = column
+                self.guide_count += 1
+
+        # The graph is entered from the nodes of the start cluster, its own targets end the search at once
+        k = start.r // self.chunk * self.grid_shape.c + start.c // self.chunk
+        cluster = self.clusters[k]
+        width = cluster.hi.c - cluster.lo.c
+        self.window_bfs(cluster.lo, cluster.hi, start, False)
+        for i in range(cluster.count):
+            loc = cluster.cells[i]
+            g = self.window[(loc.r - cluster.lo.r)*width + loc.c - cluster.lo.c]
+            if g >= 0:
+                self.relax(k*self.stride + i, g, -1)
+        for loc.r in range(cluster.lo.r, cluster.hi.r):
+            for loc.c in range(cluster.lo.c, cluster.hi.c):
+                g = self.window[(loc.r - cluster.lo.r)*width + loc.c - cluster.lo.c]
+                if self.grid[loc.r, loc.c] == 1 and 0 <= g < best:
+                    best, last = g, -1
+
+        while self.count and self.heap[0].f < best:
+            current = self.pop()
+            node = current.node
+            cluster = self.clusters[node // self.stride]
+            i = node % self.stride
+            if current.g > cluster.costs[i]:
+                continue
+            self.explored += 1
+            if cluster.exits[i] >= 0 and current.g + cluster.exits[i] < best:
+                best, last = current.g + cluster.exits[i], node
+            k = node - i
+            for j in range(cluster.count):
+                g = cluster.table[i*cluster.count + j]
+                if g > 0:
+                    self.relax(k + j, current.g + g, node)
+            for j in range(4):
+                if cluster.links[4*i + j] >= 0:
+                    self.relax(cluster.links[4*i + j], current.g + 1, node)
+
+        if last == -2:
+            raise ValueError('Cannot construct path for unreachable cell')
+        return self.refine(start, last)
+
+    cdef list refine(self, coords start, Py_ssize_t last):
+        # Replaces the hops between nodes by paths inside their clusters
+        cdef Cluster cluster
+        cdef Py_ssize_t node = last
+        nodes = []
+        while node != -1:
+            nodes.append(node)
+            cluster = self.clusters[node // self.stride]
+            node = cluster.parents[node % self.stride]
+        nodes.reverse()
+
+        path = [(start.r, start.c)]
+        previous = start
+        for node in nodes:
+            cluster = self.clusters[node // self.stride]
+            # nodes across a border are neighbours, the others share the cluster
+            if cluster.lo.r <= previous.r < cluster.hi.r and cluster.lo.c <= previous.c < cluster.hi.c:
+                self.window_bfs(cluster.lo, cluster.hi, self.cell(node), False)
+                path.extend(self.window_trace(cluster.lo, cluster.hi, previous)[1:])
+            else:
+                path.append((self.cell(node).r, self.cell(node).c))
+            previous = self.cell(node)
+
+        cluster = self.clusters[previous.r // self.chunk * self.grid_shape.c + previous.c // self.chunk]
+        self.window_bfs(cluster.lo, cluster.hi, previous, True)
+        path.extend(self.window_trace(cluster.lo, cluster.hi, previous)[1:])
+        return path
+
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
+
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze, rebuilding only the touched clusters"""
+        cdef int row, column, value, chunk = self.chunk
+        cdef Py_ssize_t k
+        rebuilt = set()
+        for row, column, value in changes:
+            if not (0 <= row < self.shape.r and 0 <= column < self.shape.c):
+                raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+            self.grid[row, column] = value
+            if value == 1:
+                self.targets.add((row, column))
+            else:
+                self.targets.discard((row, column))
+            k = row // chunk * self.grid_shape.c + column // chunk
+            rebuilt.add(k)
+            # cells on a border also move the entrances of the cluster across
+            if row % chunk == 0 and row > 0:
+                rebuilt.add(k - self.grid_shape.c)
+            if row % chunk == chunk - 1 and row < self.shape.r - 1:
+                rebuilt.add(k + self.grid_shape.c)
+            if column % chunk == 0 and column > 0:
+                rebuilt.add(k - 1)
+            if column % chunk == chunk - 1 and column < self.shape.c - 1:
+                rebuilt.add(k + 1)
+
+        relinked = set(rebuilt)
+        for k in rebuilt:
+            self.clusters[k] = self.build(k)
+            if k >= self.grid_shape.c:
+                relinked.add(k - self.grid_shape.c)
+            if k + self.grid_shape.c < len(self.clusters):
+                relinked.add(k + self.grid_shape.c)
+            if k % self.grid_shape.c > 0:
+                relinked.add(k - 1)
+            if k % self.grid_shape.c < self.grid_shape.c - 1:
+                relinked.add(k + 1)
+        for k in relinked:
+            self.link(k)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+cdef class ComponentIndex:
+    """Connected components of the open cells for reachability queries without a flood
+
+    A union-find over the cells, walls belong to no component.
+    Removing a wall joins the components around it in place, changing targets
+    only updates counts, a new wall may split a component, so the index is
+    built again on the next query.
+    """
+    cdef readonly object maze
+    cdef numpy.int8_t[:, ::1] grid
+    cdef Py_ssize_t[::1] parents, sizes, targets
+    cdef coords shape
+    cdef Py_ssize_t lost
+    cdef bint stale
+
+    def __init__(self, maze):
+        # an own copy, kept up to date by update_cells
+        self.maze = numpy.array(maze, dtype=numpy.int8)
+        self.grid = self.maze
+        self.shape.r, self.shape.c = self.maze.shape
+        self.parents = numpy.empty(self.maze.size, dtype=numpy.intp)
+        self.sizes = numpy.empty(self.maze.size, dtype=numpy.intp)
+        self.targets = numpy.empty(self.maze.size, dtype=numpy.intp)
+        self.build()
+
+    cdef void build(self) nogil:
+        cdef Py_ssize_t cell = 0, width = self.shape.c
+        cdef int row, column
+        self.lost = 0
+        for row in range(self.shape.r):
+            for column in range(width):
+                self.parents[cell] = -1
+                if self.grid[row, column] >= 0:
+                    self.open(cell, self.grid[row, column])
+                    # the cells above and to the left are already open
+                    if row and self.parents[cell - width] != -1:
+                        self.join(cell, cell - width)
+                    if column and self.parents[cell - 1] != -1:
+                        self.join(cell, cell - 1)
+                cell += 1
+        self.stale = False
+
+    cdef inline void open(self, Py_ssize_t cell, int value) nogil:
+        # A new component of one cell
+        self.parents[cell] = cell
+        self.sizes[cell] = 1
+        self.targets[cell] = value == 1
+        if value != 1:
+            self.lost += 1
+
+    cdef Py_ssize_t find(self, Py_ssize_t cell) nogil:
+        # path halving, every other cell on the way skips to its grandparent
+        while self.parents[cell] != cell:
+            self.parents[cell] = self.parents[self.parents[cell]]
+            cell = self.parents[cell]
+        return cell
+
+    cdef void join(self, Py_ssize_t a, Py_ssize_t b) nogil:
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return
+        if self.sizes[a] < self.sizes[b]:
+            a, b = b, a
+        # a component without targets becomes reachable through the other one
+        if self.targets[a] and not self.targets[b]:
+            self.lost -= self.sizes[b]
+        elif self.targets[b] and not self.targets[a]:
+            self.lost -= self.sizes[a]
+        self.parents[b] = a
+        self.sizes[a] += self.sizes[b]
+        self.targets[a] += self.targets[b]
+
+    cdef Py_ssize_t label(self, int row, int column) except -2:
+        if not (0 <= row < self.shape.r and 0 <= column < self.shape.c):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        if self.stale:
+            self.build()
+        if self.parents[row*self.shape.c + column] == -1:
+            return -1
+        return self.find(row*self.shape.c + column)
+
+    def component(self, int row, int column):
+        """A label of the component of the cell, -1 for walls
+
+        Labels are the same for cells of the same component until the next edit.
+        """
+        return self.label(row, column)
+
+    def labels(self):
+        """Labels of all cells as ``component`` gives them, in an array of the maze shape"""
+        cdef Py_ssize_t[::1] flat
+        cdef Py_ssize_t cell
+        if self.stale:
+            self.build()
+        labels = numpy.empty(self.maze.shape, dtype=numpy.intp)
+        flat = labels.reshape(-1)
+        for cell in range(flat.shape[0]):
+            flat[cell] = -1 if self.parents[cell] == -1 else self.find(cell)
+        return labels
+
+    def same_component(self, a, b):
+        """Whether open cells ``a`` and ``b`` (``(row, column)``) are connected"""
+        label = self.label(a[0], a[1])
+        return label != -1 and label == self.label(b[0], b[1])
+
+    def reaches_target(self, int row, int column):
+        """Whether the cell is open and connected to a target"""
+        cdef Py_ssize_t label = self.label(row, column)
+        return label != -1 and self.targets[label] > 0
+
+    @property
+    def unreachable(self):
+        """The number of open cells that cannot reach any target"""
+        if self.stale:
+            self.build()
+        return self.lost
+
+    @property
+    def is_reachable(self):
+        return self.unreachable == 0
+
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
+
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze"""
+        cdef int row, column, value, old, side
+        cdef Py_ssize_t cell, label
+        cdef coords loc, nloc
+        for row, column, value in changes:
+            if not (0 <= row < self.shape.r and 0 <= column < self.shape.c):
+                raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+            old = self.grid[row, column]
+            self.grid[row, column] = value
+            if self.stale or old < 0 and value < 0:
+                continue
+            if value < 0:
+                self.stale = True
+                continue
+            cell = row*self.shape.c + column
+            if old < 0:
+                self.open(cell, value)
+                loc.r, loc.c = row, column
+                for side in range(4):
+                    nloc = step(self.shape, loc, side)
+                    if nloc.r != -1 and self.parents[nloc.r*self.shape.c + nloc.c] != -1:
+                        self.join(cell, nloc.r*self.shape.c + nloc.c)
+                continue
+            if (old == 1) == (value == 1):
+                continue
+            label = self.find(cell)
+            if value == 1:
+                if not self.targets[label]:
+                    self.lost -= self.sizes[label]
+                self.targets[label] += 1
+            else:
+                self.targets[label] -= 1
+                if not self.targets[label]:
+                    self.lost += self.sizes[label]
+
+
+# cells a local search of CutIndex may visit before it asks the whole index
+DEF CUT_BUDGET = 16384
+# marks of CutIndex.groups besides the parts, cells no search is at and the blocked cell
+DEF UNSEEN = 255
+DEF BLOCKED = 4
+
+
+cdef inline int part_root(int * links, int part) nogil:
+    while links[part] != part:
+        part = links[part]
+    return part
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.initializedcheck(False)
+@cython.cdivision(True)
+cdef class CutIndex:
+    """Cells whose blocking would cut others off from every target
+
+    Blocking a cell splits its component into at most four parts, one for each open
+    neighbour. A breadth first search grows them in turns, parts that meet are joined
+    and a part with a target stops growing. A part that runs out of cells without a target
+    is cut off, a single part left growing holds the targets of the component, so in open
+    areas a query visits only a few cells around the blocked one. Which cells reach a target
+    is kept up to date through edits by the same search.
+
+    When the search grows too big, a depth first search over the open cells from
+    a virtual root joined to all targets answers instead. It keeps the discovery order,
+    the end of each subtree and the lowest discovery reachable from it. Blocking a cell
+    cuts off a subtree of one of its children exactly when nothing in that subtree reaches
+    above the cell. Edits that open, close, add or remove targets make it run again
+    the next time it is needed.
+    """
+    cdef readonly object maze
+    cdef numpy.int8_t[:, ::1] grid
+    cdef numpy.int32_t[::1] discovered, lowest, finished, parents
+    cdef unsigned char[::1] tried, reaches, groups, wanted
+    cdef numpy.int32_t * stack
+    cdef numpy.int32_t * queue
+    cdef coords shape
+    cdef bint stale, unknown
+
+    def __cinit__(self, maze):
+        self.stack = NULL
+        self.queue = NULL
+
+    def __dealloc__(self):
+        PyMem_Free(self.stack)
+        PyMem_Free(self.queue)
+
     def __init__(self, maze):
-        self.distances, self.directions = flood(maze)
-        self.lines = create_lines(self.directions, starts(maze))
-        self.is_reachable = is_reachable(self.directions)
+        # an own copy, kept up to date by update_cells
+        self.maze = numpy.array(maze, dtype=numpy.int8)
+        if self.maze.size >= INT_MAX:
+            raise ValueError('The maze is too big')
+        self.grid = self.maze
+        self.shape.r, self.shape.c = self.maze.shape
+        # the virtual root is the cell after the last one
+        self.discovered = numpy.empty(self.maze.size + 1, dtype=numpy.int32)
+        self.lowest = numpy.empty(self.maze.size + 1, dtype=numpy.int32)
+        self.finished = numpy.empty(self.maze.size + 1, dtype=numpy.int32)
+        self.parents = numpy.empty(self.maze.size + 1, dtype=numpy.int32)
+        self.tried = numpy.empty(self.maze.size, dtype=numpy.uint8)
+        self.reaches = numpy.empty(self.maze.size, dtype=numpy.uint8)
+        self.groups = numpy.full(self.maze.size, UNSEEN, dtype=numpy.uint8)
+        self.wanted = numpy.zeros(self.maze.size, dtype=numpy.uint8)
+        self.stack = <numpy.int32_t *>PyMem_Malloc(max(self.maze.size, 1)*sizeof(numpy.int32_t))
+        # a queue of CUT_BUDGET cells for each part
+        self.queue = <numpy.int32_t *>PyMem_Malloc(4*CUT_BUDGET*sizeof(numpy.int32_t))
+        if self.stack == NULL or self.queue == NULL:
+            raise MemoryError()
+        self.build()
+
+    cdef void build(self) nogil:
+        cdef numpy.int32_t root = self.shape.r*self.shape.c, cell, time = 1
+        cdef int row, column
+        for cell in range(root):
+            self.discovered[cell] = -1
+        self.discovered[root] = self.lowest[root] = self.finished[root] = 0
+        cell = 0
+        for row in range(self.shape.r):
+            for column in range(self.shape.c):
+                if self.grid[row, column] == 1 and self.discovered[cell] == -1:
+                    self.parents[cell] = root
+                    time = self.search(cell, time)
+                cell += 1
+        self.finished[root] = time - 1
+        for cell in range(root):
+            self.reaches[cell] = self.discovered[cell] != -1
+        self.stale = self.unknown = False
+
+    cdef numpy.int32_t search(self, numpy.int32_t start, numpy.int32_t time) nogil:
+        # Iterative depth first search from a target, returns the next discovery time
+        cdef numpy.int32_t root = self.shape.r*self.shape.c, cell, other, parent
+        cdef Py_ssize_t top = 0
+        cdef coords loc, nloc
+        self.discovered[start] = self.lowest[start] = time
+        self.tried[start] = 0
+        time += 1
+        self.stack[0] = start
+        while top >= 0:
+            cell = self.stack[top]
+            loc.r = cell // self.shape.c
+            loc.c = cell % self.shape.c
+            # the next neighbour not tried yet, until one is discovered from here,
+            # rows first so the search snakes along the memory
+            other = -1
+            while self.tried[cell] < 4:
+                nloc = step(self.shape, loc, 3 - self.tried[cell])
+                self.tried[cell] += 1
+                if nloc.r == -1 or self.grid[nloc.r, nloc.c] < 0:
+                    continue
+                other = nloc.r*self.shape.c + nloc.c
+                if self.discovered[other] == -1:
+                    break
+                if other != self.parents[cell] and self.discovered[other] < self.lowest[cell]:
+                    self.lowest[cell] = self.discovered[other]
+                other = -1
+            if other != -1:
+                self.parents[other] = cell
+                self.discovered[other] = self.lowest[other] = time
+                time += 1
+                # targets found deeper are joined to the root as well
+                if self.grid[nloc.r, nloc.c] == 1:
+                    self.lowest[other] = 0
+                self.tried[other] = 0
+                top += 1
+                self.stack[top] = other
+                continue
+            top -= 1
+            self.finished[cell] = time - 1
+            parent = self.parents[cell]
+            if parent != root and self.lowest[cell] < self.lowest[parent]:
+                self.lowest[parent] = self.lowest[cell]
+        return time
+
+    cdef bint separates(self, numpy.int32_t cell, numpy.int32_t other) nogil:
+        # Whether blocking cell cuts other off, other -1 for any cell
+        cdef coords loc, nloc
+        cdef numpy.int32_t child
+        cdef int side
+        if self.discovered[cell] == -1:
+            return False
+        if other == cell:
+            return True
+        if other != -1 and self.discovered[other] == -1:
+            return False
+        loc.r = cell // self.shape.c
+        loc.c = cell % self.shape.c
+        for side in range(4):
+            nloc = step(self.shape, loc, side)
+            if nloc.r == -1:
+                continue
+            child = nloc.r*self.shape.c + nloc.c
+            if self.discovered[child] == -1 or self.parents[child] != cell or \
+                    self.lowest[child] < self.discovered[cell]:
+                continue
+            if other == -1 or self.discovered[child] <= self.discovered[other] <= self.finished[child]:
+                return True
+        return False
+
+    cdef int split(self, numpy.int32_t cell, bint anyone, bint full) nogil:
+        # The search around the blocked cell, which has to reach a target and not be one.
+        # Returns 1 when a part without targets has a wanted cell, any with anyone, 0 when none has
+        # and -1 when it gave up. With full it looks for all such parts and marks them unreachable.
+        cdef numpy.int32_t heads[4]
+        cdef numpy.int32_t tails[4]
+        cdef int links[4]
+        cdef bint safe[4]
+        cdef bint wants[4]
+        cdef bint ended[4]
+        cdef int parts = 0, turn = 0, roots, growing, holding, side, part, a, b, result
+        cdef numpy.int32_t current, other, visited, k
+        cdef bint cut
+        cdef coords loc, nloc
+        self.groups[cell] = BLOCKED
+        loc.r = cell // self.shape.c
+        loc.c = cell % self.shape.c
+        for side in range(4):
+            nloc = step(self.shape, loc, side)
+            if nloc.r == -1 or self.grid[nloc.r, nloc.c] < 0:
+                continue
+            other = nloc.r*self.shape.c + nloc.c
+            self.groups[other] = parts
+            self.queue[parts*CUT_BUDGET] = other
+            heads[parts] = 0
+            tails[parts] = 1
+            links[parts] = parts
+            safe[parts] = self.grid[nloc.r, nloc.c] == 1
+            wants[parts] = anyone or self.wanted[other]
+            parts += 1
+        visited = parts
+        while True:
+            roots = growing = holding = 0
+            cut = False
+            for part in range(parts):
+                ended[part] = True
+            for part in range(parts):
+                if heads[part] < tails[part]:
+                    ended[part_root(links, part)] = False
+            for part in range(parts):
+                if links[part] != part:
+                    continue
+                roots += 1
+                if safe[part]:
+                    holding += 1
+                elif not ended[part]:
+                    growing += 1
+                elif wants[part]:
+                    cut = True
+            if roots <= 1:
+                result = 0
+                break
+            if cut and not full:
+                result = 1
+                break
+            # the only part left growing holds the targets
+            if growing == 0 or growing == 1 and holding == 0:
+                result = cut
+                break
+            # a cell adds at most three to the queue of its part
+            if visited > CUT_BUDGET - 3:
+                result = -1
+                break
+            # the next cell of a part still growing, in turns
+            turn = (turn + 1) % parts
+            a = part_root(links, turn)
+            if safe[a] or heads[turn] == tails[turn]:
+                continue
+            current = self.queue[turn*CUT_BUDGET + heads[turn]]
+            heads[turn] += 1
+            loc.r = current // self.shape.c
+            loc.c = current % self.shape.c
+            for side in range(4):
+                nloc = step(self.shape, loc, side)
+                if nloc.r == -1 or self.grid[nloc.r, nloc.c] < 0:
+                    continue
+                other = nloc.r*self.shape.c + nloc.c
+                if self.groups[other] == BLOCKED:
+                    continue
+                if self.groups[other] != UNSEEN:
+                    b = part_root(links, self.groups[other])
+                    if a != b:
+                        links[b] = a
+                        safe[a] = safe[a] or safe[b]
+                        wants[a] = wants[a] or wants[b]
+                    continue
+                self.groups[other] = turn
+                self.queue[turn*CUT_BUDGET + tails[turn]] = other
+                tails[turn] += 1
+                visited += 1
+                if self.grid[nloc.r, nloc.c] == 1:
+                    safe[a] = True
+                if self.wanted[other]:
+                    wants[a] = True
+        for part in range(parts):
+            a = part_root(links, part)
+            for k in range(tails[part]):
+                other = self.queue[part*CUT_BUDGET + k]
+                self.groups[other] = UNSEEN
+                if full and result != -1 and ended[a] and not safe[a]:
+                    self.reaches[other] = False
+        self.groups[cell] = UNSEEN
+        return result
+
+    cdef void spread(self, numpy.int32_t cell) nogil:
+        # Marks the cell and the open cells joined to it as reaching a target
+        cdef Py_ssize_t top = 0
+        cdef numpy.int32_t other
+        cdef int side
+        cdef coords loc, nloc
+        self.reaches[cell] = True
+        self.stack[0] = cell
+        while top >= 0:
+            cell = self.stack[top]
+            top -= 1
+            loc.r = cell // self.shape.c
+            loc.c = cell % self.shape.c
+            for side in range(4):
+                nloc = step(self.shape, loc, side)
+                if nloc.r == -1 or self.grid[nloc.r, nloc.c] < 0:
+                    continue
+                other = nloc.r*self.shape.c + nloc.c
+                if not self.reaches[other]:
+                    self.reaches[other] = True
+                    top += 1
+                    self.stack[top] = other
+
+    cdef bint follow(self, numpy.int32_t cell, int old, int value) nogil:
+        # Keeps reaches up to date after an edit of the cell, False when it cannot tell
+        cdef coords loc, nloc
+        cdef int side
+        if old == 1:
+            # whether the component has other targets is not known
+            return False
+        if value < 0:
+            if not self.reaches[cell]:
+                return True
+            self.reaches[cell] = False
+            return self.split(cell, True, True) != -1
+        if value != 1:
+            # an opened wall reaches a target through its neighbours
+            loc.r = cell // self.shape.c
+            loc.c = cell % self.shape.c
+            self.reaches[cell] = False
+            for side in range(4):
+                nloc = step(self.shape, loc, side)
+                if nloc.r != -1 and self.grid[nloc.r, nloc.c] >= 0 and \
+                        self.reaches[nloc.r*self.shape.c + nloc.c]:
+                    break
+            else:
+                return True
+        self.spread(cell)
+        return True
+
+    cdef numpy.int32_t index(self, int row, int column) except -1:
+        if not (0 <= row < self.shape.r and 0 <= column < self.shape.c):
+            raise IndexError('Cell ({}, {}) is out of the maze'.format(row, column))
+        return row*self.shape.c + column
+
+    def cuts_off(self, int row, int column, cells=None):
+        """Whether blocking the cell cuts any of ``cells`` off from every target
 
-    def path(self, column, row):
-        return arrows_to_path(self.directions, column, row)
+        ``cells`` are ``(row, column)`` pairs, by default any open cell counts.
+        Cells that cannot reach a target now are never cut off.
+        """
+        cdef numpy.int32_t cell = self.index(row, column)
+        cdef int result = -1
+        others = [] if cells is None else [self.index(other_row, other_column) for other_row, other_column in cells]
+        if self.unknown:
+            self.build()
+        if self.grid[row, column] < 0 or not self.reaches[cell]:
+            return False
+        if cell in others:
+            return True
+        others = [other for other in others if self.reaches[other]]
+        if cells is not None and not others:
+            return False
+        # the search cannot tell whether a blocked target was the only one
+        if self.grid[row, column] != 1:
+            for other in others:
+                self.wanted[other] = True
+            result = self.split(cell, cells is None, False)
+            for other in others:
+                self.wanted[other] = False
+        if result != -1:
+            return result == 1
+        if self.stale:
+            self.build()
+        return any(self.separates(cell, other) for other in others or [-1])
 
+    def update_cell(self, row, column, value):
+        self.update_cells([(row, column, value)])
 
-def analyze(maze):
-    return AnalyzedMaze(maze)
+    def update_cells(self, changes):
+        """Applies ``(row, column, value)`` edits of the maze"""
+        cdef int row, column, value, old
+        cdef numpy.int32_t cell
+        for row, column, value in changes:
+            cell = self.index(row, column)
+            old = self.grid[row, column]
+            self.grid[row, column] = value
+            if (old < 0) == (value < 0) and (old == 1) == (value == 1):
+                continue
+            self.stale = True
+            if not self.unknown:
+                self.unknown = not self.follow(cell, old, value)
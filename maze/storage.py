@@ -0,0 +1,201 @@
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy
+
+from . import solver
+from .cache import default_cache
+
+
+MAGIC = b'MAZE'
+VERSION = 1
+RAW, ZLIB = 0, 1
+# magic, version, compression, dtype, rows, columns, padded so that the cells are aligned
+HEADER = struct.Struct('<4sHH4sqq4x')
+CHUNK = 2**22
+
+
+def write_maze(f, maze, compress=False):
+    """Writes the maze to the binary file ``f``, a header followed by the cells"""
+    maze = numpy.ascontiguousarray(maze, dtype=numpy.int8)
+    f.write(HEADER.pack(MAGIC, VERSION, ZLIB if compress else RAW, maze.dtype.str.encode(), *maze.shape))
+    cells = maze.reshape(-1)
+    if not compress:
+        f.write(cells)
+        return
+    compressor = zlib.compressobj()
+    for start in range(0, cells.size, CHUNK):
+        f.write(compressor.compress(cells[start:start + CHUNK]))
+    f.write(compressor.flush())
+
+
+def read_header(f):
+    """Compression and shape from the header of a binary maze file"""
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a maze file')
+    _, version, compression, dtype, rows, columns = HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError('Unsupported maze file version {}'.format(version))
+    if compression not in (RAW, ZLIB):
+        raise ValueError('Unsupported maze file compression {}'.format(compression))
+    if dtype.rstrip(b'\0') != numpy.dtype(numpy.int8).str.encode() or rows < 0 or columns < 0:
+        raise ValueError('Invalid maze file header')
+    return compression, (rows, columns)
+
+
+def read_maze(filename, mmap=True):
+    """Reads a binary maze file
+
+    Uncompressed cells are mapped from the file (unless ``mmap`` is false)
+    without reading them; edits of the returned array never reach the file.
+    """
+    with open(filename, 'rb') as f:
+        compression, shape = read_header(f)
+        size = shape[0] * shape[1]
+        if compression == RAW and mmap:
+            if os.fstat(f.fileno()).st_size != HEADER.size + size:
+                raise ValueError('Maze file does not match its header')
+            if size == 0:
+                return numpy.zeros(shape, dtype=numpy.int8)
+            return numpy.memmap(f, dtype=numpy.int8, mode='c', offset=HEADER.size, shape=shape)
+
+        maze = numpy.empty(shape, dtype=numpy.int8)
+        cells = memoryview(maze.reshape(-1)).cast('B')
+        if compression == RAW:
+            read = f.readinto(cells)
+        else:
+            read = decompress(f, cells)
+        if read != size or f.read(1):
+            raise ValueError('Maze file does not match its header')
+        return maze
+
+
+def decompress(f, cells):
+    """Decompresses the rest of ``f`` into ``cells``, returns how many bytes it wrote"""
+    decompressor = zlib.decompressobj()
+    read = 0
+    try:
+        while not decompressor.eof:
+            data = decompressor.unconsumed_tail or f.read(CHUNK)
+            if not data:
+                break
+            data = decompressor.decompress(data, len(cells) - read + 1)
+            if read + len(data) > len(cells):
+                break
+            cells[read:read + len(data)] = data
+            read += len(data)
+    except zlib.error as e:
+        raise ValueError('Corrupted maze file: {}'.format(e))
+    if decompressor.unused_data:
+        return -1
+    return read
+
+
+def is_binary(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def flood_to_files(maze, prefix, compact=True, tile=1024):
+    """Floods a maze too big for memory tile by tile, see ``solver.flood_tiled``
+
+    ``maze`` is best memory mapped, see ``read_maze``. The distances and directions
+    are written to memory mapped ``prefix + '.distances.npy'`` and ``prefix + '.directions.npy'``.
+    Returns them and the number of cells that cannot reach any target.
+    """
+    dtype = solver.distance_dtype(maze.shape) if compact else numpy.int64
+    distances = numpy.lib.format.open_memmap(prefix + '.distances.npy', mode='w+', dtype=dtype, shape=maze.shape)
+    directions = numpy.lib.format.open_memmap(prefix + '.directions.npy', mode='w+', dtype=('a', 1),
+                                              shape=maze.shape)
+    unreachable = solver.flood_tiled(maze, distances, directions, tile)
+    distances.flush()
+    directions.flush()
+    return distances, directions, unreachable
+
+
+def sidecar_name(filename):
+    """Name of the file with the analysis of the maze saved in ``filename``"""
+    return filename + '.npz'
+
+
+def replace_atomically(filename, write):
+    """Calls ``write`` with a temporary file next to ``filename`` and then puts it in its place
+
+    Readers see either the old file or the whole new one, never a half written file.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(filename), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def save(filename, maze, analyzed=None, compact=True, cache=default_cache, compress=False, sidecar=False):
+    """Saves the maze, with ``sidecar`` also its analysis to the file named by ``sidecar_name``
+
+    Files ending with ``.maze`` are binary, see ``write_maze``, any other are text.
+
+    ``analyzed`` is used when it is a full flood of this very maze,
+    otherwise the maze is analyzed (or found in the cache).
+    """
+    maze = numpy.asarray(maze, dtype=numpy.int8)
+    if filename.endswith('.maze'):
+        replace_atomically(filename, lambda f: write_maze(f, maze, compress))
+    else:
+        replace_atomically(filename, lambda f: numpy.savetxt(f, maze, fmt='%d'))
+    if not sidecar:
+        return
+
+    # threaded and bit-parallel floods break ties in another way, the sidecar keeps the usual ones
+    if (analyzed is None or analyzed.threads is not None or analyzed.engine == 'bitparallel'
+            or analyzed.costs is not None or analyzed.stop_when_reached is not None
+            or analyzed.maze.shape != maze.shape or (analyzed.maze != maze).any()):
+        analyzed = cache.analyze(maze, compact=compact)
+    key = cache.key(maze, analyzed.compact)
+    replace_atomically(sidecar_name(filename), lambda f: numpy.savez(
+        f, key=numpy.array(key), compact=numpy.array(bool(analyzed.compact)),
+        distances=analyzed.distances, directions=analyzed.directions,
+    ))
+
+
+def load(filename, cache=default_cache, mmap=True):
+    """Loads a maze saved by ``save``, binary or text, see ``read_maze`` for ``mmap``
+
+    When the sidecar file matches the maze, its analysis is put in the cache,
+    so analyzing the maze does not flood it again.
+    """
+    if is_binary(filename):
+        maze = read_maze(filename, mmap)
+    else:
+        maze = numpy.loadtxt(filename, dtype=numpy.int8, ndmin=2)
+    analyzed = load_sidecar(sidecar_name(filename), maze, cache)
+    if analyzed is not None:
+        cache.store(cache.key(maze, analyzed.compact), analyzed)
+    return maze
+
+
+def load_sidecar(filename, maze, cache=default_cache):
+    """The analysis stored in the sidecar file, ``None`` when it is missing, broken or of another maze"""
+    try:
+        with numpy.load(filename, allow_pickle=False) as data:
+            compact = bool(data['compact'])
+            if str(data['key']) != cache.key(maze, compact):
+                return None
+            distances, directions = data['distances'], data['directions']
+    except (OSError, KeyError, ValueError):
+        return None
+    if distances.shape != maze.shape or directions.shape != maze.shape or directions.dtype != numpy.dtype('a1'):
+        return None
+
+    analyzed = solver.AnalyzedMaze(maze, compact)
+    analyzed._distances, analyzed._directions = distances, directions
+    return analyzed
@@ -1,11 +1,55 @@
 import glob
-from setuptools import setup
+import os
+import tempfile
+from setuptools import setup, Extension
+from setuptools.command.build_ext import build_ext
+from setuptools.errors import CompileError, LinkError
 from Cython.Build import cythonize
 import numpy
 
+
+class BuildExt(build_ext):
+    """Builds with OpenMP when the compiler has it, without it the flood runs on one thread
+
+    Set ``MAZE_OPENMP=0`` to build without it anyway.
+    """
+    def build_extensions(self):
+        msvc = self.compiler.compiler_type == 'msvc'
+        compile_args = ['/openmp'] if msvc else ['-fopenmp']
+        link_args = [] if msvc else ['-fopenmp']
+        if os.environ.get('MAZE_OPENMP', '1') != '0' and self.has_openmp(compile_args, link_args):
+            for extension in self.extensions:
+                extension.extra_compile_args += compile_args
+                extension.extra_link_args += link_args
+        super().build_extensions()
+
+    def has_openmp(self, compile_args, link_args):
+        # builds a small program that needs OpenMP
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'openmp.c')
+            with open(source, 'w') as f:
+                f.write('#include <omp.h>\nint main(void) { return omp_get_max_threads() < 1; }\n')
+            try:
+                objects = self.compiler.compile([source], output_dir=tmp, extra_postargs=compile_args)
+                self.compiler.link_executable(objects, os.path.join(tmp, 'openmp'), extra_postargs=link_args)
+            except (CompileError, LinkError):
+                return False
+        return True
+
+
+extensions = [
+    Extension(
+        os.path.splitext(path)[0].replace(os.sep, '.'),
+        [path],
+        depends=glob.glob(os.path.join('maze', '*.h')),
+    )
+    for path in glob.glob(os.path.join('maze', '*.pyx'))
+]
+
 setup(
     name='maze',
-    ext_modules=cythonize(glob.glob('maze/*.pyx')),
+    ext_modules=cythonize(extensions),
+    cmdclass={'build_ext': BuildExt},
     include_dirs=[numpy.get_include()],
     install_requires=[
         'Cython',
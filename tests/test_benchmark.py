@@ -0,0 +1,63 @@
+import json
+
+import numpy
+import pytest
+
+from maze import analyze, benchmark
+
+
+@pytest.mark.parametrize('family', benchmark.FAMILIES)
+def test_benchmark_maze(family):
+    maze = benchmark.make_maze(family, 33)
+    assert (maze == 1).sum() == 1
+    assert sorted(maze[maze >= 2]) == [2, 3, 4, 5, 6]
+    analyzed = analyze(maze)
+    for row, column in numpy.argwhere(maze >= 2):
+        assert len(analyzed.path(row, column)) > 1
+
+
+def test_benchmark_run():
+    record = benchmark.run(['grass', 'backtracker'], [16], repeat=1, render=False)
+    assert record['repeat'] == 1
+    results = record['results']
+    for prefix in 'pyx', 'py':
+        for case in 'flood', 'analyze', 'arrows_to_path', 'arrows_to_paths':
+            assert '{}/{}/backtracker/16x16'.format(prefix, case) in results
+    for case in 'flood-threads', 'flood-bitparallel', 'create_lines':
+        assert 'pyx/{}/grass/16x16'.format(case) in results
+    result = results['pyx/flood/grass/16x16']
+    assert result['cells'] == 256
+    assert result['seconds'] > 0 and result['peak_bytes'] > 0
+    assert result['cells_per_second'] == pytest.approx(256 / result['seconds'])
+
+
+def test_benchmark_compare():
+    baseline = {'results': {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}, 'c': {'seconds': 1.0}}}
+    current = {'results': {'a': {'seconds': 1.05}, 'b': {'seconds': 2.0}, 'd': {'seconds': 1.0}}}
+    rows, regressions = benchmark.compare(baseline, current, threshold=0.1)
+    assert [row[0] for row in rows] == ['a', 'b']
+    assert rows[1][3] == 2.0
+    assert regressions == ['b']
+    assert benchmark.compare(baseline, current, threshold=1.5)[1] == []
+
+
+def test_benchmark_history(tmpdir, capsys):
+    history = str(tmpdir.join('history.json'))
+    assert benchmark.main(['compare', '--history', history]) == 2
+    arguments = ['run', '--history', history, '--families', 'grass', '--sizes', '8', '--repeat', '1',
+                 '--no-python', '--no-render']
+    assert benchmark.main(arguments) == 0
+    assert benchmark.main(arguments) == 0
+    with open(history) as f:
+        runs = json.load(f)
+    assert len(runs) == 2 and runs[0]['results'].keys() == runs[1]['results'].keys()
+
+    # make the last run slow
+    for result in runs[-1]['results'].values():
+        result['seconds'] = result['seconds'] * 10
+    with open(history, 'w') as f:
+        json.dump(runs, f)
+    capsys.readouterr()
+    assert benchmark.main(['compare', '--history', history]) == 1
+    assert 'REGRESSION' in capsys.readouterr().out
+    assert benchmark.main(['compare', '--history', history, '--threshold', '100']) == 0
@@ -0,0 +1,116 @@
+import numpy
+import pytest
+
+from maze import analyze
+from maze.cache import AnalysisCache
+
+
+@pytest.fixture(params=range(5), ids=lambda seed: 'seed{}'.format(seed))
+def random_maze(request):
+    rng = numpy.random.RandomState(request.param)
+    maze = numpy.where(rng.rand(15, 20) < 0.3, -1, 0).astype(numpy.int8)
+    maze[rng.randint(15), rng.randint(20)] = 1
+    return maze
+
+
+@pytest.fixture
+def counted_floods(monkeypatch):
+    from maze import solver
+    calls = []
+    flood = solver.flood
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return flood(*args, **kwargs)
+
+    monkeypatch.setattr(solver, 'flood', counting)
+    return calls
+
+
+def test_cache_hits(random_maze, counted_floods):
+    cache = AnalysisCache()
+    first = cache.analyze(random_maze, compact=True)
+    second = cache.analyze(random_maze.copy(), compact=True)
+    assert len(counted_floods) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first is not second
+    assert (second.distances == analyze(random_maze).distances).all()
+    assert second.is_reachable == analyze(random_maze).is_reachable
+
+
+def test_cache_keys(random_maze):
+    cache = AnalysisCache()
+    cache.analyze(random_maze)
+    cache.analyze(random_maze, compact=True)
+    cache.analyze(random_maze.reshape(20, 15))
+    cache.analyze(random_maze, costs=numpy.ones(random_maze.shape, dtype=int))
+    changed = random_maze.copy()
+    changed[0, 0] = -1 if changed[0, 0] >= 0 else 0
+    cache.analyze(changed)
+    assert cache.misses == len(cache) == 5
+    assert cache.hits == 0
+
+
+def test_cache_engines(random_maze):
+    cache = AnalysisCache()
+    cache.analyze(random_maze)
+    cache.analyze(random_maze, engine='bitparallel')
+    assert cache.misses == 2
+    # both break ties the same way
+    cache.analyze(random_maze, threads=2)
+    assert cache.hits == 1
+
+
+def test_cache_copy_on_write(random_maze):
+    cache = AnalysisCache()
+    edited = cache.analyze(random_maze)
+    distances = edited.distances.copy()
+    row, column = numpy.argwhere(random_maze == 0)[0]
+    edited.update_cell(row, column, -1)
+    assert edited.distances[row, column] == -1
+    again = cache.analyze(random_maze)
+    assert (again.distances == distances).all()
+    with pytest.raises(ValueError):
+        again.distances[0, 0] = 5
+
+
+def test_cache_budget(random_maze):
+    size = analyze(random_maze).maze.nbytes*10
+    cache = AnalysisCache(budget=3*size)
+    mazes = [numpy.roll(random_maze, shift) for shift in range(5)]
+    for maze in mazes:
+        cache.analyze(maze)
+    assert len(cache) == 3 and cache.size <= cache.budget
+    cache.analyze(mazes[2])
+    cache.analyze(mazes[0])
+    assert (cache.hits, cache.misses) == (1, 6)
+    # the least recently used one went out
+    cache.analyze(mazes[3])
+    assert cache.hits == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_cache_too_big(random_maze):
+    cache = AnalysisCache(budget=10)
+    cache.analyze(random_maze)
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_cache_stats(random_maze):
+    cache = AnalysisCache()
+    assert cache.analyze(random_maze).stats is None
+    # the stored analysis has no counters, it is flooded again
+    events = []
+    first = cache.analyze(random_maze, stats_hook=lambda event, values: events.append(event))
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert events == ['flood']
+    assert first.stats['floods'] == 1
+    assert first.stats['settled'] == (first.distances >= 0).sum()
+
+    second = cache.analyze(random_maze, stats=True)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert second.stats == first.stats and second.stats is not first.stats
+    assert second.stats_hook is None
+    assert cache.analyze(random_maze).stats is None
+    assert cache.hits == 2
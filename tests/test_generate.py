@@ -0,0 +1,66 @@
+import numpy
+import pytest
+
+from maze import analyze, generate
+from maze._fallback import load_fallback
+
+pygenerate = load_fallback('generate')
+
+PERFECT = ['backtracker', 'kruskal', 'prim']
+SHAPES = [(5, 5), (12, 17), (31, 40), (3, 3), (2, 9), (1, 1)]
+
+
+@pytest.mark.parametrize('name', sorted(generate.GENERATORS))
+@pytest.mark.parametrize('shape', SHAPES)
+def test_generate(name, shape):
+    maze = generate.generate(name, shape, seed=3)
+    assert maze.dtype == numpy.int8 and maze.shape == shape
+    assert set(numpy.unique(maze)) <= {-1, 0}
+    assert (maze == generate.generate(name, shape, seed=3)).all()
+    assert (maze == pygenerate.generate(name, shape, seed=3)).all()
+
+
+@pytest.mark.parametrize('name', PERFECT)
+@pytest.mark.parametrize('seed', range(5))
+def test_generate_perfect(name, seed):
+    maze = generate.generate(name, (21, 34), seed=seed)
+    # every cell joined to the others by exactly one path: a tree of 10*16 cells
+    assert (maze == 0).sum() == 2*10*16 - 1
+    assert (maze[1::2, 1:-1:2] == 0).all()
+    assert (maze[::2, ::2] == -1).all()
+    maze[1, 1] = 1
+    assert analyze(maze).unreachable == 0
+
+
+def test_generate_seeds():
+    for name in PERFECT + ['caves', 'random']:
+        mazes = [generate.generate(name, (41, 41), seed=seed) for seed in range(3)]
+        assert not (mazes[0] == mazes[1]).all() or not (mazes[1] == mazes[2]).all()
+
+
+@pytest.mark.parametrize('density', [0, 0.3, 1])
+def test_generate_random_density(density):
+    maze = generate.random_walls((200, 300), density, seed=1)
+    assert abs((maze < 0).mean() - density) < 0.01
+
+
+def test_generate_caves():
+    maze = generate.caves((200, 300), seed=1)
+    smoothed = generate.caves((200, 300), steps=0, seed=1)
+    assert (smoothed == generate.random_walls((200, 300), 0.45, seed=1)).all()
+    # smoothing leaves fewer lone walls
+    lone = lambda walls: (walls[1:-1, 1:-1] & ~walls[:-2, 1:-1] & ~walls[2:, 1:-1] &
+                          ~walls[1:-1, :-2] & ~walls[1:-1, 2:]).sum()
+    assert lone(maze < 0) < lone(smoothed < 0)
+
+
+def test_generate_invalid():
+    with pytest.raises(ValueError):
+        generate.generate('labyrinth', (5, 5))
+
+
+@pytest.mark.timeout(20)
+@pytest.mark.parametrize('name', sorted(generate.GENERATORS))
+def test_generate_speed(name):
+    maze = generate.generate(name, (2048, 2048), seed=0)
+    assert maze.shape == (2048, 2048)
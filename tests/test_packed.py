@@ -0,0 +1,104 @@
+import numpy
+import pytest
+
+from maze import analyze
+from maze.packed import PackedMaze, pack
+from maze.solver import flood
+
+
+@pytest.fixture(params=range(5), ids=lambda seed: 'seed{}'.format(seed))
+def random_maze(request):
+    rng = numpy.random.RandomState(request.param)
+    maze = numpy.where(rng.rand(15, 21) < 0.3, -1, 0).astype(numpy.int8)
+    maze[rng.rand(*maze.shape) < 0.02] = 1
+    maze[rng.rand(*maze.shape) < 0.02] = rng.randint(2, 7)
+    maze[rng.randint(15), rng.randint(21)] = 1
+    return maze
+
+
+def test_packed_round_trip(random_maze):
+    packed = pack(random_maze)
+    assert packed.shape == random_maze.shape
+    assert packed.walls.shape == (15, 3)
+    assert packed.walls.nbytes == 15*3
+    assert (packed.unpack() == random_maze).all()
+    assert (numpy.asarray(packed) == random_maze).all()
+    assert len(packed.targets) == (random_maze == 1).sum()
+    assert len(packed.dudes) == (random_maze >= 2).sum()
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_packed_flood(random_maze, compact):
+    distances, directions = flood(pack(random_maze), compact=compact)
+    expected_distances, expected_directions = flood(random_maze, compact=compact)
+    assert distances.dtype == expected_distances.dtype
+    assert (distances == expected_distances).all()
+    assert (directions == expected_directions).all()
+
+
+def test_packed_flood_options(random_maze):
+    packed = pack(random_maze)
+    for options in {'threads': 2}, {'stop_when_reached': [(0, 0)]}, {'owners': True}:
+        for packed_result, result in zip(flood(packed, **options), flood(random_maze, **options)):
+            assert (packed_result == result).all()
+
+
+def test_packed_analyze(random_maze):
+    amaze = analyze(pack(random_maze))
+    expected = analyze(random_maze)
+    assert (amaze.distances == expected.distances).all()
+    assert (amaze.directions == expected.directions).all()
+    assert amaze.unreachable == expected.unreachable
+    assert (amaze.targets == expected.targets).all()
+    assert amaze.starts == expected.starts
+    assert amaze.lines == expected.lines
+    # nothing needed the int8 maze yet
+    assert amaze.packed is not None and amaze._maze is None
+    assert (amaze.share().distances == expected.distances).all()
+
+    row, column = numpy.argwhere(random_maze == 0)[0]
+    amaze.update_cell(row, column, -1)
+    expected.update_cell(row, column, -1)
+    assert amaze.packed is None
+    assert (amaze.maze == expected.maze).all()
+    assert (amaze.distances == expected.distances).all()
+
+
+def analyze_peak(maze):
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        analyze(maze, compact=True).distances
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_packed_analyze_memory():
+    maze = numpy.zeros((512, 2048), dtype=numpy.int8)
+    maze[::2, 1:] = -1
+    maze[0, 0] = 1
+    # the packed analysis keeps no int8 copy of the maze
+    assert analyze_peak(pack(maze)) + maze.nbytes*3 // 4 < analyze_peak(maze)
+
+
+def test_packed_target_order(random_maze):
+    packed = pack(random_maze)
+    shuffled = PackedMaze(packed.shape, packed.walls, packed.targets[::-1], packed.dudes)
+    assert (shuffled.targets == packed.targets).all()
+    assert (flood(shuffled)[1] == flood(random_maze)[1]).all()
+
+
+def test_packed_invalid(random_maze):
+    packed = pack(random_maze)
+    with pytest.raises(ValueError):
+        PackedMaze((15, 30), packed.walls)
+    with pytest.raises(ValueError):
+        PackedMaze((15, 21, 1), packed.walls)
+    with pytest.raises(IndexError):
+        PackedMaze(packed.shape, packed.walls, [(15, 0)])
+    wall = numpy.argwhere(random_maze < 0)[0]
+    with pytest.raises(ValueError):
+        PackedMaze(packed.shape, packed.walls, [wall])
+    with pytest.raises(ValueError):
+        PackedMaze(packed.shape, packed.walls, dudes=[(wall[0], wall[1], 2)])
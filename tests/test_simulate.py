@@ -0,0 +1,84 @@
+import time
+
+import numpy
+import pytest
+
+from maze import analyze
+from maze.generate import generate
+from maze.simulate import Simulation, VirtualClock, simulate
+
+
+def corridor(length, kind):
+    maze = numpy.zeros((1, length), dtype=numpy.int8)
+    maze[0, 0] = 1
+    maze[0, -1] = kind
+    return maze
+
+
+@pytest.fixture(params=range(3), ids=lambda seed: 'seed{}'.format(seed))
+def dudes_maze(request):
+    maze = generate('caves', (30, 40), seed=request.param)
+    grass = numpy.argwhere(maze == 0)
+    maze[tuple(grass[0])] = 1
+    directions = analyze(maze).directions
+    reachable = numpy.argwhere((directions != b'#') & (directions != b' ') & (directions != b'X'))
+    for value, (row, column) in zip((2, 3, 4, 5, 6), reachable[::-1]):
+        maze[row, column] = value
+    return maze
+
+
+@pytest.mark.parametrize(('kind', 'duration'), [(3, 0.5), (6, 1)])
+def test_simulate_corridor(kind, duration):
+    # the jumper has no walls to jump over, a step takes its duration rounded up to ticks
+    arrivals = simulate(corridor(11, kind))
+    assert arrivals == {kind: pytest.approx(10*duration, rel=0.05)}
+    assert arrivals[kind] >= 10*duration
+
+
+def test_simulate_deterministic(dudes_maze):
+    arrivals = simulate(dudes_maze, seed=7, everyone=True)
+    assert sorted(arrivals) == [2, 3, 4, 5, 6]
+    assert simulate(dudes_maze, seed=7, everyone=True) == arrivals
+
+
+def test_simulate_game_over(dudes_maze):
+    everyone = simulate(dudes_maze, seed=1, everyone=True)
+    first = simulate(dudes_maze, seed=1)
+    assert len(first) == 1
+    kind, seconds = first.popitem()
+    assert seconds == everyone[kind] == min(everyone.values())
+
+
+def test_simulate_limit(dudes_maze):
+    simulation = Simulation(dudes_maze, seed=0)
+    assert simulation.run(everyone=True, limit=1) == {}
+    # stopped at the first wake up after the limit
+    assert 1 < simulation.clock.now < 1.1
+
+
+def test_simulate_unreachable():
+    maze = corridor(5, 3)
+    maze[0, 2] = -1
+    with pytest.raises(ValueError):
+        Simulation(maze)
+
+
+def test_simulate_no_dudes():
+    assert simulate(corridor(5, 0)) == {}
+
+
+def test_virtual_clock():
+    clock = VirtualClock()
+    wake = clock.sleep(0.5)
+    assert clock.monotonic() == 0 and wake.time == 0.5
+    assert next(iter(wake.__await__())) is wake
+
+
+@pytest.mark.timeout(10)
+def test_simulate_speed():
+    # a minute and a half on screen for the slowest dude
+    maze = corridor(91, 6)
+    start = time.perf_counter()
+    arrivals = simulate(maze, everyone=True)
+    assert arrivals[6] > 90
+    assert time.perf_counter() - start < 1
@@ -1,3 +1,4 @@
+import heapq
 from itertools import product
 
 import numpy
@@ -242,6 +243,885 @@ def test_s_shape_paths(s_shape):
         path = path[1:]
 
 
+@pytest.fixture(params=range(10), ids=lambda seed: 'seed{}'.format(seed))
+def random_maze(request):
+    rng = numpy.random.RandomState(request.param)
+    maze = numpy.where(rng.rand(15, 20) < 0.3, -1, 0).astype(numpy.int8)
+    maze[rng.randint(15), rng.randint(20)] = 1
+    return maze, rng
+
+
+def random_edit(maze, rng):
+    row, column = rng.randint(maze.shape[0]), rng.randint(maze.shape[1])
+    return row, column, rng.choice([-1, -1, 0, 0, 1, 2])
+
+
+def test_update_cell_matches_flood(random_maze):
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    for i in range(50):
+        row, column, value = random_edit(maze, rng)
+        maze[row, column] = value
+        amaze.update_cell(row, column, value)
+        check_same_analysis(maze, amaze)
+
+
+def test_update_cells_matches_flood(random_maze):
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    for i in range(20):
+        changes = [random_edit(maze, rng) for j in range(5)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        amaze.update_cells(changes)
+        check_same_analysis(maze, amaze)
+
+
+def test_update_cells_repeated(random_maze):
+    # a cell edited twice in one batch ends with its last value
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    amaze.unreachable
+    for i in range(50):
+        cells = [random_edit(maze, rng)[:2] for j in range(2)]
+        changes = [cells[j % 2] + (rng.choice([-1, 0, 1, 2]),) for j in range(4)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        amaze.update_cells(changes)
+        check_same_analysis(maze, amaze)
+        assert amaze.unreachable == analyze(maze).unreachable
+
+
+def test_update_cell_out_of_maze(random_maze):
+    maze, _ = random_maze
+    amaze = analyze(maze)
+    with pytest.raises(IndexError):
+        amaze.update_cell(*maze.shape, -1)
+
+
+@pytest.mark.parametrize(('shape', 'dtype'), [((15, 20), numpy.int16),
+                                              ((128, 256), numpy.int16),
+                                              ((128, 257), numpy.int32)])
+def test_compact_distances(shape, dtype):
+    maze = zeros(*shape)
+    maze[0, 0] = 1
+    amaze = analyze(maze, compact=True)
+    assert amaze.distances.dtype == dtype
+    assert (amaze.distances == analyze(maze).distances).all()
+
+
+def test_compact_update_cell(random_maze):
+    maze, rng = random_maze
+    amaze = analyze(maze, compact=True)
+    for i in range(20):
+        row, column, value = random_edit(maze, rng)
+        maze[row, column] = value
+        amaze.update_cell(row, column, value)
+        check_same_analysis(maze, amaze)
+
+
+def test_direction_codes(random_maze):
+    from maze import solver
+    maze, _ = random_maze
+    amaze = analyze(maze)
+    assert amaze.codes.dtype == numpy.uint8
+    assert numpy.shares_memory(amaze.codes, amaze.directions)
+    for code, symbol in [(solver.WALL_CODE, b'#'), (solver.SPACE_CODE, b' '), (solver.TARGET_CODE, b'X'),
+                         (solver.UP_CODE, b'^'), (solver.DOWN_CODE, b'v'),
+                         (solver.LEFT_CODE, b'<'), (solver.RIGHT_CODE, b'>')]:
+        assert ((amaze.codes == code) == (amaze.directions == symbol)).all()
+    row, column = numpy.argwhere(maze == 1)[0]
+    assert type(amaze.direction(row, column)) is int
+    assert amaze.direction(row, column) == solver.TARGET_CODE
+
+
+def test_flood_queue_reused(random_maze):
+    from maze.solver import flood, CellQueue
+    maze, _ = random_maze
+    queue = CellQueue(maze.size)
+    for i in range(2):
+        distances, directions = flood(maze, queue)
+        assert (distances == analyze(maze).distances).all()
+        assert 0 < queue.peak <= (distances >= 0).sum()
+    assert queue.nbytes == queue.size * queue.peak_bytes // queue.peak
+
+
+def test_flood_queue_too_small(random_maze):
+    from maze.solver import flood, CellQueue
+    maze, _ = random_maze
+    with pytest.raises(ValueError):
+        flood(maze, CellQueue(maze.size - 1))
+
+
+@pytest.fixture
+def maze_stack():
+    rng = numpy.random.RandomState(42)
+    stack = numpy.where(rng.rand(12, 15, 20) < 0.35, -1, 0).astype(numpy.int8)
+    for maze in stack:
+        maze[rng.randint(15), rng.randint(20)] = 1
+    stack[3] = -1
+    stack[3, 0, 0] = 1
+    return stack
+
+
+@pytest.mark.parametrize('workers', [None, 1, 3])
+def test_analyze_batch_matches_analyze(maze_stack, workers):
+    from maze.solver import analyze_batch
+    distances, directions, reachable = analyze_batch(maze_stack, workers=workers)
+    assert distances.shape == directions.shape == maze_stack.shape
+    for i, maze in enumerate(maze_stack):
+        amaze = analyze(maze)
+        assert (distances[i] == amaze.distances).all()
+        assert (directions[i] == amaze.directions).all()
+        assert reachable[i] == amaze.is_reachable
+    assert reachable[3]
+
+
+def test_analyze_batch_list(maze_stack):
+    from maze.solver import analyze_batch
+    distances, directions, reachable = analyze_batch(list(maze_stack), compact=True)
+    assert distances.dtype == numpy.int16
+    assert (distances == analyze_batch(maze_stack)[0]).all()
+
+
+def test_analyze_batch_not_a_stack(maze_stack):
+    from maze.solver import analyze_batch
+    with pytest.raises(ValueError):
+        analyze_batch(maze_stack[0])
+
+
+@pytest.mark.parametrize('threads', [1, 2, 4])
+def test_flood_threads(random_maze, threads):
+    from maze.solver import flood
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 1
+    distances, directions = flood(maze, threads=threads)
+    assert (distances == flood(maze)[0]).all()
+    assert (directions == flood(maze, threads=1)[1]).all()
+    # a cell points to the first neighbour one step closer in the order up, down, left, right
+    h, w = maze.shape
+    for row in range(h):
+        for column in range(w):
+            if distances[row, column] <= 0:
+                continue
+            closer = [arrow for arrow, r, c in ((b'^', row - 1, column), (b'v', row + 1, column),
+                                                (b'<', row, column - 1), (b'>', row, column + 1))
+                      if 0 <= r < h and 0 <= c < w and
+                      distances[r, c] == distances[row, column] - 1]
+            assert directions[row, column] == closer[0]
+
+
+def test_flood_threads_compact(random_maze):
+    from maze.solver import flood
+    maze, _ = random_maze
+    distances, directions = flood(maze, compact=True, threads=2)
+    assert distances.dtype == numpy.int16
+    assert (distances == flood(maze)[0]).all()
+
+
+def test_flood_threads_invalid(random_maze):
+    from maze.solver import flood
+    maze, _ = random_maze
+    with pytest.raises(ValueError):
+        flood(maze, threads=0)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_flood_bitparallel(random_maze, compact):
+    from maze.solver import flood
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 1
+    distances, directions = flood(maze, compact=compact, engine='bitparallel')
+    expected_distances, expected_directions = flood(maze, compact=compact, threads=1)
+    assert distances.dtype == expected_distances.dtype
+    assert (distances == expected_distances).all()
+    assert (directions == expected_directions).all()
+
+
+def test_flood_bitparallel_wide(random_maze):
+    from maze.solver import flood
+    # more than one word per row
+    maze = numpy.tile(random_maze[0], (5, 7))
+    maze[0, 0] = maze[-1, -1] = 1
+    distances, directions = flood(maze, engine='bitparallel')
+    assert (distances == flood(maze)[0]).all()
+    assert (directions == flood(maze, threads=1)[1]).all()
+
+
+def test_analyze_bitparallel(random_maze):
+    maze, _ = random_maze
+    amaze = analyze(maze, engine='bitparallel')
+    expected = analyze(maze, threads=1)
+    assert (amaze.distances == expected.distances).all()
+    assert amaze.unreachable == expected.unreachable
+    assert amaze.is_reachable == expected.is_reachable
+    # the owners come from the queue engine
+    assert (amaze.owners == analyze(maze).owners).all()
+
+
+def test_flood_engine_invalid(random_maze):
+    from maze.solver import flood
+    maze, _ = random_maze
+    with pytest.raises(ValueError):
+        flood(maze, engine='magic')
+    with pytest.raises(ValueError):
+        analyze(maze, engine='magic')
+    for options in {'threads': 2}, {'costs': numpy.ones(maze.shape)}, {'stop_when_reached': [(0, 0)]}:
+        with pytest.raises(ValueError):
+            flood(maze, engine='bitparallel', **options)
+    with pytest.raises(ValueError):
+        flood(maze, engine='bitparallel', owners=True)
+
+
+@pytest.mark.parametrize('options', [{}, {'threads': 2}, {'engine': 'bitparallel'}, {'costs': 'ones'}],
+                         ids=['queue', 'threads', 'bitparallel', 'costs'])
+def test_flood_stats(random_maze, options):
+    from maze.solver import flood
+    maze, _ = random_maze
+    if 'costs' in options:
+        options = {'costs': numpy.ones(maze.shape, dtype=numpy.int64)}
+    stats = {}
+    distances, directions = flood(maze, stats=stats, **options)
+    assert (distances == flood(maze, **options)[0]).all()
+    reached = (distances >= 0).sum()
+    assert stats['enqueued'] == stats['settled'] == reached
+    assert stats['stale'] == 0
+    assert stats['setup_seconds'] >= 0 and stats['bfs_seconds'] >= 0
+    if 'engine' in options:
+        assert 'peak' not in stats
+    else:
+        assert 0 < stats['peak'] <= reached
+
+
+def test_flood_stats_packed(random_maze):
+    from maze.solver import flood
+    from maze.packed import pack
+    maze, _ = random_maze
+    stats = {}
+    distances, _ = flood(pack(maze), stats=stats)
+    assert stats['enqueued'] == stats['settled'] == (distances >= 0).sum()
+
+
+def test_analyze_stats(random_maze):
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 2
+    amaze = analyze(maze)
+    amaze.materialize()
+    amaze.update_cell(0, 0, -1)
+    assert amaze.stats is None
+
+    events = []
+    amaze = analyze(maze, stats_hook=lambda event, values: events.append((event, values)))
+    amaze.materialize()
+    assert [event for event, _ in events] == ['flood', 'lines', 'reachable']
+    assert amaze.stats['floods'] == 1
+    assert amaze.stats['settled'] == (amaze.distances >= 0).sum()
+    assert amaze.stats['lines_seconds'] >= 0 and amaze.stats['reachable_seconds'] >= 0
+
+    for i in range(5):
+        amaze.update_cell(*random_edit(amaze.maze, rng))
+    repairs = [values for event, values in events if event == 'repair']
+    assert amaze.stats['repairs'] == len(repairs) > 0
+    assert amaze.stats['enqueued'] == sum(values['enqueued'] for _, values in events if 'enqueued' in values)
+    for values in repairs:
+        assert values['enqueued'] == values['stale'] + values['settled']
+
+    # a shared analysis counts its own work
+    shared = amaze.share()
+    assert shared.stats == {} and shared.stats_hook is amaze.stats_hook
+    assert analyze(maze, stats=True).stats == {}
+
+
+@pytest.mark.parametrize('tile', [1, 4, 7, 64])
+def test_flood_tiled(random_maze, tile):
+    from maze.solver import flood, flood_tiled, count_unreachable
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 1
+    distances = numpy.empty(maze.shape, dtype=numpy.int16)
+    directions = numpy.empty(maze.shape, dtype=('a', 1))
+    unreachable = flood_tiled(maze, distances, directions, tile)
+    expected_distances, expected_directions = flood(maze, threads=2)
+    assert (distances == expected_distances).all()
+    assert (directions == expected_directions).all()
+    assert unreachable == count_unreachable(directions)
+
+
+def test_flood_tiled_wide():
+    # memory goes with the tiles, not with the rows of the maze
+    import tracemalloc
+    from maze.solver import flood, flood_tiled
+    maze = numpy.zeros((8, 2**18), dtype=numpy.int8)
+    maze[0, 0] = 1
+    distances = numpy.empty(maze.shape, dtype=numpy.int64)
+    directions = numpy.empty(maze.shape, dtype=('a', 1))
+    tracemalloc.start()
+    try:
+        flood_tiled(maze, distances, directions, tile=256)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < maze.size
+    assert (distances == flood(maze)[0]).all()
+
+
+def test_flood_tiled_invalid(random_maze):
+    from maze.solver import flood_tiled
+    maze, _ = random_maze
+    directions = numpy.empty(maze.shape, dtype=('a', 1))
+    with pytest.raises(ValueError):
+        flood_tiled(maze, numpy.empty((3, 3), dtype=numpy.int64), directions)
+    with pytest.raises(ValueError):
+        flood_tiled(maze, numpy.empty(maze.shape, dtype=numpy.int64), directions.astype('a2'))
+    with pytest.raises(ValueError):
+        flood_tiled(maze, numpy.empty(maze.shape, dtype=numpy.int64), directions, tile=0)
+
+
+def check_steps(maze, path):
+    for (r1, c1), (r2, c2) in zip(path, path[1:]):
+        assert abs(r1 - r2) + abs(c1 - c2) == 1
+        assert maze[r2, c2] >= 0
+
+
+def test_shortest_path_nearest(random_maze):
+    from maze.solver import shortest_path, PathFinder
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 1
+    amaze = analyze(maze)
+    finder = PathFinder(maze.size)
+    for row, column in numpy.argwhere(amaze.distances >= 0):
+        path = shortest_path(maze, (row, column), finder=finder)
+        assert path[0] == (row, column) and maze[path[-1]] == 1
+        assert len(path) == amaze.distances[row, column] + 1
+        check_steps(maze, path)
+
+
+def test_shortest_path_goal(random_maze):
+    from maze.solver import shortest_path, flood
+    maze, rng = random_maze
+    goal = tuple(numpy.argwhere(maze == 1)[0])
+    row, column = goal
+    maze[max(row - 3, 0):row + 4, column] = 0
+    maze[rng.randint(15), rng.randint(20)] = 1
+    single = numpy.where(maze == 1, 0, maze)
+    single[goal] = 1
+    distances, _ = flood(single)
+    for start in map(tuple, numpy.argwhere(distances >= 0)):
+        path = shortest_path(maze, start, goal)
+        assert path[0] == start and path[-1] == goal
+        assert len(path) == distances[start] + 1
+        check_steps(maze, path)
+
+
+def test_shortest_path_raises(random_maze):
+    from maze.solver import shortest_path, PathFinder
+    maze, _ = random_maze
+    maze[0, :] = -1
+    maze[0, 1] = 0
+    maze[1, :] = -1
+    with pytest.raises(ValueError):
+        shortest_path(maze, (0, 0))
+    with pytest.raises(ValueError):
+        shortest_path(maze, (0, 1))
+    with pytest.raises(IndexError):
+        shortest_path(maze, maze.shape)
+    with pytest.raises(ValueError):
+        shortest_path(maze, (2, 0), finder=PathFinder(maze.size - 1))
+
+
+@pytest.mark.parametrize('chunk', [2, 3, 4, 16])
+def test_hierarchical_paths(random_maze, chunk):
+    from maze.solver import HierarchicalMaze
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 1
+    hmaze = HierarchicalMaze(maze, chunk)
+    amaze = analyze(maze)
+    for row, column in numpy.argwhere(maze >= 0):
+        if amaze.distances[row, column] < 0:
+            with pytest.raises(ValueError):
+                hmaze.path(row, column)
+            continue
+        path = hmaze.path(row, column)
+        assert path[0] == (row, column) and maze[path[-1]] == 1
+        assert len(path) >= amaze.distances[row, column] + 1
+        check_steps(maze, path)
+    with pytest.raises(ValueError):
+        hmaze.path(*numpy.argwhere(maze < 0)[0])
+
+
+def test_hierarchical_corridor():
+    from maze.solver import HierarchicalMaze
+    maze = numpy.full((20, 20), -1, dtype=numpy.int8)
+    maze[1:-1, 3] = 0
+    maze[18, 3:17] = 0
+    maze[1:19, 16] = 0
+    maze[1, 16] = 1
+    hmaze = HierarchicalMaze(maze, 4)
+    assert lt(hmaze.path(1, 3)) == lt(analyze(maze).path(1, 3))
+
+
+def test_hierarchical_update_cells(random_maze):
+    from maze.solver import HierarchicalMaze
+    maze, rng = random_maze
+    hmaze = HierarchicalMaze(maze, 4)
+    for i in range(20):
+        changes = [random_edit(maze, rng) for j in range(3)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        hmaze.update_cells(changes)
+        assert (hmaze.maze == maze).all()
+        distances = analyze(maze).distances
+        for row, column in numpy.argwhere(maze >= 0):
+            if distances[row, column] < 0:
+                with pytest.raises(ValueError):
+                    hmaze.path(row, column)
+            else:
+                path = hmaze.path(row, column)
+                assert maze[path[-1]] == 1
+                check_steps(maze, path)
+    with pytest.raises(IndexError):
+        hmaze.update_cell(*maze.shape, -1)
+
+
+def test_flood_costs(random_maze):
+    from maze.solver import flood
+    maze, rng = random_maze
+    maze[rng.randint(15), rng.randint(20)] = 1
+    costs = rng.randint(1, 10, size=maze.shape)
+    distances, directions = flood(maze, costs=costs)
+    assert (distances == weighted_distances(maze, costs)).all()
+    assert ((directions == b' ') == (maze >= 0) & (distances < 0)).all()
+    amaze = analyze(maze, costs=costs)
+    for row, column in numpy.argwhere(distances > 0):
+        path = amaze.path(row, column)
+        assert maze[path[-1]] == 1
+        assert sum(costs[step] for step in path[:-1]) == distances[row, column]
+
+
+def test_flood_unit_costs(random_maze):
+    from maze.solver import flood
+    maze, _ = random_maze
+    distances, directions = flood(maze, costs=numpy.ones(maze.shape, dtype=numpy.uint8))
+    expected = flood(maze)
+    assert (distances == expected[0]).all()
+    assert (directions == expected[1]).all()
+
+
+def test_flood_costs_compact(random_maze):
+    from maze.solver import flood, distance_dtype
+    maze, rng = random_maze
+    costs = numpy.full(maze.shape, 200)
+    distances, _ = flood(maze, compact=True, costs=costs)
+    assert distances.dtype == distance_dtype(maze.shape, 200) == numpy.int32
+    assert (distances == flood(maze, costs=costs)[0]).all()
+
+
+def test_flood_costs_invalid(random_maze):
+    from maze.solver import flood
+    maze, _ = random_maze
+    costs = numpy.ones(maze.shape, dtype=numpy.int16)
+    costs[maze < 0] = 0
+    flood(maze, costs=costs)
+    for bad in (numpy.zeros_like(costs), costs + 255, costs[1:]):
+        with pytest.raises(ValueError):
+            flood(maze, costs=bad)
+    with pytest.raises(ValueError):
+        flood(maze, costs=costs, threads=2)
+
+
+def test_analyze_costs_update_cells(random_maze):
+    maze, rng = random_maze
+    costs = rng.randint(1, 5, size=maze.shape)
+    amaze = analyze(maze, compact=True, costs=costs)
+    for i in range(10):
+        changes = [random_edit(maze, rng) for j in range(3)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        amaze.update_cells(changes)
+        fresh = analyze(maze, compact=True, costs=costs)
+        assert (amaze.distances == fresh.distances).all()
+        assert amaze.is_reachable == fresh.is_reachable
+    with pytest.raises(IndexError):
+        amaze.update_cell(*maze.shape, -1)
+
+
+def test_analyze_costs_update_cells_invalid():
+    maze = zeros(3, 3)
+    maze[0, 0] = 1
+    maze[1, 1] = -1
+    costs = numpy.ones(maze.shape, dtype=numpy.int16)
+    # walls may cost anything, opening one needs a valid cost
+    costs[1, 1] = 0
+    amaze = analyze(maze, costs=costs)
+    distances = amaze.distances.copy()
+    with pytest.raises(ValueError):
+        amaze.update_cells([(0, 2, -1), (1, 1, 0)])
+    with pytest.raises(IndexError):
+        amaze.update_cells([(0, 2, -1), (3, 0, -1)])
+    # nothing of the batches was applied
+    assert (amaze.maze == maze).all()
+    assert (amaze.distances == distances).all()
+
+
+def test_paths_arrays(random_maze):
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    cells = numpy.argwhere(numpy.ones(maze.shape))
+    steps, offsets = amaze.paths(cells)
+    assert steps.dtype == numpy.int32 and steps.shape == (offsets[-1], 2)
+    assert len(offsets) == len(cells) + 1 and offsets[0] == 0
+    for i, (row, column) in enumerate(cells):
+        path = steps[offsets[i]:offsets[i + 1]]
+        if amaze.distances[row, column] < 0:
+            assert not len(path)
+        else:
+            assert lt(path) == lt(amaze.path(row, column))
+            assert (amaze.path(row, column, as_array=True) == path).all()
+
+
+def test_paths_empty_and_raises(random_maze):
+    maze, _ = random_maze
+    amaze = analyze(maze)
+    steps, offsets = amaze.paths([])
+    assert steps.shape == (0, 2) and list(offsets) == [0]
+    with pytest.raises(IndexError):
+        amaze.paths([maze.shape])
+    with pytest.raises(ValueError):
+        amaze.path(*numpy.argwhere(maze < 0)[0], as_array=True)
+
+
+def test_lines_of_starts(random_maze):
+    from maze.solver import arrows_to_path
+    maze, rng = random_maze
+    dudes = numpy.argwhere(maze == 0)[:5]
+    maze[tuple(dudes.T)] = 2
+    amaze = analyze(maze)
+    expected = []
+    for row, column in sorted(map(tuple, dudes)):
+        if amaze.distances[row, column] >= 0:
+            expected.append(arrows_to_path(amaze.directions, row, column))
+    assert amaze.lines == expected
+
+
+@pytest.mark.timeout(5)
+def test_paths_speed(huge):
+    amaze = analyze(huge)
+    starts = numpy.argwhere(huge == 0)[::997]
+    steps, offsets = amaze.paths(starts)
+    assert (numpy.diff(offsets) == starts.sum(axis=1) + 1).all()
+
+
+@pytest.fixture
+def counted_floods(monkeypatch):
+    from maze import solver
+    calls = []
+    flood = solver.flood
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return flood(*args, **kwargs)
+
+    monkeypatch.setattr(solver, 'flood', counting)
+    return calls
+
+
+def test_analyze_lazy(random_maze, counted_floods):
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    assert not counted_floods
+    # the analysis has its own copy of the maze
+    expected = analyze(maze.copy()).materialize()
+    maze[...] = -1
+    assert amaze.is_reachable == expected.is_reachable
+    assert len(counted_floods) == 2
+    assert (amaze.distances == expected.distances).all()
+    assert amaze.lines == expected.lines
+    assert len(counted_floods) == 2
+
+
+def test_analyze_update_before_flood(random_maze, counted_floods):
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    for i in range(10):
+        changes = [random_edit(maze, rng) for j in range(3)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        amaze.update_cells(changes)
+    assert not counted_floods
+    check_same_analysis(maze, amaze)
+    assert amaze.starts == set(map(tuple, numpy.argwhere(maze >= 2)))
+
+
+def test_analyze_materialize(random_maze, counted_floods):
+    maze, rng = random_maze
+    maze[tuple(numpy.argwhere(maze == 0)[:3].T)] = 2
+    amaze = analyze(maze).materialize()
+    assert len(counted_floods) == 1
+    assert amaze.materialize() is amaze
+    assert len(counted_floods) == 1
+    reachable = amaze.distances[tuple(numpy.argwhere(maze == 2).T)] >= 0
+    assert len(amaze.lines) == reachable.sum()
+
+
+def test_analyze_directions_setter(random_maze):
+    maze, rng = random_maze
+    amaze = analyze(maze)
+    directions = amaze.directions.copy()
+    unreachable = amaze.unreachable
+    amaze.update_cell(*random_edit(maze, rng))
+    amaze.directions = directions
+    assert amaze.unreachable == unreachable
+
+
+def test_flood_stop_when_reached(random_maze):
+    from maze.solver import flood, arrows_to_path
+    maze, rng = random_maze
+    distances, directions = flood(maze)
+    stops = [(rng.randint(15), rng.randint(20)) for i in range(3)]
+    partial, arrows = flood(maze, stop_when_reached=stops)
+    known = arrows != b'?'
+    assert (partial[known] == distances[known]).all()
+    assert (partial[~known] == -1).all()
+    for stop in stops:
+        assert partial[stop] == distances[stop]
+        if partial[stop] >= 0:
+            assert len(arrows_to_path(arrows, *stop)) == partial[stop] + 1
+
+
+def test_analyze_stop_when_reached():
+    maze = zeros(50, 50)
+    maze[0, 0] = 1
+    maze[2, 3] = 2
+    amaze = analyze(maze, stop_when_reached=[(2, 3)])
+    assert amaze.start_paths[0].tolist() == amaze.path(2, 3, as_array=True).tolist()
+    assert len(amaze.lines[0]) == 6
+    assert amaze.directions[49, 49] == b'?'
+    assert amaze.unreachable is None and amaze.is_reachable is None
+    steps, offsets = amaze.paths([(49, 49)])
+    assert not len(steps)
+    with pytest.raises(ValueError):
+        amaze.path(49, 49)
+    # edits drop the partial flood
+    amaze.update_cell(1, 0, -1)
+    assert amaze.distances[2, 3] == 5
+    assert amaze.distances[2, 0] == 4
+
+
+def test_stop_when_reached_full_flood(random_maze):
+    from maze.solver import flood
+    maze, rng = random_maze
+    maze[0:2, 0:2] = [[0, -1], [-1, -1]]
+    # the flood cannot stop before it runs out of cells
+    distances, directions = flood(maze, stop_when_reached=[(0, 0)])
+    assert b'?' not in directions and directions[0, 0] == b' '
+    assert (distances == flood(maze)[0]).all()
+    assert analyze(maze, stop_when_reached=[(0, 0)]).unreachable == analyze(maze).unreachable
+
+
+def test_stop_when_reached_invalid(random_maze):
+    from maze.solver import flood
+    maze, rng = random_maze
+    with pytest.raises(IndexError):
+        flood(maze, stop_when_reached=[maze.shape])
+    with pytest.raises(ValueError):
+        flood(maze, stop_when_reached=[(0, 0)], threads=2)
+    with pytest.raises(ValueError):
+        flood(maze, stop_when_reached=[(0, 0)], costs=numpy.ones(maze.shape, dtype=int))
+
+
+def check_owners(maze, amaze):
+    targets = amaze.targets
+    owners = amaze.owners
+    assert owners.dtype == numpy.int16
+    for row, column in numpy.argwhere(owners >= 0):
+        assert tuple(amaze.path(row, column)[-1]) == tuple(targets[owners[row, column]])
+    assert ((owners == -1) == ((amaze.directions == b'#') | (amaze.directions == b' '))).all()
+
+
+def test_flood_owners(random_maze):
+    from maze.solver import flood
+    maze, rng = random_maze
+    maze[tuple(numpy.argwhere(maze == 0)[::40].T)] = 1
+    distances, directions, owners = flood(maze, owners=True)
+    assert (distances == flood(maze)[0]).all()
+    check_owners(maze, analyze(maze))
+
+
+@pytest.mark.parametrize(('threads', 'engine'), [(1, None), (3, None), (None, 'bitparallel')])
+def test_owners_threads(random_maze, threads, engine):
+    from maze.solver import flood
+    maze, rng = random_maze
+    maze[tuple(numpy.argwhere(maze == 0)[::40].T)] = 1
+    # the bit-parallel flood breaks ties as the level flood
+    distances, directions, owners = flood(maze, threads=threads or 1, owners=True)
+    assert (directions == flood(maze, threads=threads, engine=engine)[1]).all()
+    amaze = analyze(maze, threads=threads, engine=engine)
+    directions = amaze.directions.copy()
+    check_owners(maze, amaze)
+    # the arrows stay those of the analysis
+    assert (amaze.directions == directions).all()
+    assert (amaze.owners == owners).all()
+
+
+def test_owners_update_cells(random_maze, counted_floods):
+    maze, rng = random_maze
+    maze[tuple(numpy.argwhere(maze == 0)[::40].T)] = 1
+    amaze = analyze(maze)
+    amaze.owners
+    for i in range(10):
+        changes = [random_edit(maze, rng) for j in range(3)]
+        changes = [(row, column, value) for row, column, value in changes if value != 1 and maze[row, column] != 1]
+        for row, column, value in changes:
+            maze[row, column] = value
+        amaze.update_cells(changes)
+        check_owners(maze, amaze)
+    assert len(counted_floods) == 1
+    # added targets are numbered again
+    row, column = numpy.argwhere(maze == 0)[0]
+    amaze.update_cell(row, column, 1)
+    check_owners(maze, amaze)
+    assert len(counted_floods) == 2
+
+
+def test_regions(random_maze):
+    from maze.solver import regions
+    maze, rng = random_maze
+    maze[tuple(numpy.argwhere(maze == 0)[::40].T)] = 1
+    amaze = analyze(maze)
+    cells, offsets = amaze.regions
+    assert cells.dtype == numpy.int32
+    assert (numpy.diff(offsets) == amaze.region_sizes).all()
+    assert amaze.region_sizes.sum() == (amaze.owners >= 0).sum()
+    for index in range(len(amaze.targets)):
+        assert (cells[offsets[index]:offsets[index + 1]] == amaze.region(index)).all()
+    cells, offsets = regions(amaze.owners)
+    assert len(offsets) == amaze.owners.max() + 2
+
+
+def test_owners_invalid(random_maze):
+    from maze.solver import flood, repair
+    maze, rng = random_maze
+    with pytest.raises(ValueError):
+        flood(maze, costs=numpy.ones(maze.shape, dtype=int), owners=True)
+    distances, directions, owners = flood(maze, owners=True)
+    row, column = numpy.argwhere(maze == 0)[0]
+    with pytest.raises(ValueError):
+        repair(distances, directions, [(row, column, 1)], owners)
+    many = numpy.ones((200, 200), dtype=numpy.int8)
+    for threads in None, 2:
+        with pytest.raises(ValueError):
+            flood(many, owners=True, threads=threads)
+
+
+def check_components(maze, components):
+    amaze = analyze(maze)
+    assert components.unreachable == amaze.unreachable
+    assert components.is_reachable == amaze.is_reachable
+    for row, column in numpy.ndindex(maze.shape):
+        assert components.reaches_target(row, column) == (amaze.distances[row, column] >= 0)
+    labels = components.labels()
+    assert labels.shape == maze.shape
+    for row, column in numpy.ndindex(maze.shape):
+        assert labels[row, column] == components.component(row, column)
+
+
+def test_components(random_maze):
+    from maze.solver import ComponentIndex
+    maze, rng = random_maze
+    components = ComponentIndex(maze)
+    check_components(maze, components)
+    open_cells = list(map(tuple, numpy.argwhere(maze >= 0)))
+    for i in range(30):
+        a = open_cells[rng.randint(len(open_cells))]
+        b = open_cells[rng.randint(len(open_cells))]
+        single = numpy.where(maze >= 0, 0, -1).astype(numpy.int8)
+        single[a] = 1
+        assert components.same_component(a, b) == (analyze(single).distances[b] >= 0)
+        assert components.same_component(a, b) == (components.component(*a) == components.component(*b))
+    wall = tuple(numpy.argwhere(maze < 0)[0])
+    assert components.component(*wall) == -1
+    assert not components.same_component(wall, wall)
+
+
+def test_components_update_cells(random_maze):
+    from maze.solver import ComponentIndex
+    maze, rng = random_maze
+    components = ComponentIndex(maze)
+    for i in range(20):
+        changes = [random_edit(maze, rng) for j in range(3)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        components.update_cells(changes)
+        check_components(maze, components)
+    with pytest.raises(IndexError):
+        components.update_cell(maze.shape[0], 0, 0)
+    with pytest.raises(IndexError):
+        components.reaches_target(-1, 0)
+
+
+def check_cuts(maze, cuts, cells):
+    reachable = analyze(maze).distances >= 0
+    for row, column in numpy.ndindex(maze.shape):
+        blocked = maze.copy()
+        blocked[row, column] = -1
+        lost = reachable & (analyze(blocked).distances < 0)
+        lost[row, column] = False
+        assert cuts.cuts_off(row, column) == (maze[row, column] >= 0 and lost.any())
+        lost[row, column] = maze[row, column] >= 0 and reachable[row, column]
+        assert cuts.cuts_off(row, column, cells) == any(lost[cell] for cell in cells)
+
+
+def test_cuts(random_maze):
+    from maze.solver import CutIndex
+    maze, rng = random_maze
+    maze[tuple(numpy.argwhere(maze == 0)[::70].T)] = 1
+    cells = [(rng.randint(15), rng.randint(20)) for i in range(3)]
+    check_cuts(maze, CutIndex(maze), cells)
+
+
+def test_cuts_update_cells(random_maze):
+    from maze.solver import CutIndex
+    maze, rng = random_maze
+    cuts = CutIndex(maze)
+    for i in range(5):
+        changes = [random_edit(maze, rng) for j in range(3)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        cuts.update_cells(changes)
+        check_cuts(maze, cuts, [(rng.randint(15), rng.randint(20))])
+    with pytest.raises(IndexError):
+        cuts.cuts_off(0, 0, [(0, 20)])
+
+
+def test_cuts_corridor():
+    from maze.solver import CutIndex
+    maze = zeros(3, 6)
+    maze[1, :5] = -1
+    maze[0, 0] = 1
+    cuts = CutIndex(maze)
+    # the only way around the wall
+    assert cuts.cuts_off(1, 5, [(2, 0)])
+    assert not cuts.cuts_off(1, 5, [(0, 3)])
+    assert cuts.cuts_off(2, 3, [(2, 0)]) and not cuts.cuts_off(2, 3, [(2, 4)])
+    # a second castle below makes it safe
+    cuts.update_cell(2, 0, 1)
+    assert not cuts.cuts_off(1, 5, [(2, 1)])
+
+
+def test_cuts_far_targets():
+    from maze.solver import CutIndex
+    # too far for the search around the cell, the whole index answers
+    maze = zeros(1, 40001)
+    maze[0, 0] = maze[0, 40000] = 1
+    cuts = CutIndex(maze)
+    assert not cuts.cuts_off(0, 20000)
+    cuts.update_cell(0, 20000, -1)
+    assert not cuts.cuts_off(0, 10000, [(0, 9999)])
+    assert cuts.cuts_off(0, 10000, [(0, 19999)]) and cuts.cuts_off(0, 10000)
+    cuts.update_cell(0, 0, 0)
+    assert not cuts.cuts_off(0, 10000, [(0, 19999)])
+    assert cuts.cuts_off(0, 30000, [(0, 29999)]) and not cuts.cuts_off(0, 30000, [(0, 30001)])
+
+
 @pytest.fixture(scope='module')
 def huge(request):
     maze = zeros(2048, 2048)
@@ -262,6 +1142,141 @@ def test_path_speed(huge):
         amaze.path(2047, 2047)
 
 
+def test_flood_queue_holds_frontier(huge):
+    from maze.solver import flood, CellQueue
+    queue = CellQueue(huge.size)
+    flood(huge, queue)
+    assert queue.peak <= sum(huge.shape)
+
+
+@pytest.mark.timeout(5)
+def test_shortest_path_explores_little(huge):
+    from maze.solver import shortest_path, PathFinder
+    finder = PathFinder(huge.size)
+    for i in range(1000):
+        path = shortest_path(huge, (20, 10 + i % 7), finder=finder)
+        assert len(path) == 31 + i % 7
+        assert finder.explored <= 2000
+    path = shortest_path(huge, (2047, 2047), (2000, 2040), finder)
+    assert len(path) == 55 and finder.explored == 55
+
+
+@pytest.mark.timeout(10)
+def test_hierarchical_speed(huge):
+    from maze.solver import HierarchicalMaze
+    hmaze = HierarchicalMaze(huge)
+    for i in range(100):
+        assert len(hmaze.path(2047 - i, 2047)) == 4095 - i
+    for i in range(100):
+        hmaze.update_cell(1000, i, -1)
+    assert len(hmaze.path(2047, 2047)) == 4095
+
+
+@pytest.mark.timeout(20)
+def test_flood_costs_speed(huge):
+    costs = numpy.random.RandomState(0).randint(1, 6, size=huge.shape)
+    for i in range(20):
+        amaze = analyze(huge, costs=costs)
+
+
+def test_flood_threads_huge(huge):
+    from maze.solver import flood
+    distances, directions = flood(huge, threads=2)
+    assert (distances == flood(huge)[0]).all()
+    assert (directions[1:, :] == b'^').all()
+
+
+@pytest.mark.timeout(20)
+def test_flood_bitparallel_huge(huge):
+    from maze.solver import flood
+    for i in range(20):
+        distances, directions = flood(huge, engine='bitparallel')
+    assert (distances == flood(huge)[0]).all()
+    assert (directions[1:, :] == b'^').all()
+
+
+@pytest.mark.timeout(20)
+def test_flood_tiled_huge(huge):
+    from maze.solver import flood, flood_tiled
+    distances = numpy.empty(huge.shape, dtype=numpy.int32)
+    directions = numpy.empty(huge.shape, dtype=('a', 1))
+    assert flood_tiled(huge, distances, directions, tile=512) == 0
+    assert (distances == flood(huge)[0]).all()
+    assert (directions[1:, :] == b'^').all()
+
+
+@pytest.mark.timeout(5)
+def test_stop_when_reached_speed(huge):
+    for i in range(50):
+        amaze = analyze(huge, compact=True, stop_when_reached=[(20, 10)])
+        assert len(amaze.path(20, 10)) == 31
+
+
+@pytest.mark.timeout(10)
+def test_regions_speed(huge):
+    maze = huge.copy()
+    maze[::256, ::256] = 1
+    amaze = analyze(maze)
+    for i in range(10):
+        cells, offsets = amaze.regions
+    assert offsets[-1] == maze.size
+    assert len(offsets) == 65
+
+
+@pytest.mark.timeout(5)
+def test_components_speed(huge):
+    from maze.solver import ComponentIndex
+    components = ComponentIndex(huge)
+    for i in range(2047):
+        components.update_cell(1000, i, -1)
+    assert components.unreachable == 0
+    components.update_cell(1000, 2047, -1)
+    assert components.unreachable == 1047*2048
+    for i in range(100000):
+        components.update_cell(1000, i % 2048, 0)
+        assert components.reaches_target(2047, 2047)
+
+
+@pytest.fixture(scope='module')
+def huge_walls(huge):
+    maze = huge.copy()
+    maze[numpy.random.RandomState(0).rand(*maze.shape) < 0.2] = -1
+    maze[0, 0] = maze[2047, 2047] = 1
+    return maze
+
+
+@pytest.mark.timeout(10)
+def test_cuts_speed(huge_walls):
+    from maze.solver import CutIndex
+    maze = huge_walls.copy()
+    # a dude in the corner with a single way out
+    maze[2045:, :3] = 0
+    maze[2047, 1] = -1
+    dudes = [(2047, 0), (0, 2047), (1024, 1024)]
+    cuts = CutIndex(maze)
+    rng = numpy.random.RandomState(1)
+    # a game, walls go up unless they cut a dude off, some are torn down again
+    for i in range(500):
+        row, column = rng.randint(2048, size=2)
+        value = 0 if i % 5 == 0 else -1
+        if value < 0 and cuts.cuts_off(row, column, dudes):
+            continue
+        maze[row, column] = value
+        cuts.update_cell(row, column, value)
+    assert (analyze(maze).distances[tuple(numpy.transpose(dudes))] >= 0).all()
+    assert cuts.cuts_off(2046, 0, dudes) and not cuts.cuts_off(2046, 0, dudes[1:])
+    for i in range(100000):
+        cuts.cuts_off(i % 2048, 1000, dudes)
+
+
+@pytest.mark.timeout(5)
+def test_update_cell_speed(huge):
+    amaze = analyze(huge)
+    for i in range(1000):
+        amaze.update_cell(2047, 2047 - i % 20, -1)
+        amaze.update_cell(2047, 2047 - i % 20, 0)
+
+
 # Helper functions bellow
 
 
@@ -337,6 +1352,35 @@ def check_path_distance_descends(h, w, amaze):
                 last = current
 
 
+def check_same_analysis(maze, amaze):
+    fresh = analyze(maze)
+    assert (amaze.distances == fresh.distances).all()
+    assert amaze.is_reachable == fresh.is_reachable
+    for symbol in (b'#', b' ', b'X'):
+        assert ((amaze.directions == symbol) == (fresh.directions == symbol)).all()
+    # ties may be broken differently, but each arrow has to lead one step closer
+    h, w = maze.shape
+    for row in range(h):
+        for column in range(w):
+            if amaze.distances[row, column] > 0:
+                assert len(amaze.path(row, column)) == amaze.distances[row, column] + 1
+
+
+def weighted_distances(maze, costs):
+    # plain Dijkstra, a step costs as much as the cell it leaves
+    distances = numpy.full(maze.shape, -1, dtype=numpy.int64)
+    heap = [(0, tuple(end)) for end in numpy.argwhere(maze == 1)]
+    while heap:
+        dist, (row, column) = heapq.heappop(heap)
+        if distances[row, column] >= 0:
+            continue
+        distances[row, column] = dist
+        for r, c in ((row - 1, column), (row + 1, column), (row, column - 1), (row, column + 1)):
+            if 0 <= r < maze.shape[0] and 0 <= c < maze.shape[1] and maze[r, c] >= 0:
+                heapq.heappush(heap, (dist + costs[r, c], (r, c)))
+    return distances
+
+
 def check_path_raises(h, w, r, c, amaze):
     for row in range(r, h):
         for column in range(c, w):
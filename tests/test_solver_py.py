@@ -0,0 +1,320 @@
+import collections
+
+import numpy
+import pytest
+
+from maze import solver
+from maze._fallback import load_fallback
+
+pysolver = load_fallback('solver')
+
+MOVES = [((-1, 0), b'^'), ((1, 0), b'v'), ((0, -1), b'<'), ((0, 1), b'>')]
+
+
+@pytest.fixture(params=range(10), ids=lambda seed: 'seed{}'.format(seed))
+def random_maze(request):
+    rng = numpy.random.RandomState(request.param)
+    maze = numpy.where(rng.rand(25, 31) < 0.35, -1, 0).astype(numpy.int8)
+    maze[rng.rand(*maze.shape) < 0.005] = 1
+    maze[rng.randint(25), rng.randint(31)] = 1
+    return maze
+
+
+def test_fallback_distances(random_maze):
+    distances, _ = pysolver.flood(random_maze)
+    assert (distances == reference_distances(random_maze)).all()
+
+
+def test_fallback_compact(random_maze):
+    distances, _ = pysolver.flood(random_maze, compact=True)
+    assert distances.dtype == numpy.int16
+    assert (distances == reference_distances(random_maze)).all()
+
+
+def test_fallback_directions(random_maze):
+    distances, directions = pysolver.flood(random_maze)
+    h, w = random_maze.shape
+    assert ((directions == b'#') == (random_maze < 0)).all()
+    assert ((directions == b'X') == (random_maze == 1)).all()
+    assert ((directions == b' ') == (random_maze >= 0) & (distances < 0)).all()
+    for row, column in numpy.argwhere(distances > 0):
+        # the first neighbour one step closer, in the order up, down, left, right
+        for (dr, dc), arrow in MOVES:
+            r, c = row + dr, column + dc
+            if 0 <= r < h and 0 <= c < w and distances[r, c] == distances[row, column] - 1:
+                assert directions[row, column] == arrow
+                break
+
+
+def test_fallback_paths(random_maze):
+    amaze = pysolver.analyze(random_maze)
+    for row, column in numpy.argwhere(amaze.distances >= 0):
+        assert len(amaze.path(row, column)) == amaze.distances[row, column] + 1
+
+
+def test_fallback_paths_arrays(random_maze):
+    amaze = pysolver.analyze(random_maze)
+    cells = numpy.argwhere(numpy.ones(random_maze.shape))[::3]
+    steps, offsets = amaze.paths(cells)
+    expected = solver.analyze(random_maze).paths(cells)
+    assert steps.dtype == numpy.int32
+    assert (offsets == expected[1]).all()
+    for i, (row, column) in enumerate(cells):
+        if offsets[i + 1] > offsets[i]:
+            path = amaze.path(row, column, as_array=True)
+            assert (steps[offsets[i]:offsets[i + 1]] == path).all()
+
+
+def test_fallback_lazy(random_maze):
+    amaze = pysolver.analyze(random_maze)
+    expected = reference_distances(random_maze)
+    random_maze[...] = -1
+    assert (amaze.distances == expected).all()
+    assert amaze.materialize() is amaze
+
+
+def test_fallback_update_cells(random_maze):
+    rng = numpy.random.RandomState(0)
+    amaze = pysolver.analyze(random_maze)
+    for i in range(20):
+        changes = [(rng.randint(25), rng.randint(31), rng.choice([-1, 0, 1, 2])) for j in range(3)]
+        for row, column, value in changes:
+            random_maze[row, column] = value
+        amaze.update_cells(changes)
+        assert (amaze.distances == reference_distances(random_maze)).all()
+        assert amaze.is_reachable == pysolver.is_reachable(pysolver.flood(random_maze)[1])
+
+
+def test_fallback_update_cells_repeated(random_maze):
+    # a cell edited twice in one batch ends with its last value
+    rng = numpy.random.RandomState(1)
+    amaze = pysolver.analyze(random_maze)
+    amaze.unreachable
+    for i in range(50):
+        cells = [(rng.randint(25), rng.randint(31)) for j in range(2)]
+        changes = [cells[j % 2] + (rng.choice([-1, 0, 1, 2]),) for j in range(4)]
+        for row, column, value in changes:
+            random_maze[row, column] = value
+        amaze.update_cells(changes)
+        assert (amaze.distances == reference_distances(random_maze)).all()
+        assert amaze.unreachable == pysolver.analyze(random_maze).unreachable
+
+
+def test_fallback_shortest_path(random_maze):
+    distances = reference_distances(random_maze)
+    goal = tuple(numpy.argwhere(random_maze == 1)[0])
+    single = numpy.where(random_maze == 1, 0, random_maze)
+    single[goal] = 1
+    to_goal = reference_distances(single)
+    for row, column in numpy.argwhere(random_maze >= 0)[::7]:
+        start = (row, column)
+        if distances[start] < 0:
+            with pytest.raises(ValueError):
+                pysolver.shortest_path(random_maze, start)
+            continue
+        path = pysolver.shortest_path(random_maze, start)
+        assert path[0] == start and random_maze[path[-1]] == 1
+        assert len(path) == distances[start] + 1
+        if to_goal[start] >= 0:
+            path = pysolver.shortest_path(random_maze, start, goal)
+            assert path[-1] == goal and len(path) == to_goal[start] + 1
+
+
+def test_fallback_weighted(random_maze):
+    costs = numpy.random.RandomState(0).randint(1, 7, size=random_maze.shape)
+    distances, directions = pysolver.flood(random_maze, costs=costs)
+    expected = solver.flood(random_maze, costs=costs)
+    assert (distances == expected[0]).all()
+    assert (directions == expected[1]).all()
+    with pytest.raises(ValueError):
+        pysolver.flood(random_maze, costs=costs - 1)
+
+
+def test_fallback_weighted_update_cells(random_maze):
+    rng = numpy.random.RandomState(0)
+    costs = rng.randint(1, 4, size=random_maze.shape)
+    amaze = pysolver.analyze(random_maze, compact=True, costs=costs)
+    changes = [(rng.randint(25), rng.randint(31), rng.choice([-1, 0, 1])) for j in range(5)]
+    for row, column, value in changes:
+        random_maze[row, column] = value
+    amaze.update_cells(changes)
+    assert (amaze.distances == solver.flood(random_maze, costs=costs)[0]).all()
+
+
+def test_fallback_costs_update_cells_invalid():
+    maze = numpy.zeros((3, 3), dtype=numpy.int8)
+    maze[0, 0] = 1
+    maze[1, 1] = -1
+    costs = numpy.ones(maze.shape, dtype=numpy.int16)
+    costs[1, 1] = 0
+    amaze = pysolver.analyze(maze, costs=costs)
+    distances = amaze.distances.copy()
+    with pytest.raises(ValueError):
+        amaze.update_cells([(0, 2, -1), (1, 1, 0)])
+    with pytest.raises(IndexError):
+        amaze.update_cells([(0, 2, -1), (3, 0, -1)])
+    assert (amaze.maze == maze).all() and (amaze.distances == distances).all()
+
+
+def test_fallback_stop_when_reached(random_maze):
+    distances = reference_distances(random_maze)
+    stops = [(3, 4), (20, 7)]
+    amaze = pysolver.analyze(random_maze, stop_when_reached=stops)
+    known = amaze.directions != b'?'
+    assert (amaze.distances[known] == distances[known]).all()
+    assert (amaze.distances[~known] == -1).all()
+    steps, offsets = amaze.paths(stops)
+    for i, stop in enumerate(stops):
+        assert amaze.distances[stop] == distances[stop]
+        assert offsets[i + 1] - offsets[i] == max(distances[stop] + 1, 0)
+    assert amaze.unreachable is None or amaze.unreachable == solver.analyze(random_maze).unreachable
+    amaze.update_cell(3, 4, -1)
+    # the partial flood is redone for the edited maze
+    assert amaze.distances[20, 7] == reference_distances(amaze.maze)[20, 7]
+
+
+def test_fallback_owners(random_maze):
+    _, _, owners = solver.flood(random_maze, owners=True)
+    amaze = pysolver.analyze(random_maze)
+    # ties between targets may be broken differently
+    assert ((amaze.owners >= 0) == (owners >= 0)).all()
+    cells, offsets = amaze.regions
+    assert (cells == solver.regions(amaze.owners, len(amaze.targets))[0]).all()
+    assert (numpy.diff(offsets) == amaze.region_sizes).all()
+    walls = numpy.argwhere((random_maze == 0) & (owners >= 0))[:5]
+    amaze.update_cells([(row, column, -1) for row, column in walls])
+    maze = random_maze.copy()
+    maze[tuple(walls.T)] = -1
+    for row, column in numpy.argwhere(amaze.owners >= 0):
+        assert tuple(amaze.path(row, column)[-1]) == tuple(amaze.targets[amaze.owners[row, column]])
+    assert ((amaze.owners >= 0) == (solver.flood(maze, owners=True)[2] >= 0)).all()
+
+
+def test_fallback_components(random_maze):
+    rng = numpy.random.RandomState(0)
+    maze = random_maze.copy()
+    components = pysolver.ComponentIndex(maze)
+    for i in range(20):
+        changes = [(rng.randint(25), rng.randint(31), rng.choice([-1, -1, 0, 1])) for j in range(3)]
+        for row, column, value in changes:
+            maze[row, column] = value
+        components.update_cells(changes)
+        distances = reference_distances(maze)
+        assert components.unreachable == ((maze >= 0) & (distances < 0)).sum()
+        for row, column in numpy.ndindex(maze.shape):
+            assert components.reaches_target(row, column) == (distances[row, column] >= 0)
+        labels = components.labels()
+        assert all(labels[cell] == components.component(*cell) for cell in numpy.ndindex(maze.shape))
+    compiled = solver.ComponentIndex(maze)
+    for a, b in zip(numpy.argwhere(maze >= 0)[::7], numpy.argwhere(maze >= 0)[::5]):
+        assert components.same_component(tuple(a), tuple(b)) == compiled.same_component(tuple(a), tuple(b))
+
+
+def test_fallback_cuts(random_maze):
+    cuts = pysolver.CutIndex(random_maze)
+    compiled = solver.CutIndex(random_maze)
+    cells = [tuple(cell) for cell in numpy.argwhere(random_maze >= 0)[::50]]
+    for row, column in numpy.ndindex(random_maze.shape):
+        assert cuts.cuts_off(row, column) == compiled.cuts_off(row, column)
+        assert cuts.cuts_off(row, column, cells) == compiled.cuts_off(row, column, cells)
+    walls = numpy.argwhere(random_maze >= 0)[::40]
+    changes = [(row, column, -1) for row, column in walls]
+    cuts.update_cells(changes)
+    compiled.update_cells(changes)
+    for row, column in numpy.ndindex(random_maze.shape):
+        assert cuts.cuts_off(row, column, cells) == compiled.cuts_off(row, column, cells)
+
+
+def test_fallback_cuts_far_targets():
+    maze = numpy.zeros((1, 40001), dtype=numpy.int8)
+    maze[0, 0] = maze[0, 40000] = 1
+    cuts = pysolver.CutIndex(maze)
+    cuts.update_cell(0, 20000, -1)
+    assert cuts.cuts_off(0, 10000, [(0, 19999)]) and not cuts.cuts_off(0, 10000, [(0, 9999)])
+    cuts.update_cell(0, 0, 0)
+    assert not cuts.cuts_off(0, 10000, [(0, 19999)]) and cuts.cuts_off(0, 30000, [(0, 29999)])
+
+
+def test_fallback_share(random_maze):
+    amaze = pysolver.analyze(random_maze).materialize()
+    shared = amaze.share()
+    assert shared.distances is amaze.distances
+    row, column = numpy.argwhere(random_maze == 0)[0]
+    shared.update_cell(row, column, -1)
+    assert shared.directions[row, column] == b'#' and amaze.directions[row, column] != b'#'
+    assert amaze.unreachable == pysolver.analyze(random_maze).unreachable
+
+
+@pytest.mark.parametrize('tile', [1, 5, 64])
+def test_fallback_flood_tiled(random_maze, tile):
+    distances = numpy.empty(random_maze.shape, dtype=numpy.int64)
+    directions = numpy.empty(random_maze.shape, dtype=('a', 1))
+    unreachable = pysolver.flood_tiled(random_maze, distances, directions, tile)
+    expected_distances, expected_directions = pysolver.flood(random_maze)
+    assert (distances == expected_distances).all()
+    assert (directions == expected_directions).all()
+    assert unreachable == pysolver.count_unreachable(directions)
+
+
+def test_fallback_bitparallel(random_maze):
+    distances, directions = pysolver.flood(random_maze, engine='bitparallel')
+    assert (distances == pysolver.flood(random_maze)[0]).all()
+    assert pysolver.analyze(random_maze, engine='bitparallel').unreachable == \
+        pysolver.analyze(random_maze).unreachable
+    with pytest.raises(ValueError):
+        pysolver.analyze(random_maze, engine='magic')
+
+
+def test_fallback_stats(random_maze):
+    for options in {}, {'costs': numpy.ones(random_maze.shape, dtype=numpy.int64)}:
+        stats = {}
+        distances, _ = pysolver.flood(random_maze, stats=stats, **options)
+        reached = (distances >= 0).sum()
+        assert stats['enqueued'] == stats['settled'] == reached
+        assert stats['stale'] == 0 and 0 < stats['peak'] <= reached
+        assert stats['setup_seconds'] >= 0 and stats['bfs_seconds'] >= 0
+
+    events = []
+    amaze = pysolver.analyze(random_maze, stats_hook=lambda event, values: events.append(event))
+    amaze.materialize()
+    row, column = numpy.argwhere(random_maze == 0)[0]
+    amaze.update_cell(row, column, -1)
+    assert events == ['flood', 'reachable', 'repair']
+    assert amaze.stats['floods'] == amaze.stats['repairs'] == 1
+    assert pysolver.analyze(random_maze).stats is None
+
+
+def test_fallback_packed(random_maze):
+    from maze.packed import pack
+    for packed_result, result in zip(pysolver.flood(pack(random_maze)), pysolver.flood(random_maze)):
+        assert (packed_result == result).all()
+    assert pysolver.analyze(pack(random_maze)).unreachable == pysolver.analyze(random_maze).unreachable
+
+
+@pytest.fixture(scope='module')
+def huge(request):
+    maze = numpy.zeros((2048, 2048), dtype=numpy.int8)
+    maze[0, 0] = 1
+    return maze
+
+
+@pytest.mark.timeout(20)
+def test_fallback_analyze_speed(huge):
+    for i in range(20):
+        amaze = pysolver.analyze(huge)
+
+
+def reference_distances(maze):
+    distances = numpy.full(maze.shape, -1, dtype=numpy.int64)
+    jobs = collections.deque()
+    for end in numpy.argwhere(maze == 1):
+        distances[tuple(end)] = 0
+        jobs.append(tuple(end))
+    while jobs:
+        row, column = jobs.popleft()
+        for (dr, dc), _ in MOVES:
+            r, c = row + dr, column + dc
+            if 0 <= r < maze.shape[0] and 0 <= c < maze.shape[1] and maze[r, c] >= 0 and distances[r, c] < 0:
+                distances[r, c] = distances[row, column] + 1
+                jobs.append((r, c))
+    return distances
@@ -0,0 +1,168 @@
+import os
+
+import numpy
+import pytest
+
+from maze import analyze, storage
+from maze.cache import AnalysisCache
+
+
+@pytest.fixture(params=range(3), ids=lambda seed: 'seed{}'.format(seed))
+def random_maze(request):
+    rng = numpy.random.RandomState(request.param)
+    maze = numpy.where(rng.rand(15, 20) < 0.3, -1, 0).astype(numpy.int8)
+    maze[rng.randint(15), rng.randint(20)] = 1
+    return maze
+
+
+@pytest.fixture
+def counted_floods(monkeypatch):
+    from maze import solver
+    calls = []
+    flood = solver.flood
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return flood(*args, **kwargs)
+
+    monkeypatch.setattr(solver, 'flood', counting)
+    return calls
+
+
+def test_storage_round_trip(random_maze, tmpdir, counted_floods):
+    filename = str(tmpdir.join('maze.txt'))
+    storage.save(filename, random_maze, analyze(random_maze, compact=True), sidecar=True)
+    assert sorted(os.listdir(str(tmpdir))) == ['maze.txt', 'maze.txt.npz']
+
+    cache = AnalysisCache()
+    maze = storage.load(filename, cache)
+    assert (maze == random_maze).all()
+    analyzed = cache.analyze(maze, compact=True)
+    assert cache.hits == 1
+    assert len(counted_floods) == 1
+    expected = analyze(random_maze, compact=True)
+    assert (analyzed.distances == expected.distances).all()
+    assert (analyzed.directions == expected.directions).all()
+    assert analyzed.is_reachable == expected.is_reachable
+
+
+def test_storage_without_sidecar(random_maze, tmpdir, counted_floods):
+    for name in 'maze.txt', 'maze.maze':
+        storage.save(str(tmpdir.join(name)), random_maze)
+    assert sorted(os.listdir(str(tmpdir))) == ['maze.maze', 'maze.txt']
+    assert len(counted_floods) == 0
+    cache = AnalysisCache()
+    assert (storage.load(str(tmpdir.join('maze.txt')), cache) == random_maze).all()
+    assert len(cache) == 0
+
+
+def test_storage_stale_sidecar(random_maze, tmpdir):
+    filename = str(tmpdir.join('maze.txt'))
+    storage.save(filename, random_maze, sidecar=True)
+    changed = random_maze.copy()
+    changed[0, 0] = -1 if changed[0, 0] >= 0 else 0
+    numpy.savetxt(filename, changed, fmt='%d')
+
+    cache = AnalysisCache()
+    maze = storage.load(filename, cache)
+    assert (maze == changed).all()
+    assert len(cache) == 0
+
+
+def test_storage_broken_sidecar(random_maze, tmpdir):
+    filename = str(tmpdir.join('maze.txt'))
+    storage.save(filename, random_maze, sidecar=True)
+    tmpdir.join('maze.txt.npz').write('garbage')
+    cache = AnalysisCache()
+    assert (storage.load(filename, cache) == random_maze).all()
+    assert len(cache) == 0
+
+
+def test_storage_old_text_files(random_maze, tmpdir):
+    filename = str(tmpdir.join('maze.txt'))
+    numpy.savetxt(filename, random_maze)
+    cache = AnalysisCache()
+    assert (storage.load(filename, cache) == random_maze).all()
+    assert len(cache) == 0
+
+
+def test_storage_edited_analysis(random_maze, tmpdir):
+    filename = str(tmpdir.join('maze.txt'))
+    analyzed = analyze(random_maze, compact=True)
+    row, column = numpy.argwhere(random_maze == 0)[0]
+    analyzed.update_cell(row, column, -1)
+    storage.save(filename, random_maze, analyzed, sidecar=True)
+
+    cache = AnalysisCache()
+    storage.load(filename, cache)
+    loaded = cache.analyze(random_maze, compact=True)
+    assert (loaded.distances == analyze(random_maze, compact=True).distances).all()
+
+
+def test_storage_atomic(random_maze, tmpdir, monkeypatch):
+    filename = str(tmpdir.join('maze.txt'))
+    storage.save(filename, random_maze, sidecar=True)
+
+    def failing(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(numpy, 'savetxt', failing)
+    with pytest.raises(OSError):
+        storage.save(filename, numpy.zeros((3, 3), dtype=numpy.int8))
+    assert sorted(os.listdir(str(tmpdir))) == ['maze.txt', 'maze.txt.npz']
+    assert (numpy.loadtxt(filename, dtype=numpy.int8) == random_maze).all()
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_storage_binary(random_maze, tmpdir, compress):
+    filename = str(tmpdir.join('maze.maze'))
+    storage.save(filename, random_maze, compress=compress, sidecar=True)
+    assert storage.is_binary(filename)
+    cache = AnalysisCache()
+    maze = storage.load(filename, cache)
+    assert isinstance(maze, numpy.memmap) != compress
+    assert maze.dtype == numpy.int8 and (maze == random_maze).all()
+    assert len(cache) == 1
+    # edits stay in memory
+    maze[0, 0] = 5
+    assert (storage.load(filename) == random_maze).all()
+    assert (storage.read_maze(filename, mmap=False) == random_maze).all()
+
+
+def test_storage_binary_size(tmpdir):
+    filename = str(tmpdir.join('maze.maze'))
+    maze = numpy.zeros((300, 400), dtype=numpy.int8)
+    storage.save(filename, maze)
+    assert os.path.getsize(filename) == storage.HEADER.size + maze.size
+    storage.save(filename, maze, compress=True)
+    assert os.path.getsize(filename) < maze.size // 100
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_storage_binary_broken(random_maze, tmpdir, compress):
+    filename = str(tmpdir.join('maze.maze'))
+    with open(filename, 'wb') as f:
+        storage.write_maze(f, random_maze, compress)
+    with open(filename, 'rb') as f:
+        data = f.read()
+
+    for broken in data[:-10], data + b'\0' * 100, b'MAZE' + b'\xff' * 40, b'MAZE':
+        with open(filename, 'wb') as f:
+            f.write(broken)
+        for mmap in True, False:
+            with pytest.raises(ValueError):
+                storage.read_maze(filename, mmap)
+
+
+def test_storage_flood_to_files(random_maze, tmpdir):
+    filename = str(tmpdir.join('maze.maze'))
+    storage.save(filename, random_maze)
+    prefix = str(tmpdir.join('flood'))
+    distances, directions, unreachable = storage.flood_to_files(storage.load(filename), prefix, tile=4)
+    assert isinstance(distances, numpy.memmap) and isinstance(directions, numpy.memmap)
+    expected = analyze(random_maze, threads=2)
+    assert (distances == expected.distances).all()
+    assert (directions == expected.directions).all()
+    assert unreachable == expected.unreachable
+    assert (numpy.load(prefix + '.distances.npy', mmap_mode='r') == expected.distances).all()
+    assert (numpy.load(prefix + '.directions.npy', mmap_mode='r') == expected.directions).all()